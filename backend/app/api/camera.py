@@ -0,0 +1,157 @@
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
+import asyncio
+import json
+import logging
+
+from app.api.deps import get_vehicle, get_websocket_vehicle
+from app.core.camera import CameraFrame, is_image_stream
+from app.core.drone_client import DroneClient
+from app.core.websocket import manager
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MJPEG_BOUNDARY = "frame"
+
+def _stream(client: DroneClient, stream: str) -> int:
+    """按配置字符串或序号取单路图像流"""
+    try:
+        return client.camera.resolve(stream)[0]
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+def _image_response(frame: CameraFrame) -> Response:
+    return Response(
+        content=frame.payload,
+        media_type=frame.media_type,
+        headers={
+            "X-Image-Width": str(frame.width),
+            "X-Image-Height": str(frame.height),
+            "X-Image-Seq": str(frame.seq),
+            "X-Sim-Timestamp": str(frame.sim_timestamp)
+        }
+    )
+
+@router.get("")
+async def get_cameras(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """配置的图像流、采集统计和各观看者的发送/跳帧计数"""
+    return client.camera.to_dict()
+
+@router.get("/{stream}/snapshot")
+async def get_snapshot(stream: str, client: DroneClient = Depends(get_vehicle)) -> Response:
+    """
+    单路图像的一帧：正在采集时返回最新帧，否则立即采集一批
+
+    depth 图像返回 uint16 毫米像素（application/octet-stream），宽高见 X-Image-Width/Height 头
+    """
+    index = _stream(client, stream)
+    frame = client.camera.latest.get(index) if client.camera.viewers else None
+    if frame is None:
+        try:
+            frames = await client.camera.capture()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        frame = next((f for f in frames if f.stream == index), None)
+        if frame is None:
+            raise HTTPException(status_code=404, detail=f"No image from camera stream: {stream}")
+    return _image_response(frame)
+
+@router.get("/{stream}/pointcloud")
+async def get_point_cloud(stream: str, voxel: Optional[float] = None,
+                          max_depth: Optional[float] = None, format: str = "binary",
+                          client: DroneClient = Depends(get_vehicle)):
+    """
+    深度图像流转换的世界坐标系（NED）点云
+
+    默认返回 float32 小端 (N, 3) 字节流，点数见 X-Point-Count 头；format=json 返回坐标列表；
+    voxel 为体素降采样边长（米），max_depth 为最大深度（米）
+    """
+    index = _stream(client, stream)
+    try:
+        frame, points = await client.camera.point_cloud(index, voxel, max_depth)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "json":
+        return {"count": len(points), "seq": frame.seq, "sim_timestamp": frame.sim_timestamp,
+                "points": points.tolist()}
+    return Response(
+        content=points.astype("<f4", copy=False).tobytes(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Point-Count": str(len(points)),
+            "X-Image-Seq": str(frame.seq),
+            "X-Sim-Timestamp": str(frame.sim_timestamp)
+        }
+    )
+
+@router.get("/{stream}/mjpeg")
+async def get_mjpeg(stream: str, client: DroneClient = Depends(get_vehicle)) -> StreamingResponse:
+    """单路图像的 MJPEG 流（multipart/x-mixed-replace，可直接用于 <img>），跟不上时跳帧"""
+    index = _stream(client, stream)
+    if not is_image_stream(client.camera.specs[index]):
+        raise HTTPException(status_code=400,
+                            detail="Depth and raw streams are only available over WebSocket")
+
+    async def parts():
+        viewer = client.camera.subscribe([index])
+        try:
+            while True:
+                for frame in await viewer.next_frames():
+                    yield (
+                        f"--{MJPEG_BOUNDARY}\r\nContent-Type: {frame.media_type}\r\n"
+                        f"Content-Length: {len(frame.payload)}\r\n\r\n"
+                    ).encode() + frame.payload + b"\r\n"
+        finally:
+            client.camera.unsubscribe(viewer)
+
+    return StreamingResponse(
+        parts(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+    )
+
+@router.websocket("/ws")
+async def camera_websocket(websocket: WebSocket):
+    """图像流WebSocket
+
+    ?streams=front_center,front_center:depth（配置字符串或序号，逗号分隔）选择图像流，
+    默认全部；每帧一条二进制消息（帧格式见 app/core/camera.py），发送跟不上时跳帧；
+    ?format=shm 时改为发送共享内存帧描述（JSON文本帧，需要配置 CAMERA_SHM_SLOTS），
+    其他进程按描述用 app.core.frame_ring.FrameReader 读取像素；?vehicle_name= 选择无人机
+    """
+    client = get_websocket_vehicle(websocket)
+    if client is None:
+        await websocket.close(code=4404)
+        return
+    try:
+        streams = client.camera.resolve(websocket.query_params.get("streams"))
+    except KeyError:
+        await websocket.close(code=4404)
+        return
+    descriptors = websocket.query_params.get("format") == "shm"
+    await manager.connect(websocket)
+    viewer = client.camera.subscribe(streams)
+
+    async def send_frames():
+        while True:
+            for frame in await viewer.next_frames():
+                if not descriptors:
+                    await websocket.send_bytes(frame.packet)
+                elif frame.descriptor is not None:
+                    await websocket.send_text(json.dumps(
+                        {"stream": frame.stream, **frame.descriptor.to_dict()}))
+
+    send_task = asyncio.create_task(send_frames())
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Camera WebSocket error: {e}")
+    finally:
+        send_task.cancel()
+        client.camera.unsubscribe(viewer)
+        manager.disconnect(websocket)
@@ -1,57 +1,111 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+import asyncio
+import json
+import math
+import logging
 
-from app.core.drone_client import drone_client
+from app.api.deps import get_vehicle, get_websocket_vehicle
+from app.core.commands import PRIORITY_EMERGENCY, PRIORITY_NORMAL
+from app.core.drone_client import DroneClient
+from app.core.mission import MissionTracker, validate_mission
+from app.core.planner import plan_executor
+from app.core.safety import safety_engine
+from app.core.teleop import VelocitySession, parse_setpoint
+from app.core.recorder import flight_recorder
 from app.models.drone import (
     TakeoffCommand, 
     MoveCommand, 
     GotoCommand,
+    MissionCommand,
+    NoFlyZone,
+    PathCheckRequest,
+    PlanRequest,
     Vector3
 )
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+def _submit(client: DroneClient, name: str, run: Callable[[], Awaitable[Any]],
+            parameters: Optional[Dict[str, Any]] = None,
+            priority: int = PRIORITY_NORMAL,
+            progress: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """提交耗时指令到指令执行器，立即返回指令ID"""
+    if not client.is_connected:
+        raise HTTPException(status_code=400, detail="Not connected to AirSim")
+    try:
+        command = client.commands.submit(name, run, parameters, "rest", priority, progress)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    flight_recorder.record_command(name, parameters, "rest")
+    return {"success": True, "command_id": command.id, "status": command.status}
+
+def _altitude_progress(client: DroneClient,
+                       target: Optional[float] = None) -> Callable[[], Dict[str, Any]]:
+    """进度：当前高度（米）"""
+    def progress():
+        record = client.get_state_record()
+        result = {"altitude": round(-record.z, 2)}
+        if target is not None:
+            result["target_altitude"] = target
+        return result
+    return progress
+
+def _distance_progress(client: DroneClient, target: Vector3) -> Callable[[], Dict[str, Any]]:
+    """进度：距目标点的剩余距离（米）"""
+    def progress():
+        record = client.get_state_record()
+        distance = math.sqrt((target.x - record.x) ** 2 + (target.y - record.y) ** 2 +
+                             (target.z - record.z) ** 2)
+        return {"distance_remaining": round(distance, 2)}
+    return progress
+
+
 @router.post("/arm")
-async def arm_drone() -> Dict[str, bool]:
+async def arm_drone(client: DroneClient = Depends(get_vehicle)) -> Dict[str, bool]:
     """解锁无人机"""
+    flight_recorder.record_command("arm", source="rest")
     try:
-        result = await drone_client.arm()
+        result = await client.arm()
         return {"success": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/disarm")
-async def disarm_drone() -> Dict[str, bool]:
+async def disarm_drone(client: DroneClient = Depends(get_vehicle)) -> Dict[str, bool]:
     """锁定无人机"""
+    flight_recorder.record_command("disarm", source="rest")
     try:
-        result = await drone_client.disarm()
+        result = await client.disarm()
         return {"success": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/takeoff")
-async def takeoff(command: TakeoffCommand) -> Dict[str, bool]:
-    """起飞"""
-    try:
-        result = await drone_client.takeoff(altitude=command.altitude)
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def takeoff(command: TakeoffCommand,
+                  client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """起飞（异步执行，返回指令ID）"""
+    return _submit(
+        client,
+        "takeoff",
+        lambda: client.takeoff(altitude=command.altitude),
+        command.model_dump(),
+        progress=_altitude_progress(client, command.altitude)
+    )
 
 @router.post("/land")
-async def land() -> Dict[str, bool]:
-    """降落"""
-    try:
-        result = await drone_client.land()
-        return {"success": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def land(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """降落（异步执行，返回指令ID）"""
+    return _submit(client, "land", client.land, progress=_altitude_progress(client))
 
 @router.post("/move")
-async def move(command: MoveCommand) -> Dict[str, bool]:
+async def move(command: MoveCommand,
+               client: DroneClient = Depends(get_vehicle)) -> Dict[str, bool]:
     """按速度向量移动"""
+    flight_recorder.record_command("move", command.model_dump(), "rest")
     try:
-        result = await drone_client.move_by_velocity(
+        result = await client.move_by_velocity(
             velocity=command.velocity,
             duration=command.duration
         )
@@ -60,31 +114,230 @@ async def move(command: MoveCommand) -> Dict[str, bool]:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/goto")
-async def goto_position(command: GotoCommand) -> Dict[str, bool]:
-    """飞往指定位置"""
+async def goto_position(command: GotoCommand,
+                        client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """
+    飞往指定位置（异步执行，返回指令ID）；直飞航段不通过时沿规划的绕行航线飞行
+
+    提交时按当前位置预检（无法到达时返回400），航线在指令开始执行时从当时的位置重新规划
+    """
     try:
-        result = await drone_client.move_to_position(
+        await client.plan_route(command.position)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _submit(
+        client,
+        "goto",
+        lambda: client.move_to_position(
             position=command.position,
             speed=command.speed
+        ),
+        command.model_dump(),
+        progress=_distance_progress(client, command.position)
+    )
+
+@router.post("/mission")
+async def fly_mission(command: MissionCommand,
+                      client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """航点任务：一次校验全部航点，通过 moveOnPathAsync 连续飞行（异步，返回指令ID）"""
+    try:
+        waypoints, speeds = validate_mission(
+            [(w.x, w.y, w.z) for w in command.waypoints],
+            [w.speed or command.speed for w in command.waypoints],
+            client.current_position()
         )
-        return {"success": result}
-    except Exception as e:
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    tracker = MissionTracker(waypoints)
+
+    def progress():
+        record = client.get_state_record()
+        tracker.update((record.x, record.y, record.z))
+        return tracker.progress()
+
+    result = _submit(
+        client,
+        "mission",
+        lambda: client.fly_mission(waypoints, speeds, tracker),
+        command.model_dump(),
+        progress=progress
+    )
+    return {**result, "total_waypoints": len(waypoints)}
+
 @router.post("/hover")
-async def hover() -> Dict[str, bool]:
-    """悬停"""
+async def hover(client: DroneClient = Depends(get_vehicle)) -> Dict[str, bool]:
+    """悬停（立即执行，抢占排队中和正在执行的指令）"""
+    flight_recorder.record_command("hover", source="rest")
+    client.commands.preempt()
     try:
-        result = await drone_client.hover()
+        result = await client.hover()
         return {"success": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/emergency")
-async def emergency_stop() -> Dict[str, Any]:
-    """紧急停止"""
+async def emergency_stop(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """紧急停止：取消排队中的指令并抢占正在执行的指令"""
+    if not client.is_connected:
+        flight_recorder.record_command("emergency", source="rest")
+        return {"success": True, "message": "Emergency stop activated"}
+    result = _submit(client, "emergency", client.emergency_stop, priority=PRIORITY_EMERGENCY)
+    return {**result, "message": "Emergency stop activated"}
+
+@router.get("/zones")
+async def list_zones() -> List[NoFlyZone]:
+    """禁飞区列表"""
+    return safety_engine.zones
+
+@router.post("/zones")
+async def add_zone(zone: NoFlyZone) -> NoFlyZone:
+    """添加禁飞区（id相同时替换）"""
+    return safety_engine.add_zone(zone)
+
+@router.delete("/zones/{zone_id}")
+async def remove_zone(zone_id: str) -> Dict[str, bool]:
+    """删除禁飞区"""
+    try:
+        safety_engine.remove_zone(zone_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"success": True}
+
+@router.post("/zones/check")
+async def check_path(request: PathCheckRequest) -> Dict[str, Any]:
+    """检查一条路径是否违反安全包络（不执行飞行）"""
+    violations = safety_engine.check_path(
+        [(p.x, p.y, p.z) for p in request.points],
+        (request.start.x, request.start.y, request.start.z) if request.start else None
+    )
+    return {"safe": not violations, "violations": violations}
+
+@router.get("/plan")
+async def get_planner(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """航线规划统计：规划次数、缓存命中、绕行次数和最近一次耗时"""
+    return client.planner.to_dict()
+
+@router.post("/plan")
+async def plan_path(request: PlanRequest,
+                    client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """规划到目标点的无碰撞航线（不执行飞行），返回不含起点的航点列表"""
+    if request.start:
+        start = (request.start.x, request.start.y, request.start.z)
+    else:
+        start = client.current_position()
+        if start is None:
+            raise HTTPException(status_code=400, detail="Vehicle position unknown")
+    goal = (request.goal.x, request.goal.y, request.goal.z)
+    try:
+        plan = await asyncio.get_event_loop().run_in_executor(
+            plan_executor(), client.planner.plan, start, goal)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    points = [start, *plan.waypoints.tolist()]
+    length = sum(math.dist(a, b) for a, b in zip(points[:-1], points[1:]))
+    return {
+        "waypoints": [dict(zip("xyz", (round(v, 3) for v in p))) for p in plan.waypoints.tolist()],
+        "cached": plan.cached,
+        "length": round(length, 2)
+    }
+
+@router.get("/commands")
+async def list_commands(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """最近的指令及其状态"""
+    return {"commands": [c.to_dict() for c in client.commands.commands.values()]}
+
+@router.get("/commands/{command_id}")
+async def get_command(command_id: str, client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """查询指令状态"""
+    try:
+        return client.commands.get(command_id).to_dict()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.delete("/commands/{command_id}")
+async def cancel_command(command_id: str,
+                         client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """取消指令（执行中的指令通过 cancelLastTask 中止）"""
+    try:
+        command = await client.commands.cancel(command_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    flight_recorder.record_command("cancel", {"command_id": command_id}, "rest")
+    return command.to_dict()
+
+@router.websocket("/ws")
+async def velocity_control(websocket: WebSocket):
+    """速度控制WebSocket（摇杆式控制）
+
+    客户端发送 {"vx": .., "vy": .., "vz": .., "seq": n} 或 12/16 字节二进制帧
+    （3 x f32 + 可选 u32 序号）；服务端只转发最新的设定点，最高 CONTROL_MAX_RATE，
+    带序号的设定点被转发后回复 {"type": "ack", "seq": n}，超时悬停时推送
+    {"type": "deadman"}；?vehicle_name= 选择无人机
+    """
+    client = get_websocket_vehicle(websocket)
+    if client is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    session = VelocitySession(client, f"control-ws-{id(websocket)}")
+    send_lock = asyncio.Lock()
+
+    async def send_event(event: Dict[str, Any]):
+        async with send_lock:
+            await websocket.send_json(event)
+
+    sender = asyncio.create_task(session.run(send_event))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") == "ping":
+                await send_event({"type": "pong"})
+                continue
+            try:
+                if message.get("bytes") is not None:
+                    setpoint = parse_setpoint(message["bytes"])
+                else:
+                    setpoint = parse_setpoint(json.loads(message["text"]))
+                session.submit(*setpoint)
+            except ValueError as e:
+                await send_event({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Control WebSocket error: {e}")
+    finally:
+        sender.cancel()
+        try:
+            await sender
+        except (asyncio.CancelledError, Exception):
+            pass
+
+@router.websocket("/events")
+async def command_events(websocket: WebSocket):
+    """指令事件流：每次状态变化或进度更新推送一条 {"type": "command", ...}"""
+    client = get_websocket_vehicle(websocket)
+    if client is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    queue = client.commands.subscribe()
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    events_task = asyncio.create_task(send_events())
     try:
-        result = await drone_client.emergency_stop()
-        return {"success": result, "message": "Emergency stop activated"}
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
+        logger.error(f"Command events WebSocket error: {e}")
+    finally:
+        events_task.cancel()
+        client.commands.unsubscribe(queue) 
\ No newline at end of file
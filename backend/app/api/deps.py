@@ -0,0 +1,28 @@
+from fastapi import HTTPException, WebSocket
+from typing import Optional
+
+from app.core.drone_client import DroneClient
+from app.core.vehicles import vehicle_registry
+
+
+def get_vehicle(vehicle_name: Optional[str] = None) -> DroneClient:
+    """
+    路由依赖：按无人机名取客户端
+
+    挂载在 /vehicles/{vehicle_name}/ 下时取路径参数，否则取查询参数 ?vehicle_name=，
+    都没有时为默认无人机
+    """
+    try:
+        return vehicle_registry.get(vehicle_name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+def get_websocket_vehicle(websocket: WebSocket) -> Optional[DroneClient]:
+    """WebSocket端点按路径参数或查询参数取无人机，未知名称返回None"""
+    vehicle_name = websocket.path_params.get("vehicle_name") \
+        or websocket.query_params.get("vehicle_name")
+    try:
+        return vehicle_registry.get(vehicle_name)
+    except KeyError:
+        return None
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Response
+from typing import Dict, Any
+import asyncio
+import logging
+
+from app.api.deps import get_vehicle, get_websocket_vehicle
+from app.core.drone_client import DroneClient
+from app.core.lidar import FORMAT_F32, FORMATS
+from app.core.websocket import manager
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("")
+async def get_lidars(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """配置的 LiDAR、最新点数、采集统计和各订阅者的发送/跳帧计数"""
+    return client.lidar.to_dict()
+
+@router.get("/{sensor}/points")
+async def get_points(sensor: str, format: str = FORMAT_F32, max_points: int = 0,
+                     client: DroneClient = Depends(get_vehicle)) -> Response:
+    """
+    单个 LiDAR 的一帧点云（二进制帧，格式见 app/core/lidar.py）
+
+    正在采集时返回最新帧，否则立即读取；format 为 f32/f16/q16，max_points 为点数预算
+    """
+    try:
+        index = client.lidar.resolve(sensor)[0]
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown LiDAR format: {format}")
+    frame = client.lidar.latest.get(index) if client.lidar.subscribers else None
+    if frame is None:
+        try:
+            frame = (await client.lidar.capture())[index]
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=frame.encode(format, max(0, max_points)),
+                    media_type="application/octet-stream")
+
+@router.websocket("/ws")
+async def lidar_websocket(websocket: WebSocket):
+    """LiDAR 点云WebSocket
+
+    ?sensors=Lidar1,Lidar2（名称或序号）选择 LiDAR，默认全部；?format=f32|f16|q16 选择编码；
+    ?max_points= 为每帧点数预算（超出时均匀抽稀）；发送跟不上时跳帧；?vehicle_name= 选择无人机
+    """
+    client = get_websocket_vehicle(websocket)
+    if client is None:
+        await websocket.close(code=4404)
+        return
+    try:
+        sensors = client.lidar.resolve(websocket.query_params.get("sensors"))
+    except KeyError:
+        await websocket.close(code=4404)
+        return
+    try:
+        max_points = int(websocket.query_params.get("max_points", 0))
+        subscriber = client.lidar.subscribe(
+            sensors, websocket.query_params.get("format", FORMAT_F32), max_points)
+    except ValueError:
+        await websocket.close(code=4400)
+        return
+    await manager.connect(websocket)
+
+    async def send_frames():
+        while True:
+            for frame in await subscriber.next_frames():
+                await websocket.send_bytes(frame.encode(subscriber.format, subscriber.max_points))
+
+    send_task = asyncio.create_task(send_frames())
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"LiDAR WebSocket error: {e}")
+    finally:
+        send_task.cancel()
+        client.lidar.unsubscribe(subscriber)
+        manager.disconnect(websocket)
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Dict, Any, Optional
+import asyncio
+
+from app.api.deps import get_vehicle
+from app.core.config import settings
+from app.core.drone_client import DroneClient
+from app.core.occupancy import insert_executor
+from app.models.drone import OccupancyQuery, PathCheckRequest
+
+router = APIRouter()
+
+@router.get("")
+async def get_occupancy(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """占据地图统计：块数、内存、占据/空闲体素数、插入耗时和版本号"""
+    return client.occupancy.to_dict()
+
+@router.post("/query")
+async def query_points(request: OccupancyQuery,
+                       client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """各点是否被占据及占据概率（未观测的体素为 0.5）"""
+    points = [(p.x, p.y, p.z) for p in request.points]
+    occupancy_map = client.occupancy.map
+    return {
+        "occupied": occupancy_map.occupied(points).tolist(),
+        "probability": [round(float(p), 3) for p in occupancy_map.probability(points)],
+        "version": occupancy_map.version
+    }
+
+@router.post("/check")
+async def check_path(request: PathCheckRequest, clearance: Optional[float] = None,
+                     client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """检查一条路径是否经过占据体素（不执行飞行），clearance 默认 OCCUPANCY_CLEARANCE，最多 8 个体素"""
+    clearance = settings.OCCUPANCY_CLEARANCE if clearance is None else clearance
+    occupancy_map = client.occupancy.map
+    points = [(p.x, p.y, p.z) for p in request.points]
+    start = (request.start.x, request.start.y, request.start.z) if request.start else None
+    # 在地图线程中检查，长路径不阻塞事件循环
+    try:
+        collisions = await asyncio.get_event_loop().run_in_executor(
+            insert_executor(), occupancy_map.check_path, points, start, clearance)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"clear": not collisions, "collisions": collisions,
+            "version": occupancy_map.version}
+
+@router.get("/voxels")
+async def get_voxels(client: DroneClient = Depends(get_vehicle)) -> Response:
+    """所有占据体素的中心，小端 float32 (N, 3)，X-Voxel-Size 为体素边长"""
+    occupancy_map = client.occupancy.map
+    centers = occupancy_map.occupied_voxels()
+    return Response(content=centers.astype("<f4", copy=False).tobytes(),
+                    media_type="application/octet-stream",
+                    headers={"X-Point-Count": str(len(centers)),
+                             "X-Voxel-Size": str(occupancy_map.resolution),
+                             "X-Map-Version": str(occupancy_map.version)})
+
+@router.delete("")
+async def clear_occupancy(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """清空占据地图"""
+    client.occupancy.map.clear()
+    return {"success": True}
@@ -1,101 +1,166 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Response
+from typing import Dict, Any, Optional
 import asyncio
 import json
+import logging
+import time
+from numpy.lib import recfunctions
 
-from app.core.drone_client import drone_client
+from app.api.deps import get_vehicle, get_websocket_vehicle
+from app.core.drone_client import DroneClient
+from app.core.telemetry_codec import (
+    BINARY_SUBPROTOCOL,
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    MODE_DELTA,
+    MODE_FULL,
+)
 from app.core.websocket import manager
 from app.models.drone import DroneState, DronePosition, DroneAttitude
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/position")
-async def get_position() -> DronePosition:
+async def get_position(client: DroneClient = Depends(get_vehicle)) -> DronePosition:
     """获取无人机位置"""
     try:
-        state = await drone_client.get_state()
+        state = await client.get_state()
         return state.position
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/attitude")
-async def get_attitude() -> DroneAttitude:
+async def get_attitude(client: DroneClient = Depends(get_vehicle)) -> DroneAttitude:
     """获取无人机姿态"""
     try:
-        state = await drone_client.get_state()
+        state = await client.get_state()
         return state.attitude
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/state")
-async def get_state() -> DroneState:
+async def get_state(client: DroneClient = Depends(get_vehicle)) -> DroneState:
     """获取无人机完整状态"""
     try:
-        state = await drone_client.get_state()
+        state = await client.get_state()
         return state
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/history")
+async def get_history(since: Optional[float] = None, fields: Optional[str] = None,
+                      format: str = "json", client: DroneClient = Depends(get_vehicle)):
+    """
+    获取遥测历史
+
+    since为Unix时间戳，负数表示最近若干秒（如 -600 表示最近10分钟）；
+    fields为逗号分隔的字段列表（position,attitude,velocity,flags），默认全部；
+    format=binary 时返回紧凑的结构化记录字节流，dtype见 X-Telemetry-Dtype 头
+    """
+    if since is not None and since < 0:
+        since = time.time() + since
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        records = client.history.since(since, field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "binary":
+        packed = recfunctions.repack_fields(records)
+        return Response(
+            content=packed.tobytes(),
+            media_type="application/octet-stream",
+            headers={"X-Telemetry-Dtype": json.dumps(packed.dtype.descr)}
+        )
+
+    result: Dict[str, Any] = {"count": len(records), "fields": list(records.dtype.names)}
+    for name in records.dtype.names:
+        result[name] = records[name].tolist()
+    return result
+
+@router.get("/poller")
+async def get_poller_stats(client: DroneClient = Depends(get_vehicle)) -> Dict[str, Any]:
+    """获取状态轮询线程的RPC延迟统计"""
+    return {**client.get_poller_stats(), "rpc_pool": client.pool.stats()}
+
+async def _handle_client_message(websocket: WebSocket, subscriber, data: str):
+    """处理客户端发来的JSON消息：重同步请求或字段订阅"""
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return
+    if not isinstance(message, dict):
+        return
+
+    if message.get("type") == "resync":
+        subscriber.request_resync()
+        return
+
+    # 字段订阅：{"position": 50, ...} 或 {"type": "subscribe", "fields": {...}}
+    rates = message.get("fields", {}) if message.get("type") == "subscribe" else message
+    try:
+        if not isinstance(rates, dict):
+            raise ValueError("Subscription must map field names to rates")
+        subscriber.set_projection(rates)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        return
+    await websocket.send_json({"type": "subscribed", "fields": subscriber.rates})
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket连接端点，用于实时推送无人机状态"""
-    await manager.connect(websocket)
+    """WebSocket连接端点，用于实时推送无人机状态
+
+    默认发送JSON文本帧；通过查询参数 ?format=binary 或子协议
+    airsim-telemetry.v1 可协商紧凑二进制帧；?mode=delta 启用关键帧+增量帧模式；
+    发送 {"position": 50, ...} 订阅指定字段及频率（格式见 app/core/telemetry_codec.py）；
+    ?vehicle_name= 选择无人机，默认为默认无人机
+    """
+    # 协商帧格式
+    subprotocol = None
+    frame_format = FORMAT_JSON
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        subprotocol = BINARY_SUBPROTOCOL
+        frame_format = FORMAT_BINARY
+    elif websocket.query_params.get("format") == FORMAT_BINARY:
+        frame_format = FORMAT_BINARY
+    mode = MODE_DELTA if websocket.query_params.get("mode") == MODE_DELTA else MODE_FULL
+
+    client = get_websocket_vehicle(websocket)
+    if client is None:
+        await websocket.close(code=4404)
+        return
+    await manager.connect(websocket, subprotocol)
+    subscriber = client.telemetry.subscribe(frame_format, mode)
+
+    async def send_telemetry():
+        # 从订阅队列中取出已序列化的帧并发送
+        while True:
+            frame = await subscriber.next_frame()
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+
+    telemetry_task = asyncio.create_task(send_telemetry())
     try:
-        # 启动状态推送任务
-        async def send_telemetry():
-            while True:
-                try:
-                    if drone_client.is_connected:
-                        state = await drone_client.get_state()
-                        # 转换为可序列化的格式
-                        data = {
-                            "timestamp": state.position.timestamp.isoformat(),
-                            "position": {
-                                "x": state.position.x,
-                                "y": state.position.y,
-                                "z": state.position.z
-                            },
-                            "attitude": {
-                                "roll": state.attitude.roll,
-                                "pitch": state.attitude.pitch,
-                                "yaw": state.attitude.yaw
-                            },
-                            "velocity": {
-                                "vx": state.velocity.vx,
-                                "vy": state.velocity.vy,
-                                "vz": state.velocity.vz
-                            },
-                            "is_armed": state.is_armed,
-                            "is_flying": state.is_flying,
-                            "battery_level": state.battery_level,
-                            "gps_location": state.gps_location
-                        }
-                        await websocket.send_json(data)
-                    else:
-                        await websocket.send_json({
-                            "error": "Drone not connected",
-                            "is_connected": False
-                        })
-                    
-                    await asyncio.sleep(0.1)  # 10Hz更新频率
-                except Exception as e:
-                    print(f"Error sending telemetry: {e}")
-                    break
-        
-        # 创建任务
-        telemetry_task = asyncio.create_task(send_telemetry())
-        
         # 保持连接
         while True:
             data = await websocket.receive_text()
             # 可以在这里处理客户端发来的消息
             if data == "ping":
                 await websocket.send_text("pong")
-                
+            elif data == "resync":
+                subscriber.request_resync()
+            else:
+                await _handle_client_message(websocket, subscriber, data)
+
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        telemetry_task.cancel()
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        telemetry_task.cancel()
+        client.telemetry.unsubscribe(subscriber)
         manager.disconnect(websocket)
-        telemetry_task.cancel() 
\ No newline at end of file
@@ -0,0 +1,169 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any, Callable, Optional
+import asyncio
+import logging
+
+from app.api.control import _altitude_progress, _distance_progress
+from app.core.commands import PRIORITY_EMERGENCY, PRIORITY_NORMAL
+from app.core.drone_client import DroneClient
+from app.core.mission import MissionTracker, validate_mission
+from app.core.recorder import flight_recorder
+from app.core.swarm import Member, offset_position, swarm_dispatcher
+from app.core.vehicles import vehicle_registry
+from app.models.drone import (
+    SwarmCommand,
+    SwarmGotoCommand,
+    SwarmMissionCommand,
+    SwarmTakeoffCommand,
+    Vector3
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+def _select(command: SwarmCommand) -> Dict[str, DroneClient]:
+    """选取参与的无人机，要求全部已连接，编队偏移只能引用参与的无人机"""
+    try:
+        clients = vehicle_registry.select(command.vehicles)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    disconnected = [name for name, client in clients.items() if not client.is_connected]
+    if disconnected:
+        raise HTTPException(status_code=400,
+                            detail=f"Not connected to AirSim: {', '.join(disconnected)}")
+    unknown = [name for name in command.formation if name not in clients]
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Formation references vehicles not in the group: "
+                                   f"{', '.join(unknown)}")
+    return clients
+
+def _dispatch(name: str, command: SwarmCommand, members: Dict[str, Member],
+              priority: int = PRIORITY_NORMAL, barrier: bool = True) -> Dict[str, Any]:
+    """提交编队指令，立即返回编队指令ID和各无人机的指令ID"""
+    parameters = command.model_dump()
+    try:
+        group = swarm_dispatcher.dispatch(name, members, parameters, "rest", priority, barrier)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    flight_recorder.record_command(f"swarm_{name}", parameters, "rest")
+    return {
+        "success": True,
+        "group_id": group.id,
+        "status": group.status,
+        "commands": {vehicle_name: c.id for vehicle_name, c in group.commands.items()}
+    }
+
+
+@router.post("/takeoff")
+async def swarm_takeoff(command: SwarmTakeoffCommand) -> Dict[str, Any]:
+    """编队起飞：各无人机起飞到 altitude - 偏移.z"""
+    members: Dict[str, Member] = {}
+    for name, client in _select(command).items():
+        offset = command.formation.get(name)
+        altitude = command.altitude - (offset.z if offset else 0.0)
+        members[name] = (
+            client,
+            lambda client=client, altitude=altitude: client.takeoff(altitude=altitude),
+            {"altitude": altitude},
+            _altitude_progress(client, altitude)
+        )
+    return _dispatch("takeoff", command, members)
+
+@router.post("/goto")
+async def swarm_goto(command: SwarmGotoCommand) -> Dict[str, Any]:
+    """编队飞往：各无人机飞往 position + 偏移，全部通过安全检查（必要时规划绕行航线）后才提交"""
+    members: Dict[str, Member] = {}
+    for name, client in _select(command).items():
+        target = offset_position(command.position, command.formation.get(name))
+        # 提交前预检，航线在执行时从当时的位置重新规划
+        try:
+            await client.plan_route(target)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"{name}: {e}")
+        members[name] = (
+            client,
+            lambda client=client, target=target: client.move_to_position(target, command.speed),
+            {"position": target.model_dump(), "speed": command.speed},
+            _distance_progress(client, target)
+        )
+    return _dispatch("goto", command, members)
+
+@router.post("/land")
+async def swarm_land(command: SwarmCommand) -> Dict[str, Any]:
+    """编队降落"""
+    members: Dict[str, Member] = {
+        name: (client, client.land, {}, _altitude_progress(client))
+        for name, client in _select(command).items()
+    }
+    return _dispatch("land", command, members)
+
+def _mission_progress(client: DroneClient, tracker: MissionTracker) -> Callable[[], Dict[str, Any]]:
+    def progress():
+        record = client.get_state_record()
+        tracker.update((record.x, record.y, record.z))
+        return tracker.progress()
+    return progress
+
+@router.post("/mission")
+async def swarm_mission(command: SwarmMissionCommand) -> Dict[str, Any]:
+    """编队航点任务：各无人机的航点整体加上偏移，全部通过校验后才提交"""
+    members: Dict[str, Member] = {}
+    speeds = [w.speed or command.speed for w in command.waypoints]
+    for name, client in _select(command).items():
+        offset = command.formation.get(name) or Vector3()
+        try:
+            waypoints, member_speeds = validate_mission(
+                [(w.x + offset.x, w.y + offset.y, w.z + offset.z) for w in command.waypoints],
+                speeds,
+                client.current_position()
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"{name}: {e}")
+        tracker = MissionTracker(waypoints)
+        members[name] = (
+            client,
+            lambda client=client, waypoints=waypoints, member_speeds=member_speeds,
+            tracker=tracker: client.fly_mission(waypoints, member_speeds, tracker),
+            {"total_waypoints": len(waypoints)},
+            _mission_progress(client, tracker)
+        )
+    return _dispatch("mission", command, members)
+
+@router.post("/emergency")
+async def swarm_emergency(command: SwarmCommand) -> Dict[str, Any]:
+    """编队紧急停止：各无人机立即抢占，不经过起步屏障"""
+    members: Dict[str, Member] = {
+        name: (client, client.emergency_stop, {}, None)
+        for name, client in _select(command).items()
+    }
+    return _dispatch("emergency", command, members, PRIORITY_EMERGENCY, barrier=False)
+
+@router.get("/commands")
+async def list_swarm_commands() -> Dict[str, Any]:
+    """最近的编队指令及汇总状态"""
+    return {"commands": [g.to_dict() for g in swarm_dispatcher.groups.values()]}
+
+@router.get("/commands/{group_id}")
+async def get_swarm_command(group_id: str, wait: Optional[float] = None) -> Dict[str, Any]:
+    """查询编队指令；wait 为最多等待全部成员结束的秒数"""
+    try:
+        group = swarm_dispatcher.get(group_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    if wait:
+        try:
+            await group.wait(wait)
+        except asyncio.TimeoutError:
+            pass
+    return group.to_dict()
+
+@router.delete("/commands/{group_id}")
+async def cancel_swarm_command(group_id: str) -> Dict[str, Any]:
+    """取消整组编队指令"""
+    try:
+        group = await swarm_dispatcher.cancel(group_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    flight_recorder.record_command("swarm_cancel", {"group_id": group_id}, "rest")
+    return group.to_dict()
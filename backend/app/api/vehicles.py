@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+
+from app.core.vehicles import vehicle_registry
+
+router = APIRouter()
+
+@router.get("")
+async def list_vehicles() -> Dict[str, Any]:
+    """无人机列表：名称、是否为默认无人机、连接状态和最新位置"""
+    return {"vehicles": vehicle_registry.summary()}
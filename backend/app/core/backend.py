@@ -0,0 +1,46 @@
+import airsim
+import math
+import threading
+from typing import Optional
+
+from app.core.config import settings
+
+_replay_client = None
+_replay_lock = threading.Lock()
+
+
+def create_airsim_client(timeout: Optional[float] = None):
+    """
+    按 DRONE_BACKEND 创建RPC客户端
+
+    airsim: 连接真实的AirSim仿真器（每次调用新建一个连接）；timeout 为单次RPC的超时(秒)，
+            默认沿用 AirSim 的 3600 秒（飞行指令的 .join() 可能持续很久）
+    replay: 回放记录的飞行数据，所有调用方共享同一个回放时钟
+    """
+    global _replay_client
+    if settings.DRONE_BACKEND == "replay":
+        with _replay_lock:
+            if _replay_client is None:
+                from app.core.replay import ReplayClient
+                _replay_client = ReplayClient(
+                    recording=settings.REPLAY_PATH or None,
+                    speed=settings.REPLAY_SPEED,
+                    command_delay=settings.REPLAY_COMMAND_DELAY
+                )
+            return _replay_client
+
+    if timeout is None:
+        return airsim.MultirotorClient(ip=settings.AIRSIM_IP, port=settings.AIRSIM_PORT)
+    # msgpack-rpc 按整秒计时
+    return airsim.MultirotorClient(
+        ip=settings.AIRSIM_IP,
+        port=settings.AIRSIM_PORT,
+        timeout_value=max(1, math.ceil(timeout))
+    )
+
+
+def close_airsim_client(client):
+    """关闭 create_airsim_client 创建的连接及其套接字（回放后端是共享实例，不需要关闭）"""
+    rpc = getattr(client, "client", None)
+    if rpc is not None:
+        rpc.close()
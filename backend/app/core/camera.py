@@ -0,0 +1,461 @@
+"""
+相机图像流
+
+每架无人机一个 CameraStream，有观看者时才采集：每个周期用一次 simGetImages 批量请求
+CAMERAS 中配置的所有相机/图像类型，在编码线程池中并行编码，再放入各观看者的最新帧槽位。
+观看者发送跟不上时旧帧被新帧覆盖（计为跳帧），不会积压延迟。下一批图像的 RPC 与本批的编码
+同时进行。
+
+编码方式：
+- 彩色图像（scene/segmentation/infrared/normals）：安装了 opencv-python 时请求未压缩图像，
+  在线程池中编码为 JPEG（CAMERA_JPEG_QUALITY）；未安装时请求 AirSim 压缩好的 PNG 直接转发
+- 深度图像（depth/depth_perspective）：请求浮点图像，转换为 uint16 毫米（超出量程截断）
+
+CAMERA_SHM_SLOTS 大于 0 时彩色图像总是请求未压缩图像，每路图像的原始像素（深度为 float32 米）
+另外写入各自的共享内存帧环（app/core/frame_ring.py），其他进程凭帧描述直接读取；此时未安装
+opencv-python 的彩色图像以原始 BGR 像素发送。
+
+二进制帧格式（版本 1，小端序），WebSocket 每帧一条二进制消息::
+
+    帧头 56 字节
+      u8   magic          固定 0xC4
+      u8   version        格式版本，当前为 1
+      u8   encoding       0 = JPEG, 1 = PNG, 2 = depth16（uint16 毫米，行优先 height x width），
+                          3 = raw（uint8 BGR，行优先 height x width x 3）
+      u8   stream         图像流序号（CAMERAS 中的位置）
+      u16  width          图像宽度（像素）
+      u16  height         图像高度（像素）
+      u32  seq            采集批次序号，同一批次的各路图像序号相同（溢出回绕）
+      u64  sim_timestamp  仿真时间戳（ns）
+      f64  timestamp      采集时的 Unix 时间戳（秒）
+      3 x f32  camera_position     相机位置 x, y, z（米，NED）
+      4 x f32  camera_orientation  相机姿态四元数 w, x, y, z
+
+    帧头之后是图像数据（JPEG/PNG 文件内容或 depth16 像素）
+"""
+import asyncio
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+import airsim
+import numpy as np
+
+from app.core.config import settings
+from app.core.frame_ring import FrameDescriptor, FrameRing
+from app.core.pointcloud import depth_to_points
+from app.core.rpc_pool import LANE_SENSOR
+
+try:
+    import cv2
+except ImportError:  # opencv-python 属于可选依赖（ai）
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0xC4
+VERSION = 1
+HEADER = struct.Struct("<BBBBHHIQd3f4f")
+
+ENCODING_JPEG = 0
+ENCODING_PNG = 1
+ENCODING_DEPTH16 = 2
+ENCODING_RAW = 3
+
+MEDIA_TYPES = {
+    ENCODING_JPEG: "image/jpeg",
+    ENCODING_PNG: "image/png",
+    ENCODING_DEPTH16: "application/octet-stream",
+    ENCODING_RAW: "application/octet-stream",
+}
+
+# 图像类型 -> (AirSim ImageType 名称, 是否为浮点深度)
+IMAGE_TYPES = {
+    "scene": ("Scene", False),
+    "depth": ("DepthPlanar", True),
+    "depth_perspective": ("DepthPerspective", True),
+    "segmentation": ("Segmentation", False),
+    "infrared": ("Infrared", False),
+    "normals": ("SurfaceNormals", False),
+}
+
+
+class CameraSpec(NamedTuple):
+    """一路图像：配置字符串、相机名、图像类型"""
+    spec: str
+    camera: str
+    image_type: str
+
+    @property
+    def is_depth(self) -> bool:
+        return IMAGE_TYPES[self.image_type][1]
+
+
+def parse_camera_spec(spec: str) -> CameraSpec:
+    """解析图像流配置 "相机名" 或 "相机名:类型"，类型默认为 scene"""
+    camera, _, image_type = spec.partition(":")
+    image_type = image_type or "scene"
+    if not camera:
+        raise ValueError(f"Missing camera name: {spec}")
+    if image_type not in IMAGE_TYPES:
+        raise ValueError(f"Unknown image type: {image_type}")
+    return CameraSpec(spec, camera, image_type)
+
+
+def is_image_stream(spec: CameraSpec) -> bool:
+    """该图像流是否编码为图片文件（JPEG/PNG），可用于 MJPEG 和浏览器显示"""
+    return not spec.is_depth and (cv2 is not None or not settings.CAMERA_SHM_SLOTS)
+
+
+class CameraFrame:
+    """一帧已编码的图像"""
+
+    __slots__ = ("stream", "seq", "width", "height", "sim_timestamp", "timestamp",
+                 "encoding", "payload", "packet", "array", "descriptor",
+                 "position", "orientation")
+
+    def __init__(self, stream: int, seq: int, response, timestamp: float,
+                 encoding: int, payload: bytes, array: Optional[np.ndarray]):
+        self.stream = stream
+        self.seq = seq
+        self.width = response.width
+        self.height = response.height
+        self.sim_timestamp = response.time_stamp
+        self.timestamp = timestamp
+        self.encoding = encoding
+        self.payload = payload
+        # 解码后的像素（深度为 float32 米，未压缩彩色图像为 BGR uint8），供后续处理使用
+        self.array = array
+        # 写入共享内存帧环时的帧描述
+        self.descriptor: Optional[FrameDescriptor] = None
+        # 采集时相机在世界坐标系下的位置和姿态四元数 (w, x, y, z)
+        p = response.camera_position
+        q = response.camera_orientation
+        self.position = (p.x_val, p.y_val, p.z_val)
+        self.orientation = (q.w_val, q.x_val, q.y_val, q.z_val)
+        self.packet = HEADER.pack(
+            MAGIC, VERSION, encoding, stream, self.width, self.height, seq & 0xFFFFFFFF,
+            self.sim_timestamp, timestamp, *self.position, *self.orientation
+        ) + payload
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.encoding]
+
+
+def _write_ring(ring: FrameRing, data, shape, dtype, response) -> Optional[FrameDescriptor]:
+    try:
+        return ring.write(data, shape, dtype, response.time_stamp)
+    except ValueError as e:
+        # 图像尺寸在运行中变大，超出帧环槽位
+        logger.debug(f"Skipping shared memory write: {e}")
+        return None
+
+
+def encode_frame(stream: int, spec: CameraSpec, response, seq: int, timestamp: float,
+                 ring: Optional[FrameRing] = None) -> Optional[CameraFrame]:
+    """
+    把一个 ImageResponse 编码为 CameraFrame（在编码线程池中运行）；相机不存在时返回None
+
+    给出 ring 时原始像素同时写入共享内存帧环（直接从RPC返回的缓冲区复制）
+    """
+    if not response.width or not response.height:
+        return None
+    descriptor = None
+    if spec.is_depth:
+        array = np.asarray(response.image_data_float, dtype=np.float32)
+        array = array.reshape(response.height, response.width)
+        if ring is not None:
+            descriptor = _write_ring(ring, array, array.shape, np.float32, response)
+        payload = np.clip(array * 1000.0, 0, 65535).astype("<u2").tobytes()
+        frame = CameraFrame(stream, seq, response, timestamp, ENCODING_DEPTH16, payload, array)
+    elif response.compress:
+        frame = CameraFrame(stream, seq, response, timestamp, ENCODING_PNG,
+                            bytes(response.image_data_uint8), None)
+    else:
+        array = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
+        array = array.reshape(response.height, response.width, -1)
+        if ring is not None:
+            descriptor = _write_ring(ring, response.image_data_uint8, array.shape, np.uint8,
+                                     response)
+        if cv2 is None:
+            frame = CameraFrame(stream, seq, response, timestamp, ENCODING_RAW,
+                                bytes(response.image_data_uint8), array)
+        else:
+            ok, buffer = cv2.imencode(".jpg", array,
+                                      [cv2.IMWRITE_JPEG_QUALITY, settings.CAMERA_JPEG_QUALITY])
+            if not ok:
+                raise ValueError(f"Failed to encode {spec.spec}")
+            frame = CameraFrame(stream, seq, response, timestamp, ENCODING_JPEG,
+                                buffer.tobytes(), array)
+    frame.descriptor = descriptor
+    return frame
+
+
+_encode_executor: Optional[ThreadPoolExecutor] = None
+
+
+def encode_executor() -> ThreadPoolExecutor:
+    """所有无人机共享的编码线程池（cv2 编码和 numpy 转换期间释放GIL）"""
+    global _encode_executor
+    if _encode_executor is None:
+        _encode_executor = ThreadPoolExecutor(max_workers=settings.CAMERA_ENCODE_WORKERS,
+                                              thread_name_prefix="camera-encode")
+    return _encode_executor
+
+
+class CameraViewer:
+    """单个观看者：每路图像一个最新帧槽位，未发送的旧帧被新帧覆盖（计为跳帧）"""
+
+    def __init__(self, streams: List[int]):
+        self.streams = streams
+        self.slots: Dict[int, CameraFrame] = {}
+        self.sent = 0
+        self.skipped = 0
+        self._event = asyncio.Event()
+
+    def put(self, frame: CameraFrame):
+        if frame.stream in self.slots:
+            self.skipped += 1
+        self.slots[frame.stream] = frame
+        self._event.set()
+
+    async def next_frames(self) -> List[CameraFrame]:
+        """等待并取出各槽位中的最新帧"""
+        await self._event.wait()
+        self._event.clear()
+        slots, self.slots = self.slots, {}
+        frames = [slots[stream] for stream in sorted(slots)]
+        self.sent += len(frames)
+        return frames
+
+
+class CameraStream:
+    """单架无人机的图像采集，有观看者时运行"""
+
+    def __init__(self, client):
+        self.client = client
+        self.specs = [parse_camera_spec(spec) for spec in settings.CAMERAS]
+        self.viewers: List[CameraViewer] = []
+        # 各路最新一帧（快照接口和后续处理使用）
+        self.latest: Dict[int, CameraFrame] = {}
+        # 各路图像的共享内存帧环（CAMERA_SHM_SLOTS > 0 时按首帧大小创建）
+        self.rings: Dict[int, FrameRing] = {}
+        # 各相机的视场角（度），首次转换点云时查询
+        self._fov: Dict[str, float] = {}
+        self.seq = 0
+        self.captures = 0
+        self.errors = 0
+        self.last_capture_ms: Optional[float] = None
+        self.last_encode_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def resolve(self, streams: Optional[str] = None) -> List[int]:
+        """解析逗号分隔的图像流（配置字符串或序号），留空为全部；未知图像流抛出 KeyError"""
+        if not self.specs:
+            raise KeyError("No camera streams configured")
+        if not streams:
+            return list(range(len(self.specs)))
+        indexes = []
+        for name in (s.strip() for s in streams.split(",") if s.strip()):
+            index = next((i for i, spec in enumerate(self.specs) if spec.spec == name), None)
+            if index is None and name.isdigit() and int(name) < len(self.specs):
+                index = int(name)
+            if index is None:
+                raise KeyError(f"Unknown camera stream: {name}")
+            indexes.append(index)
+        return indexes
+
+    def _requests(self) -> List[Any]:
+        # 深度请求浮点图像；彩色图像有cv2或需要写入共享内存时请求未压缩图像，否则请求PNG
+        compress = cv2 is None and not settings.CAMERA_SHM_SLOTS
+        return [
+            airsim.ImageRequest(spec.camera, getattr(airsim.ImageType, IMAGE_TYPES[spec.image_type][0]),
+                                pixels_as_float=spec.is_depth,
+                                compress=not spec.is_depth and compress)
+            for spec in self.specs
+        ]
+
+    async def _get_images(self) -> List[Any]:
+        """一次RPC批量获取所有图像流"""
+        if not self.client.is_connected:
+            raise Exception("Not connected to AirSim")
+        requests = self._requests()
+        vehicle_name = self.client.vehicle_name
+        started = time.perf_counter()
+        responses = await self.client._rpc(
+            lambda client: client.simGetImages(requests, vehicle_name=vehicle_name), LANE_SENSOR
+        )
+        self.last_capture_ms = (time.perf_counter() - started) * 1000.0
+        self.captures += 1
+        return responses
+
+    async def capture(self) -> List[CameraFrame]:
+        """立即采集并编码一批图像（不经过观看者槽位，不写入共享内存）"""
+        started = time.time()
+        responses = await self._get_images()
+        self.seq += 1
+        return await self._encode(responses, self.seq, started, shm=False)
+
+    async def _encode(self, responses: List[Any], seq: int, timestamp: float,
+                      shm: bool = True) -> List[CameraFrame]:
+        # 每个帧环只由采集任务写入（同一时间只有一个写入方）
+        loop = asyncio.get_event_loop()
+        started = time.perf_counter()
+        frames = await asyncio.gather(*(
+            loop.run_in_executor(encode_executor(), encode_frame,
+                                 index, spec, response, seq, timestamp,
+                                 self._ring(index, response) if shm else None)
+            for index, (spec, response) in enumerate(zip(self.specs, responses))
+        ))
+        self.last_encode_ms = (time.perf_counter() - started) * 1000.0
+        frames = [frame for frame in frames if frame is not None]
+        for frame in frames:
+            self.latest[frame.stream] = frame
+        return frames
+
+    async def fov(self, camera: str) -> float:
+        """相机水平视场角（度），查询失败时使用 CAMERA_FOV"""
+        if camera not in self._fov:
+            vehicle_name = self.client.vehicle_name
+            try:
+                info = await self.client._rpc(
+                    lambda client: client.simGetCameraInfo(camera, vehicle_name=vehicle_name),
+                    LANE_SENSOR
+                )
+                self._fov[camera] = float(info.fov)
+            except Exception as e:
+                logger.debug(f"Failed to get FOV of camera {camera}: {e}")
+                return settings.CAMERA_FOV
+        return self._fov[camera]
+
+    async def point_cloud(self, index: int, voxel: Optional[float] = None,
+                          max_depth: Optional[float] = None) -> Tuple[CameraFrame, np.ndarray]:
+        """
+        深度图像流的世界坐标系点云 (N, 3) float32：正在采集时使用最新帧，否则立即采集
+
+        使用随图像返回的相机姿态（与图像同时采样）；voxel 默认 POINTCLOUD_VOXEL
+        """
+        spec = self.specs[index]
+        if not spec.is_depth:
+            raise ValueError(f"Not a depth stream: {spec.spec}")
+        frame = self.latest.get(index) if self.viewers else None
+        if frame is None:
+            frame = next((f for f in await self.capture() if f.stream == index), None)
+            if frame is None:
+                raise ValueError(f"No image from camera stream: {spec.spec}")
+        fov = await self.fov(spec.camera)
+        points = await asyncio.get_event_loop().run_in_executor(
+            encode_executor(), lambda: depth_to_points(
+                frame.array, fov, frame.position, frame.orientation,
+                planar=spec.image_type == "depth",
+                max_depth=max_depth or settings.POINTCLOUD_MAX_DEPTH,
+                voxel=settings.POINTCLOUD_VOXEL if voxel is None else voxel
+            )
+        )
+        return frame, points
+
+    def _ring(self, index: int, response) -> Optional[FrameRing]:
+        """取某路图像的帧环，首个未压缩帧到达时按其大小创建"""
+        if not settings.CAMERA_SHM_SLOTS or response.compress or not response.width:
+            return None
+        ring = self.rings.get(index)
+        if ring is None:
+            size = len(response.image_data_float) * 4 if response.pixels_as_float \
+                else len(response.image_data_uint8)
+            ring = self.rings[index] = FrameRing(settings.CAMERA_SHM_SLOTS, size)
+            logger.info(f"Camera stream {self.specs[index].spec} shared memory ring: {ring.name}")
+        return ring
+
+    def subscribe(self, streams: List[int]) -> CameraViewer:
+        """添加观看者，没有在运行的采集任务时启动"""
+        viewer = CameraViewer(streams)
+        self.viewers = self.viewers + [viewer]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return viewer
+
+    def unsubscribe(self, viewer: CameraViewer):
+        """移除观看者；最后一个观看者离开后采集任务自行结束"""
+        self.viewers = [v for v in self.viewers if v is not viewer]
+
+    async def stop(self):
+        self.viewers = []
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
+
+    def _publish(self, frames: List[CameraFrame]):
+        for viewer in self.viewers:
+            for frame in frames:
+                if frame.stream in viewer.streams:
+                    viewer.put(frame)
+
+    async def _fetch(self, due: float):
+        """等到采集时间后发出RPC，返回 (采集时间, 响应)；失败时响应为None"""
+        await asyncio.sleep(max(0.0, due - time.monotonic()))
+        started = time.time()
+        try:
+            return started, await self._get_images()
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"Error capturing images: {e}")
+            return started, None
+
+    async def _run(self):
+        interval = 1.0 / settings.CAMERA_RATE
+        due = time.monotonic()
+        fetch = asyncio.ensure_future(self._fetch(due))
+        try:
+            while self.viewers:
+                started, responses = await fetch
+                # 失败后等待一秒再试（未连接、仿真器重启等）
+                due = max(due + (interval if responses is not None else 1.0), time.monotonic())
+                # 下一批RPC与本批编码同时进行
+                fetch = asyncio.ensure_future(self._fetch(due))
+                if responses is None:
+                    continue
+                self.seq += 1
+                try:
+                    frames = await self._encode(responses, self.seq, started)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Error encoding images: {e}")
+                    continue
+                self._publish(frames)
+        finally:
+            fetch.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "streams": [
+                {"stream": index, "spec": spec.spec, "camera": spec.camera,
+                 "image_type": spec.image_type}
+                for index, spec in enumerate(self.specs)
+            ],
+            "running": self._task is not None and not self._task.done(),
+            "rate": settings.CAMERA_RATE,
+            "encoder": "jpeg" if cv2 is not None else "raw" if settings.CAMERA_SHM_SLOTS else "png",
+            "shm": {
+                index: {"name": ring.name, "slots": ring.slots, "slot_bytes": ring.slot_bytes,
+                        "write_seq": ring.seq}
+                for index, ring in self.rings.items()
+            },
+            "captures": self.captures,
+            "errors": self.errors,
+            "last_capture_ms": round(self.last_capture_ms, 3) if self.last_capture_ms else None,
+            "last_encode_ms": round(self.last_encode_ms, 3) if self.last_encode_ms else None,
+            "viewers": [
+                {"streams": viewer.streams, "sent": viewer.sent, "skipped": viewer.skipped}
+                for viewer in self.viewers
+            ]
+        }
@@ -0,0 +1,271 @@
+import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 指令状态
+COMMAND_PENDING = "pending"
+COMMAND_RUNNING = "running"
+COMMAND_SUCCEEDED = "succeeded"
+COMMAND_FAILED = "failed"
+COMMAND_CANCELLED = "cancelled"
+COMMAND_PREEMPTED = "preempted"   # 被紧急指令抢占
+
+FINISHED_STATUSES = (COMMAND_SUCCEEDED, COMMAND_FAILED, COMMAND_CANCELLED, COMMAND_PREEMPTED)
+
+# 优先级：数值越小越先执行
+PRIORITY_EMERGENCY = 0
+PRIORITY_NORMAL = 10
+
+
+class Command:
+    """一条已提交的飞行指令"""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]],
+                 parameters: Optional[Dict[str, Any]] = None, source: str = "api",
+                 priority: int = PRIORITY_NORMAL,
+                 progress: Optional[Callable[[], Optional[Dict[str, Any]]]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.parameters = parameters or {}
+        self.source = source
+        self.priority = priority
+        self.status = COMMAND_PENDING
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self._run = run
+        self._progress = progress
+        self._cancel_status: Optional[str] = None
+        self._done = asyncio.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    async def wait(self, timeout: Optional[float] = None) -> "Command":
+        """等待指令结束"""
+        await asyncio.wait_for(self._done.wait(), timeout)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "parameters": self.parameters,
+            "source": self.source,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class CommandExecutor:
+    """
+    异步指令执行器
+
+    提交立即返回指令ID，指令按优先级依次执行（同一架无人机同一时间只执行一条飞行指令）。
+    状态变化和进度以事件形式推送给订阅者；紧急指令会取消所有排队中的指令并抢占正在
+    执行的指令；取消正在执行的指令时调用 cancel_active（即AirSim的 cancelLastTask）。
+    """
+
+    def __init__(self, cancel_active: Callable[[], Awaitable[Any]]):
+        self.commands: "OrderedDict[str, Command]" = OrderedDict()
+        self.subscribers: List[asyncio.Queue] = []
+        self._cancel_active = cancel_active
+        self._counter = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._current: Optional[Command] = None
+        self._current_task: Optional[asyncio.Task] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动执行任务"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.PriorityQueue()
+            self._worker = asyncio.create_task(self._worker_loop())
+
+    async def stop(self):
+        """停止执行任务，排队中的指令标记为已取消"""
+        for command in self.commands.values():
+            if command.status == COMMAND_PENDING:
+                self._finish(command, COMMAND_CANCELLED)
+        current = self._current
+        if self._current_task:
+            current._cancel_status = COMMAND_CANCELLED
+            self._current_task.cancel()
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # 执行任务被取消时 _execute 不会结束正在执行的指令，在这里补上，避免等待者永久阻塞
+        if current is not None and not current.is_finished:
+            self._finish(current, COMMAND_CANCELLED)
+
+    def submit(self, name: str, run: Callable[[], Awaitable[Any]],
+               parameters: Optional[Dict[str, Any]] = None, source: str = "api",
+               priority: int = PRIORITY_NORMAL,
+               progress: Optional[Callable[[], Optional[Dict[str, Any]]]] = None) -> Command:
+        """提交指令，立即返回"""
+        if self._queue is None:
+            raise Exception("Command executor is not running")
+        command = Command(name, run, parameters, source, priority, progress)
+        if priority == PRIORITY_EMERGENCY:
+            self._preempt()
+        self.commands[command.id] = command
+        self._trim()
+        self._queue.put_nowait((priority, next(self._counter), command))
+        self._emit(command)
+        return command
+
+    def get(self, command_id: str) -> Command:
+        command = self.commands.get(command_id)
+        if command is None:
+            raise KeyError(f"Unknown command: {command_id}")
+        return command
+
+    async def cancel(self, command_id: str) -> Command:
+        """取消指令：排队中的直接移除，执行中的调用 cancelLastTask 中止"""
+        command = self.get(command_id)
+        if command.status == COMMAND_PENDING:
+            self._finish(command, COMMAND_CANCELLED)
+        elif command.status == COMMAND_RUNNING and command is self._current:
+            # 先取消协程，避免 .join() 返回后继续执行指令的后续步骤
+            command._cancel_status = COMMAND_CANCELLED
+            if self._current_task:
+                self._current_task.cancel()
+            try:
+                await self._cancel_active()
+            except Exception as e:
+                logger.error(f"Error cancelling command {command.id}: {e}")
+            await command.wait()
+        return command
+
+    def subscribe(self) -> asyncio.Queue:
+        """订阅指令事件"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.COMMAND_EVENT_QUEUE_SIZE)
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def _emit(self, command: Command):
+        """推送指令事件，慢订阅者丢弃最旧的事件"""
+        event = {"type": "command", **command.to_dict()}
+        for queue in self.subscribers:
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    def _finish(self, command: Command, status: str, result: Any = None,
+                error: Optional[str] = None):
+        command.status = status
+        command.result = result
+        command.error = error
+        command.finished_at = time.time()
+        command._done.set()
+        self._emit(command)
+
+    def preempt(self):
+        """
+        直接下发的控制（悬停、实时速度控制）接管无人机前调用
+
+        与紧急指令相同：排队中和正在执行的指令标记为被抢占，不再被当作成功完成
+        """
+        self._preempt()
+
+    def _preempt(self):
+        """紧急指令：取消所有排队中的指令，抢占正在执行的指令"""
+        for command in self.commands.values():
+            if command.status == COMMAND_PENDING:
+                self._finish(command, COMMAND_PREEMPTED)
+        if self._current is not None and self._current_task is not None:
+            self._current._cancel_status = COMMAND_PREEMPTED
+            self._current_task.cancel()
+
+    def _trim(self):
+        """只保留最近 COMMAND_HISTORY_SIZE 条已结束的指令"""
+        excess = len(self.commands) - settings.COMMAND_HISTORY_SIZE
+        if excess <= 0:
+            return
+        for command_id in [c.id for c in self.commands.values() if c.is_finished][:excess]:
+            del self.commands[command_id]
+
+    async def _report_progress(self, command: Command):
+        """执行期间定期采样进度"""
+        while True:
+            await asyncio.sleep(settings.COMMAND_PROGRESS_INTERVAL)
+            try:
+                progress = command._progress()
+            except Exception:
+                continue
+            if progress is not None and progress != command.progress:
+                command.progress = progress
+                self._emit(command)
+
+    async def _execute(self, command: Command):
+        command.status = COMMAND_RUNNING
+        command.started_at = time.time()
+        self._current = command
+        self._current_task = asyncio.create_task(command._run())
+        self._emit(command)
+
+        progress_task = asyncio.create_task(self._report_progress(command)) \
+            if command._progress else None
+        try:
+            await asyncio.wait({self._current_task})
+        finally:
+            if progress_task:
+                progress_task.cancel()
+            task = self._current_task
+            self._current = None
+            self._current_task = None
+
+        if task.cancelled():
+            self._finish(command, command._cancel_status or COMMAND_CANCELLED)
+        elif task.exception() is not None:
+            self._finish(command, COMMAND_FAILED, error=str(task.exception()))
+        else:
+            # 结束时再采样一次，使最终事件带有完成时的进度
+            if command._progress:
+                try:
+                    command.progress = command._progress()
+                except Exception:
+                    pass
+            self._finish(command, COMMAND_SUCCEEDED, result=task.result())
+
+    async def _worker_loop(self):
+        """按优先级依次执行指令"""
+        while True:
+            _, _, command = await self._queue.get()
+            if command.status != COMMAND_PENDING:
+                continue
+            try:
+                await self._execute(command)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Command executor error: {e}")
@@ -10,9 +10,113 @@ class Settings(BaseSettings):
     AIRSIM_IP: str = "127.0.0.1"
     AIRSIM_PORT: int = 41451
     
+    # RPC连接池：各通道的连接数上限
+    RPC_POOL_TELEMETRY: int = 4      # 状态轮询（多架无人机时并行读取，按需创建）
+    RPC_POOL_COMMAND: int = 3        # 飞行指令（阻塞的.join()各占一个连接）
+    RPC_POOL_SENSOR: int = 2         # 传感器/图像
+    RPC_POOL_CONTROL: int = 1        # 实时速度控制
+    RPC_POOL_LIDAR: int = 1          # LiDAR 点云
+    RPC_POOL_TIMEOUT: float = 10.0   # 通道无空闲连接时的等待时间(秒)
+    
+    # 连接监控：启动时在后台连接，仿真器断开后按带抖动的指数退避重连
+    SUPERVISOR_CHECK_INTERVAL: float = 0.5   # 健康检查间隔(秒)
+    SUPERVISOR_PROBE_TIMEOUT: float = 2.0    # 探测/连接超时(秒)
+    SUPERVISOR_BACKOFF_MIN: float = 0.5      # 首次重连等待(秒)
+    SUPERVISOR_BACKOFF_MAX: float = 10.0     # 最长重连等待(秒)
+    
+    # 无人机列表（AirSim的vehicle_name），留空时启动时通过 listVehicles 发现；
+    # 第一架为默认无人机，不带无人机名的接口作用于它
+    VEHICLES: List[str] = []
+    
+    # 每个轮询周期额外读取的传感器，格式 "类型" 或 "类型:名称"，
+    # 类型为 imu/barometer/magnetometer/gps/distance，例如 ["imu", "distance:Front"]。
+    # 各传感器与状态读取并发进行，传感器通道至少保留与传感器数量相同的连接
+    SENSORS: List[str] = []
+    
+    # 相机图像流，格式 "相机名" 或 "相机名:类型"，类型为 scene/depth/depth_perspective/
+    # segmentation/infrared/normals（默认 scene），例如 ["front_center", "front_center:depth"]。
+    # 有观看者时每个周期用一次 simGetImages 批量获取全部图像流
+    CAMERAS: List[str] = []
+    CAMERA_RATE: float = 10.0           # 采集频率上限(Hz)
+    CAMERA_JPEG_QUALITY: int = 80       # JPEG 质量（需要 opencv-python，否则转发 PNG）
+    CAMERA_ENCODE_WORKERS: int = 2      # 编码线程数
+    CAMERA_SHM_SLOTS: int = 0           # 每路图像共享内存帧环的槽位数，0 为不写入共享内存
+    CAMERA_FOV: float = 90.0            # 无法查询相机视场角时使用的默认值(度)
+    
+    # LiDAR，格式 "名称" 或 "名称:local"（DataFrame 为 SensorLocalFrame 时），例如 ["Lidar1"]。
+    # 有订阅者时每个周期在 LiDAR 通道上并发读取
+    LIDARS: List[str] = []
+    LIDAR_RATE: float = 10.0            # 采集频率上限(Hz)
+    LIDAR_QUANT_STEP: float = 0.01      # q16 格式的量化步长(米)，量程为传感器周围 ±32767 个步长
+    
+    # 深度图像点云
+    POINTCLOUD_MAX_DEPTH: float = 100.0   # 超过该深度的像素（天空等）不生成点(米)
+    POINTCLOUD_VOXEL: float = 0.0         # 默认体素降采样边长(米)，0 为不降采样
+    
+    # 占据地图：启用时持续订阅 LiDAR 和深度图像流，飞往目标点前检查直飞航段
+    OCCUPANCY_ENABLED: bool = False
+    OCCUPANCY_RESOLUTION: float = 0.5     # 体素边长(米)
+    OCCUPANCY_MAX_RANGE: float = 50.0     # 超过该距离的回波只用于清除量程内的空间(米)
+    OCCUPANCY_RADIUS: float = 200.0       # 淘汰距传感器超过该距离的块(米)
+    OCCUPANCY_MAX_BLOCKS: int = 8192      # 块数上限（每块 16^3 体素，4 KB）
+    OCCUPANCY_CLEARANCE: float = 1.0      # 航段与障碍物的最小距离(米)，不超过 8 个体素
+    
+    # 后端选择：airsim 连接仿真器；replay 回放飞行记录（无需AirSim）
+    DRONE_BACKEND: str = "airsim"
+    REPLAY_PATH: str = ""                # 记录会话目录，留空时使用合成轨迹
+    REPLAY_SPEED: float = 1.0            # 回放倍速
+    REPLAY_COMMAND_DELAY: float = 0.0    # 模拟飞行指令耗时(秒)
+    
     # WebSocket配置
     WS_MESSAGE_INTERVAL: float = 0.1  # 100ms
     
+    # 状态轮询频率(Hz)：取订阅需求与飞行阶段中的较大者，限制在[最小, 最大]之间
+    POLL_MIN_RATE: float = 1.0       # 下限，也是无人订阅且已降落时的频率
+    POLL_FLYING_RATE: float = 10.0   # 飞行中无人订阅时的频率
+    POLL_MAX_RATE: float = 50.0      # 上限
+    TELEMETRY_QUEUE_SIZE: int = 4     # 每个订阅者最多缓存的帧数，超出丢弃最旧帧
+    TELEMETRY_KEYFRAME_INTERVAL: float = 5.0  # 增量模式关键帧间隔(秒)
+    TELEMETRY_DELTA_EPSILON: float = 0.01     # 增量模式数值变化阈值
+    TELEMETRY_MAX_RATE: float = 50.0          # 字段订阅允许的最高频率(Hz)
+    TELEMETRY_HISTORY_SIZE: int = 6000        # 遥测历史环形缓冲区容量（10Hz下约10分钟）
+    
+    # 速度控制WebSocket
+    CONTROL_MAX_RATE: float = 20.0         # 转发速度设定点的最高频率(Hz)，期间收到的设定点只保留最新的
+    CONTROL_DEADMAN_TIMEOUT: float = 0.5   # 超过该时间(秒)没有新设定点则悬停
+    CONTROL_POLL_RATE: float = 50.0        # 控制连接期间请求的状态轮询频率(Hz)
+    
+    # 指令执行器配置
+    COMMAND_HISTORY_SIZE: int = 200          # 保留的已结束指令数
+    COMMAND_PROGRESS_INTERVAL: float = 0.5   # 执行中指令的进度采样间隔(秒)
+    COMMAND_EVENT_QUEUE_SIZE: int = 64       # 每个事件订阅者最多缓存的事件数
+    
+    # 编队指令：所有成员的指令开始执行后同时发出，超时未就绪则整组放弃
+    SWARM_BARRIER_TIMEOUT: float = 5.0
+    
+    # 安全包络：全局高度带上限为 MAX_ALTITUDE，禁飞区为多边形棱柱
+    SAFETY_MIN_ALTITUDE: Optional[float] = None   # 全局最低高度(米)，默认不限制
+    SAFETY_GRID_CELL: float = 50.0                # 禁飞区空间索引的网格边长(米)
+    NO_FLY_ZONES_FILE: str = ""                   # 启动时加载的禁飞区JSON文件
+    
+    # 航点任务
+    MISSION_MAX_WAYPOINTS: int = 1000     # 单个任务最多航点数
+    
+    # 航线规划：goto 的直飞航段不通过时在粗网格上用 A* 绕行，再按航段检查做捷径平滑
+    PLANNER_ENABLED: bool = True
+    PLANNER_GRID_CELL: float = 5.0        # 初始网格边长(米)，找不到路径时减半重试
+    PLANNER_MIN_CELL: float = 1.0         # 最小网格边长(米)
+    PLANNER_MARGIN: float = 50.0          # 搜索范围：起点和终点包围盒向外扩展的距离(米)
+    PLANNER_MAX_CELLS: int = 100000       # 网格节点数上限，超出时放大网格边长
+    PLANNER_CACHE_SIZE: int = 256         # 规划结果缓存容量（LRU）
+    PLANNER_CACHE_QUANTUM: float = 1.0    # 缓存键中起点和终点的量化步长(米)
+    
+    # 飞行记录器配置
+    RECORDER_ENABLED: bool = False
+    RECORDER_DIR: str = "recordings"
+    RECORDER_CHUNK_BYTES: int = 64 * 1024 * 1024  # 单个分块文件大小上限
+    RECORDER_FSYNC_INTERVAL: float = 1.0          # 批量fsync间隔(秒)
+    RECORDER_QUEUE_SIZE: int = 10000              # 写入队列长度，满时丢弃记录
+    
     # 安全限制
     MAX_ALTITUDE: float = 100.0  # 最大高度(米)
     MAX_SPEED: float = 20.0      # 最大速度(米/秒)
@@ -1,59 +1,131 @@
-import airsim
 import asyncio
+import math
 import numpy as np
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
 import logging
 
-from app.models.drone import DroneState, DronePosition, DroneAttitude, DroneVelocity, Vector3
+from app.models.drone import DroneState, Vector3
 from app.core.config import settings
+from app.core.camera import CameraStream
+from app.core.commands import CommandExecutor
+from app.core.history import TelemetryHistory
+from app.core.lidar import LidarStream
+from app.core.mission import MissionTracker, speed_groups, to_path
+from app.core.occupancy import OccupancyMapper
+from app.core.planner import PathPlanner, plan_executor
+from app.core.safety import safety_engine
+from app.core.rpc_pool import RpcPool, LANE_COMMAND, LANE_CONTROL
+from app.core.state_poller import StatePoller, StateRecord, VehicleState
+from app.core.telemetry import TelemetryHub
 
 logger = logging.getLogger(__name__)
 
+def clamp_speed(vx: float, vy: float, vz: float) -> Tuple[float, float, float]:
+    """速度限制：合速度超过 MAX_SPEED 时按比例缩小，非有限值抛出ValueError"""
+    if not (math.isfinite(vx) and math.isfinite(vy) and math.isfinite(vz)):
+        raise ValueError("Velocity must be finite")
+    speed = math.sqrt(vx * vx + vy * vy + vz * vz)
+    if speed > settings.MAX_SPEED:
+        factor = settings.MAX_SPEED / speed
+        return vx * factor, vy * factor, vz * factor
+    return vx, vy, vz
+
 class DroneClient:
-    def __init__(self):
-        self.client = None
+    """
+    单架无人机的客户端，按AirSim的vehicle_name区分（空字符串为仿真器的默认无人机）
+
+    多架无人机共享同一个RPC连接池和状态轮询线程，各自拥有指令执行器、遥测历史和遥测广播
+    """
+
+    def __init__(self, vehicle_name: str = "", pool: Optional[RpcPool] = None,
+                 poller: Optional[StatePoller] = None, record_flight: bool = True):
+        self.vehicle_name = vehicle_name
+        # 按用途划分的RPC连接池：状态轮询、飞行指令、传感器数据互不排队
+        self.pool = pool or RpcPool()
+        self.poller = poller or StatePoller(self.pool)
+        self.record_flight = record_flight
         self.is_connected = False
-        self._state_update_task = None
-        self._current_state = None
+        self._vehicle: Optional[VehicleState] = None
+        self._state_cache: Optional[Tuple[int, DroneState]] = None
+        # 各订阅方请求的状态轮询频率(Hz)
+        self._poll_demands: Dict[str, float] = {}
+        # 遥测历史，重连后保留
+        self.history = TelemetryHistory(settings.TELEMETRY_HISTORY_SIZE)
+        # 异步指令执行器：耗时的飞行指令排队执行，提交后立即返回指令ID
+        self.commands = CommandExecutor(self.cancel_last_task)
+        # 遥测广播
+        self.telemetry = TelemetryHub(self)
+        # 相机图像流（有观看者时采集）
+        self.camera = CameraStream(self)
+        # LiDAR 点云（有订阅者时采集）
+        self.lidar = LidarStream(self)
+        # 占据地图（OCCUPANCY_ENABLED 时由 LiDAR 和深度图像更新）
+        self.occupancy = OccupancyMapper(self)
+        # 航线规划（避开禁飞区和占据地图，结果缓存）
+        self.planner = PathPlanner(self.occupancy.map)
+        
+    async def _rpc(self, func, lane: str = LANE_COMMAND):
+        """在线程池中借用指定通道的连接执行RPC，不阻塞事件循环"""
+        return await asyncio.get_event_loop().run_in_executor(
+            self.pool.executor, self.pool.call, lane, func
+        )
         
     async def connect(self):
         """连接到AirSim"""
         try:
-            self.client = airsim.MultirotorClient(
-                ip=settings.AIRSIM_IP,
-                port=settings.AIRSIM_PORT
-            )
-            self.client.confirmConnection()
-            self.client.enableApiControl(True)
+            await self._rpc(lambda client: client.confirmConnection())
+            await self._rpc(lambda client: client.enableApiControl(True, self.vehicle_name))
             self.is_connected = True
-            logger.info("Successfully connected to AirSim")
+            logger.info(f"Successfully connected to AirSim (vehicle '{self.vehicle_name}')")
             
-            # 启动状态更新任务
-            self._state_update_task = asyncio.create_task(self._update_state_loop())
+            # 登记到状态轮询线程（使用遥测通道的连接），轮询线程未运行时启动
+            self._vehicle = self.poller.add_vehicle(
+                self.vehicle_name, history=self.history, demands=self._poll_demands,
+                record_flight=self.record_flight
+            )
+            self.poller.start()
             return True
         except Exception as e:
-            logger.error(f"Failed to connect to AirSim: {e}")
+            logger.error(f"Failed to connect to AirSim (vehicle '{self.vehicle_name}'): {e}")
             self.is_connected = False
             return False
     
     async def disconnect(self):
         """断开连接"""
-        if self._state_update_task:
-            self._state_update_task.cancel()
+        if self._vehicle:
+            self._vehicle = None
+            self.poller.remove_vehicle(self.vehicle_name)
+            # 最后一架无人机断开时停止轮询线程
+            if not self.poller.vehicles:
+                await asyncio.get_event_loop().run_in_executor(None, self.poller.stop, 2.0)
         
-        if self.client and self.is_connected:
-            self.client.enableApiControl(False)
-            self.client.armDisarm(False)
+        if self.is_connected:
+            try:
+                await self._rpc(lambda client: client.enableApiControl(False, self.vehicle_name))
+                await self._rpc(lambda client: client.armDisarm(False, self.vehicle_name))
+            except Exception as e:
+                logger.error(f"Error releasing API control: {e}")
         self.is_connected = False
-        logger.info("Disconnected from AirSim")
+        logger.info(f"Disconnected from AirSim (vehicle '{self.vehicle_name}')")
+    
+    def drop_connection(self):
+        """连接已中断（仿真器重启等）：标记为未连接并停止轮询该无人机，不发送RPC"""
+        self.is_connected = False
+        if self._vehicle:
+            self._vehicle = None
+            self.poller.remove_vehicle(self.vehicle_name)
+    
+    @property
+    def poll_failed(self) -> bool:
+        """最近一次状态轮询是否失败"""
+        return self._vehicle is not None and self._vehicle.failed
     
     async def arm(self):
         """解锁无人机"""
         if not self.is_connected:
             raise Exception("Not connected to AirSim")
         
-        self.client.armDisarm(True)
+        await self._rpc(lambda client: client.armDisarm(True, self.vehicle_name))
         await asyncio.sleep(0.1)
         return True
     
@@ -62,7 +134,7 @@ class DroneClient:
         if not self.is_connected:
             raise Exception("Not connected to AirSim")
         
-        self.client.armDisarm(False)
+        await self._rpc(lambda client: client.armDisarm(False, self.vehicle_name))
         return True
     
     async def takeoff(self, altitude: float = 10.0):
@@ -75,16 +147,12 @@ class DroneClient:
             altitude = settings.MAX_ALTITUDE
             
         await self.arm()
-        await asyncio.get_event_loop().run_in_executor(
-            None, 
-            lambda: self.client.takeoffAsync(timeout_sec=10).join()
-        )
+        await self._rpc(lambda client: client.takeoffAsync(
+            timeout_sec=10, vehicle_name=self.vehicle_name).join())
         
         # 移动到目标高度
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.client.moveToZAsync(-altitude, 3).join()
-        )
+        await self._rpc(lambda client: client.moveToZAsync(
+            -altitude, 3, vehicle_name=self.vehicle_name).join())
         return True
     
     async def land(self):
@@ -92,10 +160,8 @@ class DroneClient:
         if not self.is_connected:
             raise Exception("Not connected to AirSim")
         
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.client.landAsync(timeout_sec=30).join()
-        )
+        await self._rpc(lambda client: client.landAsync(
+            timeout_sec=30, vehicle_name=self.vehicle_name).join())
         return True
     
     async def move_by_velocity(self, velocity: Vector3, duration: Optional[float] = 1.0):
@@ -104,50 +170,109 @@ class DroneClient:
             raise Exception("Not connected to AirSim")
         
         # 速度限制
-        speed = np.sqrt(velocity.x**2 + velocity.y**2 + velocity.z**2)
-        if speed > settings.MAX_SPEED:
-            factor = settings.MAX_SPEED / speed
-            velocity.x *= factor
-            velocity.y *= factor
-            velocity.z *= factor
-        
-        self.client.moveByVelocityAsync(
+        velocity.x, velocity.y, velocity.z = clamp_speed(velocity.x, velocity.y, velocity.z)
+        
+        await self._rpc(lambda client: client.moveByVelocityAsync(
             velocity.x, velocity.y, velocity.z,
-            duration if duration else 1.0
-        )
+            duration if duration else 1.0,
+            vehicle_name=self.vehicle_name
+        ))
+        return True
+    
+    async def send_velocity(self, vx: float, vy: float, vz: float, duration: float):
+        """实时速度控制：在控制通道上发送速度设定点，不等待完成（调用方负责限速）"""
+        if not self.is_connected:
+            raise Exception("Not connected to AirSim")
+        
+        await self._rpc(lambda client: client.moveByVelocityAsync(
+            vx, vy, vz, duration, vehicle_name=self.vehicle_name), lane=LANE_CONTROL)
         return True
     
-    async def move_to_position(self, position: Vector3, speed: float = 5.0):
-        """移动到指定位置"""
+    async def move_to_position(self, position: Vector3, speed: float = 5.0,
+                               route: Optional[np.ndarray] = None):
+        """移动到指定位置
+
+        route 为 plan_route 的规划结果，留空时在此规划；需要绕行时经 moveOnPathAsync 沿航点飞行
+        """
         if not self.is_connected:
             raise Exception("Not connected to AirSim")
         
         # 速度限制
         speed = min(speed, settings.MAX_SPEED)
         
-        # 地理围栏检查
-        distance = np.sqrt(position.x**2 + position.y**2)
-        if distance > settings.GEOFENCE_RADIUS:
-            raise Exception(f"Position outside geofence radius: {distance:.2f}m")
+        # 高度限制、安全包络和障碍物检查
+        if route is None:
+            route = await self.plan_route(position)
         
-        # 高度限制
+        if len(route) > 1:
+            path = to_path(route)
+            await self._rpc(lambda client: client.moveOnPathAsync(
+                path, speed, vehicle_name=self.vehicle_name).join())
+            return True
+        await self._rpc(lambda client: client.moveToPositionAsync(
+            position.x, position.y, position.z, speed, vehicle_name=self.vehicle_name
+        ).join())
+        return True
+    
+    async def fly_mission(self, waypoints: np.ndarray, speeds: np.ndarray,
+                          tracker: Optional[MissionTracker] = None):
+        """按航点飞行（航点需先经 validate_mission 校验）
+
+        速度相同的连续航点合并为一次 moveOnPathAsync 调用，航点之间不停顿
+        """
+        if not self.is_connected:
+            raise Exception("Not connected to AirSim")
+        
+        if tracker:
+            record = self.get_state_record()
+            tracker.begin((record.x, record.y, record.z))
+        for start, end, speed in speed_groups(speeds):
+            path = to_path(waypoints[start:end])
+            await self._rpc(lambda client: client.moveOnPathAsync(
+                path, speed, vehicle_name=self.vehicle_name).join())
+            if tracker:
+                tracker.complete(end)
+        return True
+    
+    def current_position(self) -> Optional[Tuple[float, float, float]]:
+        """最新采样的位置，没有状态时返回None"""
+        record = self._vehicle.latest_record if self._vehicle else None
+        return (record.x, record.y, record.z) if record else None
+    
+    async def plan_route(self, position: Vector3) -> np.ndarray:
+        """
+        目标点检查和航线规划：高度超限时限制到 MAX_ALTITUDE，返回从当前位置出发的航点 (N, 3)
+
+        直飞航段通过安全包络和占据地图检查时只有目标点一个航点，否则（PLANNER_ENABLED 时）
+        规划绕行航线；无法到达时抛出 ValueError
+        """
         if abs(position.z) > settings.MAX_ALTITUDE:
             position.z = -settings.MAX_ALTITUDE if position.z < 0 else settings.MAX_ALTITUDE
+        target = (position.x, position.y, position.z)
+        start = self.current_position()
+        if start is None or not settings.PLANNER_ENABLED:
+            safety_engine.validate_path([target], start)
+            self.occupancy.validate_target([target], start)
+            return np.array([target], dtype=np.float64)
+        plan = await asyncio.get_event_loop().run_in_executor(
+            plan_executor(), self.planner.plan, start, target)
+        return plan.waypoints
+    
+    async def hover(self, lane: str = LANE_COMMAND):
+        """悬停"""
+        if not self.is_connected:
+            raise Exception("Not connected to AirSim")
         
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.client.moveToPositionAsync(
-                position.x, position.y, position.z, speed
-            ).join()
-        )
+        await self._rpc(lambda client: client.hoverAsync(vehicle_name=self.vehicle_name),
+                        lane=lane)
         return True
     
-    async def hover(self):
-        """悬停"""
+    async def cancel_last_task(self):
+        """取消正在执行的飞行任务（使阻塞中的 .join() 返回）"""
         if not self.is_connected:
             raise Exception("Not connected to AirSim")
         
-        self.client.hoverAsync()
+        await self._rpc(lambda client: client.cancelLastTask(vehicle_name=self.vehicle_name))
         return True
     
     async def emergency_stop(self):
@@ -157,7 +282,7 @@ class DroneClient:
         
         try:
             # 取消所有任务
-            self.client.cancelLastTask()
+            await self._rpc(lambda client: client.cancelLastTask(vehicle_name=self.vehicle_name))
             # 悬停
             await self.hover()
             # 降落
@@ -165,77 +290,57 @@ class DroneClient:
         except Exception as e:
             logger.error(f"Emergency stop error: {e}")
             # 强制断开
-            self.client.reset()
+            await self._rpc(lambda client: client.reset())
         return True
     
+    def get_state_record(self) -> StateRecord:
+        """获取内部状态记录（不生成pydantic模型，供遥测等热路径使用）"""
+        record = self._vehicle.latest_record if self._vehicle else None
+        if not self.is_connected or not record:
+            raise Exception("Not connected to AirSim or no state available")
+        return record
+
     async def get_state(self) -> DroneState:
         """获取无人机状态"""
-        if not self.is_connected or not self._current_state:
-            raise Exception("Not connected to AirSim or no state available")
-        
-        return self._current_state
+        record = self.get_state_record()
+        # 同一个采样只生成一次DroneState
+        if self._state_cache is None or self._state_cache[0] != record.seq:
+            self._state_cache = (record.seq, record.to_drone_state())
+        return self._state_cache[1]
     
-    async def _update_state_loop(self):
-        """状态更新循环"""
-        while self.is_connected:
-            try:
-                state = self.client.getMultirotorState()
-                
-                # 位置
-                pos = state.kinematics_estimated.position
-                position = DronePosition(
-                    x=pos.x_val,
-                    y=pos.y_val,
-                    z=pos.z_val,
-                    timestamp=datetime.now()
-                )
-                
-                # 姿态
-                orientation = state.kinematics_estimated.orientation
-                pitch, roll, yaw = airsim.to_eularian_angles(orientation)
-                attitude = DroneAttitude(
-                    roll=np.degrees(roll),
-                    pitch=np.degrees(pitch),
-                    yaw=np.degrees(yaw),
-                    timestamp=datetime.now()
-                )
-                
-                # 速度
-                vel = state.kinematics_estimated.linear_velocity
-                velocity = DroneVelocity(
-                    vx=vel.x_val,
-                    vy=vel.y_val,
-                    vz=vel.z_val
-                )
-                
-                # GPS位置
-                gps_data = None
-                if hasattr(state, 'gps_location'):
-                    gps = state.gps_location
-                    gps_data = {
-                        "latitude": gps.latitude,
-                        "longitude": gps.longitude,
-                        "altitude": gps.altitude
-                    }
-                
-                # 电池（模拟）
-                battery = 100.0  # AirSim不提供电池信息，这里模拟
-                
-                self._current_state = DroneState(
-                    position=position,
-                    attitude=attitude,
-                    velocity=velocity,
-                    is_armed=state.landed_state == airsim.LandedState.Flying,
-                    is_flying=state.landed_state == airsim.LandedState.Flying,
-                    battery_level=battery,
-                    gps_location=gps_data
-                )
-                
-                await asyncio.sleep(settings.WS_MESSAGE_INTERVAL)
-                
-            except Exception as e:
-                logger.error(f"Error updating state: {e}")
-                await asyncio.sleep(1)
+    def set_poll_demand(self, owner: str, rate: float):
+        """登记某个订阅方需要的状态轮询频率(Hz)，rate<=0表示取消"""
+        current = self._poll_demands.get(owner)
+        if rate > 0:
+            if current == rate:
+                return
+            self._poll_demands[owner] = rate
+        elif current is None:
+            return
+        else:
+            del self._poll_demands[owner]
+        if self._vehicle:
+            self.poller.wake()
+
+    def get_poller_stats(self) -> Dict[str, Any]:
+        """获取状态轮询的RPC延迟统计"""
+        vehicle = self._vehicle
+        if not vehicle:
+            return {"running": False}
+        return {
+            "running": self.poller.is_alive(),
+            "vehicle_name": self.vehicle_name,
+            "rate": vehicle.rate,
+            "demands": dict(self._poll_demands),
+            "sensors": [spec for spec, _, _ in vehicle.sensors.sensors],
+            **vehicle.stats.to_dict(),
+            # 所有无人机共享的轮询线程：每一轮批量读取的统计
+            "poller": {
+                "vehicles": len(self.poller.vehicles),
+                "workers": self.poller.workers,
+                **self.poller.stats.to_dict()
+            }
+        }
 
 # 全局实例
 drone_client = DroneClient() 
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+共享内存帧环
+
+把未压缩的 simGetImages 图像写入 multiprocessing.shared_memory 中固定大小的槽位，
+其他进程（app/ai 下的视觉处理等）只需拿到一个很小的帧描述（环名、槽位、序号、形状、dtype、
+仿真时间戳）即可直接读取像素，图像不经过 API 进程的 Python bytes 复制：写入方把 RPC 返回的
+缓冲区用 np.frombuffer 视图直接复制进槽位，读取方把槽位复制到自己的数组（或直接使用视图）。
+
+共享内存布局（小端序）::
+
+    环头 64 字节
+      u32  magic       固定 0x474E5246 ("FRNG")
+      u16  version     格式版本，当前为 1
+      u16  slots       槽位数
+      u64  slot_bytes  每个槽位数据区的字节数
+      u64  write_seq   最近一次写入完成的帧序号（0 表示还没有帧）
+
+    槽位 x slots，每个槽位为 64 字节槽头 + slot_bytes 数据区（按 64 字节对齐）
+      u64  lock           序列锁：写入期间为奇数，写入完成后为偶数
+      u64  seq            帧序号（从 1 开始，写入槽位 (seq - 1) % slots）
+      u64  sim_timestamp  仿真时间戳（ns）
+      f64  timestamp      写入时的 Unix 时间戳（秒）
+      u32  height
+      u32  width
+      u32  channels       单通道图像为 1
+      8s   dtype          numpy dtype 字符串，例如 "|u1"、"<f4"
+
+读取方按序列锁校验：读取前后 lock 相同且为偶数、seq 等于描述中的序号时数据完整；
+否则说明读取期间槽位被覆盖（读取方落后超过 slots 帧），本帧作废。
+"""
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+MAGIC = 0x474E5246
+VERSION = 1
+RING_HEADER = struct.Struct("<IHHQQ")
+SLOT_HEADER = struct.Struct("<QQQdIII8s")
+HEADER_BYTES = 64
+ALIGN = 64
+
+_WRITE_SEQ_OFFSET = 16
+
+# 本进程创建的帧环名称（同一进程中的读取方不能注销写入方的资源跟踪登记）
+_created: Set[str] = set()
+
+
+class FrameDescriptor(NamedTuple):
+    """帧描述：其他进程按它从共享内存读取一帧"""
+    ring: str
+    slot: int
+    seq: int
+    shape: Tuple[int, ...]
+    dtype: str
+    sim_timestamp: int
+    timestamp: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self._asdict(), "shape": list(self.shape)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FrameDescriptor":
+        return cls(**{**data, "shape": tuple(data["shape"])})
+
+
+def _slot_stride(slot_bytes: int) -> int:
+    return HEADER_BYTES + (slot_bytes + ALIGN - 1) // ALIGN * ALIGN
+
+
+class _Ring:
+    """FrameRing 与 FrameReader 共用的布局计算"""
+
+    shm: shared_memory.SharedMemory
+    slots: int
+    slot_bytes: int
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_BYTES + slot * _slot_stride(self.slot_bytes)
+
+    def _lock(self, slot: int) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, self._slot_offset(slot))[0]
+
+    @property
+    def write_seq(self) -> int:
+        return struct.unpack_from("<Q", self.shm.buf, _WRITE_SEQ_OFFSET)[0]
+
+    def descriptor(self, slot: int) -> Optional[FrameDescriptor]:
+        """槽位当前内容的描述，槽位为空或正在写入时返回None"""
+        lock, seq, sim_timestamp, timestamp, height, width, channels, dtype = \
+            SLOT_HEADER.unpack_from(self.shm.buf, self._slot_offset(slot))
+        if lock & 1 or not seq:
+            return None
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        return FrameDescriptor(self.name, slot, seq, shape, dtype.rstrip(b"\0").decode(),
+                               sim_timestamp, timestamp)
+
+    def latest(self) -> Optional[FrameDescriptor]:
+        """最近写入的一帧的描述"""
+        seq = self.write_seq
+        if not seq:
+            return None
+        return self.descriptor((seq - 1) % self.slots)
+
+    def view(self, descriptor: FrameDescriptor) -> np.ndarray:
+        """槽位数据的零复制视图（可能在使用期间被覆盖，用后以 valid() 校验）"""
+        return np.ndarray(descriptor.shape, dtype=descriptor.dtype, buffer=self.shm.buf,
+                          offset=self._slot_offset(descriptor.slot) + HEADER_BYTES)
+
+    def valid(self, descriptor: FrameDescriptor, lock: Optional[int] = None) -> bool:
+        """槽位仍保存着该帧（未被覆盖、不在写入中）"""
+        offset = self._slot_offset(descriptor.slot)
+        current, seq = struct.unpack_from("<QQ", self.shm.buf, offset)
+        return not current & 1 and seq == descriptor.seq and (lock is None or current == lock)
+
+
+class FrameRing(_Ring):
+    """
+    写入方：创建共享内存帧环（单个写入方）
+
+    slot_bytes 为单帧最大字节数，1080p BGR 图像为 1920 * 1080 * 3
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.seq = 0
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=True, size=HEADER_BYTES + slots * _slot_stride(slot_bytes)
+        )
+        _created.add(self.shm._name)
+        RING_HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, slots, slot_bytes, 0)
+        for slot in range(slots):
+            SLOT_HEADER.pack_into(self.shm.buf, self._slot_offset(slot),
+                                  0, 0, 0, 0.0, 0, 0, 0, b"")
+
+    def write(self, data, shape: Tuple[int, ...], dtype: Any = np.uint8,
+              sim_timestamp: int = 0) -> FrameDescriptor:
+        """
+        写入一帧：data 为 bytes/bytearray/memoryview 或 numpy 数组，直接复制进槽位
+
+        超过 slot_bytes 的帧抛出 ValueError
+        """
+        dtype = np.dtype(dtype)
+        source = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=dtype)
+        source = source.reshape(shape)
+        if source.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {source.nbytes} bytes exceeds slot size {self.slot_bytes}")
+
+        seq = self.seq + 1
+        slot = (seq - 1) % self.slots
+        offset = self._slot_offset(slot)
+        lock = self._lock(slot)
+        struct.pack_into("<Q", self.shm.buf, offset, lock + 1)
+        np.copyto(np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset + HEADER_BYTES),
+                  source, casting="no")
+        timestamp = time.time()
+        height, width = shape[0], shape[1]
+        channels = shape[2] if len(shape) > 2 else 1
+        SLOT_HEADER.pack_into(self.shm.buf, offset, lock + 1, seq, sim_timestamp, timestamp,
+                              height, width, channels, dtype.str.encode())
+        struct.pack_into("<Q", self.shm.buf, offset, lock + 2)
+        struct.pack_into("<Q", self.shm.buf, _WRITE_SEQ_OFFSET, seq)
+        self.seq = seq
+        return FrameDescriptor(self.name, slot, seq, tuple(shape), dtype.str, sim_timestamp,
+                               timestamp)
+
+    def close(self):
+        """关闭并删除共享内存（已连接的读取方仍可访问到其解除映射为止）"""
+        _created.discard(self.shm._name)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    连接已有的共享内存，读取进程中不保留资源跟踪登记
+
+    连接方也会被登记到资源跟踪器，读取进程退出时会删除写入方的共享内存，因此连接后立即注销
+    （Python 3.13 起直接以 track=False 连接）；写入方所在的进程中保留登记
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and shm._name not in _created:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class FrameReader(_Ring):
+    """读取方：按名称连接已有的帧环（可在其他进程中使用）"""
+
+    def __init__(self, name: str):
+        self.shm = _attach(name)
+        magic, version, self.slots, self.slot_bytes, _ = RING_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"Not a frame ring: {name}")
+
+    def read(self, descriptor: Optional[FrameDescriptor] = None,
+             out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        复制一帧（默认最近一帧）；out 可复用调用方的数组
+
+        帧已被覆盖或读取期间被改写时返回None
+        """
+        descriptor = descriptor or self.latest()
+        if descriptor is None:
+            return None
+        lock = self._lock(descriptor.slot)
+        if not self.valid(descriptor, lock):
+            return None
+        if out is None:
+            out = np.empty(descriptor.shape, dtype=descriptor.dtype)
+        np.copyto(out, self.view(descriptor))
+        return out if self.valid(descriptor, lock) else None
+
+    def wait(self, after_seq: int, timeout: float = 1.0,
+             interval: float = 0.001) -> Optional[FrameDescriptor]:
+        """等待序号大于 after_seq 的新帧，超时返回None"""
+        deadline = time.monotonic() + timeout
+        while self.write_seq <= after_seq:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+        return self.latest()
+
+    def close(self):
+        self.shm.close()
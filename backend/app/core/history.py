@@ -0,0 +1,72 @@
+import threading
+import numpy as np
+from typing import Optional, Sequence
+
+# 历史记录的结构化dtype，每个采样一行
+HISTORY_DTYPE = np.dtype([
+    ("time", "f8"),             # Unix时间戳(秒)
+    ("position", "f4", (3,)),   # x, y, z (米，NED)
+    ("attitude", "f4", (3,)),   # roll, pitch, yaw (度)
+    ("velocity", "f4", (3,)),   # vx, vy, vz (米/秒)
+    ("flags", "u1"),            # bit0 已解锁, bit1 飞行中
+])
+
+HISTORY_FIELDS = [name for name in HISTORY_DTYPE.names if name != "time"]
+
+FLAG_ARMED = 0x01
+FLAG_FLYING = 0x02
+
+
+class TelemetryHistory:
+    """固定容量、预分配的遥测环形缓冲区"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, position: Sequence[float], attitude: Sequence[float],
+               velocity: Sequence[float], flags: int):
+        """写入一个采样（原地覆盖最旧的行，不分配新数组）"""
+        with self._lock:
+            row = self._buffer[self._count % self.capacity]
+            row["time"] = timestamp
+            row["position"] = position
+            row["attitude"] = attitude
+            row["velocity"] = velocity
+            row["flags"] = flags
+            self._count += 1
+
+    def since(self, timestamp: Optional[float] = None,
+              fields: Optional[Sequence[str]] = None) -> np.ndarray:
+        """返回时间不早于timestamp的采样（按时间顺序的连续数组）"""
+        names = ["time"] + [f for f in (fields or HISTORY_FIELDS) if f != "time"]
+        for name in names:
+            if name not in HISTORY_DTYPE.names:
+                raise ValueError(f"Unknown history field: {name}")
+
+        with self._lock:
+            if self._count <= self.capacity:
+                # 尚未回绕，有效数据即[0, count)
+                data = self._buffer[:self._count]
+                start = 0 if timestamp is None else \
+                    int(np.searchsorted(data["time"], timestamp, side="left"))
+                result = data[names][start:].copy()
+            else:
+                # 已回绕，最旧数据从head开始
+                head = self._count % self.capacity
+                older = self._buffer[head:]
+                newer = self._buffer[:head]
+                if timestamp is None or timestamp <= older["time"][0]:
+                    result = np.concatenate((older[names], newer[names]))
+                elif head and timestamp > newer["time"][0]:
+                    start = int(np.searchsorted(newer["time"], timestamp, side="left"))
+                    result = newer[names][start:].copy()
+                else:
+                    start = int(np.searchsorted(older["time"], timestamp, side="left"))
+                    result = np.concatenate((older[names][start:], newer[names]))
+        return result
@@ -0,0 +1,272 @@
+"""
+LiDAR 点云采集
+
+每架无人机一个 LidarStream，有订阅者时以 LIDAR_RATE 在独立的 LiDAR 通道上并发读取 LIDARS 中
+配置的所有 LiDAR。getLidarData 返回的扁平浮点列表在RPC线程中一次性转换为 (N, 3) float32 数组
+（不经过Python循环），并变换到世界坐标系（NED）：
+
+- "名称"：LiDAR 的 DataFrame 为 VehicleInertialFrame（AirSim 默认），点已在世界坐标系下
+- "名称:local"：DataFrame 为 SensorLocalFrame，按随数据返回的传感器位姿变换
+
+订阅者各有每个 LiDAR 一个最新帧槽位（跟不上时跳帧），并可设置点数预算，超出时均匀抽稀。
+
+二进制帧格式（版本 1，小端序），WebSocket 每帧一条二进制消息::
+
+    帧头 40 字节
+      u8   magic          固定 0xD1
+      u8   version        格式版本，当前为 1
+      u8   format         0 = f32, 1 = f16, 2 = q16
+      u8   sensor         LiDAR 序号（LIDARS 中的位置）
+      u32  seq            采集批次序号（溢出回绕）
+      u32  count          本帧点数（按预算抽稀后）
+      u32  total          抽稀前的点数
+      u64  sim_timestamp  仿真时间戳（ns）
+      f32  scale          量化步长（米），f32/f16 为 1
+      3 x f32  origin     原点（米，NED）
+
+    之后是 count 个点，每点 3 个分量 x, y, z：
+      f32  世界坐标（origin 为 0）
+      f16  相对 origin（传感器位置）的偏移
+      i16  相对 origin 的偏移 / scale（步长 LIDAR_QUANT_STEP，超出量程的点被丢弃）
+
+    世界坐标 = origin + 分量 * scale
+"""
+import asyncio
+import struct
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.core.camera import CameraViewer
+from app.core.config import settings
+from app.core.pointcloud import quaternion_matrix
+from app.core.rpc_pool import LANE_LIDAR
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0xD1
+VERSION = 1
+HEADER = struct.Struct("<BBBBIIIQf3f")
+
+FORMAT_F32 = "f32"
+FORMAT_F16 = "f16"
+FORMAT_Q16 = "q16"
+FORMATS = {FORMAT_F32: 0, FORMAT_F16: 1, FORMAT_Q16: 2}
+
+_Q16_LIMIT = 32767
+
+
+class LidarSpec(NamedTuple):
+    """一个 LiDAR：配置字符串、传感器名、点是否为传感器坐标系"""
+    spec: str
+    name: str
+    local: bool
+
+
+def parse_lidar_spec(spec: str) -> LidarSpec:
+    """解析 LiDAR 配置 "名称" 或 "名称:local" """
+    name, _, frame = spec.partition(":")
+    if frame not in ("", "local"):
+        raise ValueError(f"Unknown LiDAR data frame: {frame}")
+    return LidarSpec(spec, name, frame == "local")
+
+
+class LidarFrame:
+    """一帧世界坐标系点云"""
+
+    __slots__ = ("stream", "seq", "sim_timestamp", "timestamp", "points", "origin",
+                 "orientation", "_encoded")
+
+    def __init__(self, stream: int, seq: int, sim_timestamp: int, timestamp: float,
+                 points: np.ndarray, origin: Tuple[float, float, float],
+                 orientation: Tuple[float, float, float, float]):
+        self.stream = stream
+        self.seq = seq
+        self.sim_timestamp = sim_timestamp
+        self.timestamp = timestamp
+        # (N, 3) float32，世界坐标系
+        self.points = points
+        # 采集时传感器的位置和姿态四元数 (w, x, y, z)
+        self.origin = origin
+        self.orientation = orientation
+        self._encoded: Dict[Tuple[str, int], bytes] = {}
+
+    def encode(self, format: str = FORMAT_F32, max_points: int = 0) -> bytes:
+        """编码为二进制帧；相同格式和预算的订阅者共用编码结果"""
+        key = (format, max_points)
+        if key not in self._encoded:
+            self._encoded[key] = encode_points(self, format, max_points)
+        return self._encoded[key]
+
+
+def decimate(points: np.ndarray, max_points: int) -> np.ndarray:
+    """超过预算时均匀抽取 max_points 个点"""
+    if not max_points or len(points) <= max_points:
+        return points
+    return points[np.arange(max_points, dtype=np.int64) * len(points) // max_points]
+
+
+def encode_points(frame: LidarFrame, format: str = FORMAT_F32, max_points: int = 0) -> bytes:
+    points = decimate(frame.points, max_points)
+    scale = 1.0
+    origin = (0.0, 0.0, 0.0)
+    if format == FORMAT_F32:
+        data = points.astype("<f4", copy=False)
+    else:
+        origin = frame.origin
+        offsets = points - np.asarray(origin, dtype=np.float32)
+        if format == FORMAT_F16:
+            data = offsets.astype("<f2")
+        else:
+            scale = settings.LIDAR_QUANT_STEP
+            quantized = np.rint(offsets * (1.0 / scale))
+            data = quantized[(np.abs(quantized) <= _Q16_LIMIT).all(axis=1)].astype("<i2")
+    return HEADER.pack(MAGIC, VERSION, FORMATS[format], frame.stream, frame.seq & 0xFFFFFFFF,
+                       len(data), len(frame.points), frame.sim_timestamp, scale,
+                       *origin) + data.tobytes()
+
+
+def read_lidar(client, spec: LidarSpec, vehicle_name: str = '') -> Tuple[Any, np.ndarray]:
+    """读取一个 LiDAR 并转换为世界坐标系 (N, 3) float32（在RPC线程中运行）"""
+    data = client.getLidarData(lidar_name=spec.name, vehicle_name=vehicle_name)
+    points = np.asarray(data.point_cloud, dtype=np.float32)
+    # 没有回波时 AirSim 返回 [0.0]
+    points = points[:len(points) - len(points) % 3].reshape(-1, 3)
+    if spec.local and len(points):
+        p = data.pose.position
+        q = data.pose.orientation
+        points = points @ quaternion_matrix(q.w_val, q.x_val, q.y_val, q.z_val).T
+        points += np.array([p.x_val, p.y_val, p.z_val], dtype=np.float32)
+    return data, points
+
+
+class LidarSubscriber(CameraViewer):
+    """订阅者：每个 LiDAR 一个最新帧槽位，附带编码格式和点数预算"""
+
+    def __init__(self, streams: List[int], format: str = FORMAT_F32, max_points: int = 0):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown LiDAR format: {format}")
+        super().__init__(streams)
+        self.format = format
+        self.max_points = max(0, max_points)
+
+
+class LidarStream:
+    """单架无人机的 LiDAR 采集，有订阅者时运行"""
+
+    def __init__(self, client):
+        self.client = client
+        self.specs = [parse_lidar_spec(spec) for spec in settings.LIDARS]
+        self.subscribers: List[LidarSubscriber] = []
+        self.latest: Dict[int, LidarFrame] = {}
+        self.seq = 0
+        self.captures = 0
+        self.errors = 0
+        self.last_capture_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def resolve(self, sensors: Optional[str] = None) -> List[int]:
+        """解析逗号分隔的 LiDAR（名称或序号），留空为全部；未知 LiDAR 抛出 KeyError"""
+        if not self.specs:
+            raise KeyError("No LiDAR sensors configured")
+        if not sensors:
+            return list(range(len(self.specs)))
+        indexes = []
+        for name in (s.strip() for s in sensors.split(",") if s.strip()):
+            index = next((i for i, spec in enumerate(self.specs)
+                          if name in (spec.spec, spec.name)), None)
+            if index is None and name.isdigit() and int(name) < len(self.specs):
+                index = int(name)
+            if index is None:
+                raise KeyError(f"Unknown LiDAR: {name}")
+            indexes.append(index)
+        return indexes
+
+    async def capture(self) -> List[LidarFrame]:
+        """并发读取所有 LiDAR，每个 LiDAR 占用 LiDAR 通道的一个连接"""
+        if not self.client.is_connected:
+            raise Exception("Not connected to AirSim")
+        vehicle_name = self.client.vehicle_name
+        started = time.perf_counter()
+        timestamp = time.time()
+        results = await asyncio.gather(*(
+            self.client._rpc(lambda client, spec=spec: read_lidar(client, spec, vehicle_name),
+                             LANE_LIDAR)
+            for spec in self.specs
+        ))
+        self.last_capture_ms = (time.perf_counter() - started) * 1000.0
+        self.captures += 1
+        self.seq += 1
+        frames = []
+        for index, (data, points) in enumerate(results):
+            p = data.pose.position
+            q = data.pose.orientation
+            frame = LidarFrame(index, self.seq, data.time_stamp, timestamp, points,
+                               (p.x_val, p.y_val, p.z_val), (q.w_val, q.x_val, q.y_val, q.z_val))
+            self.latest[index] = frame
+            frames.append(frame)
+        return frames
+
+    def subscribe(self, streams: List[int], format: str = FORMAT_F32,
+                  max_points: int = 0) -> LidarSubscriber:
+        """添加订阅者，没有在运行的采集任务时启动"""
+        subscriber = LidarSubscriber(streams, format, max_points)
+        self.subscribers = self.subscribers + [subscriber]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: LidarSubscriber):
+        """移除订阅者；最后一个订阅者离开后采集任务自行结束"""
+        self.subscribers = [s for s in self.subscribers if s is not subscriber]
+
+    async def stop(self):
+        self.subscribers = []
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        interval = 1.0 / settings.LIDAR_RATE
+        due = time.monotonic()
+        while self.subscribers:
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            try:
+                frames = await self.capture()
+            except Exception as e:
+                # 失败后等待一秒再试（未连接、仿真器重启等）
+                self.errors += 1
+                logger.debug(f"Error reading LiDAR: {e}")
+                due = time.monotonic() + 1.0
+                continue
+            for subscriber in self.subscribers:
+                for frame in frames:
+                    if frame.stream in subscriber.streams:
+                        subscriber.put(frame)
+            due = max(due + interval, time.monotonic())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sensors": [
+                {"sensor": index, "spec": spec.spec, "name": spec.name,
+                 "data_frame": "SensorLocalFrame" if spec.local else "VehicleInertialFrame",
+                 "points": len(self.latest[index].points) if index in self.latest else None}
+                for index, spec in enumerate(self.specs)
+            ],
+            "running": self._task is not None and not self._task.done(),
+            "rate": settings.LIDAR_RATE,
+            "captures": self.captures,
+            "errors": self.errors,
+            "last_capture_ms": round(self.last_capture_ms, 3) if self.last_capture_ms else None,
+            "subscribers": [
+                {"sensors": s.streams, "format": s.format, "max_points": s.max_points,
+                 "sent": s.sent, "skipped": s.skipped}
+                for s in self.subscribers
+            ]
+        }
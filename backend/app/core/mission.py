@@ -0,0 +1,97 @@
+import airsim
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.safety import safety_engine, describe_violations
+
+# 进度跟踪时向前搜索的航段数
+PROGRESS_WINDOW = 8
+
+
+def validate_mission(points: Sequence[Sequence[float]], speeds: Sequence[float],
+                     start: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次性校验所有航点
+
+    返回 (航点数组(N,3), 速度数组(N,))；整条路径（从start到各航点）由安全引擎一次检查，
+    任一航段违规时抛出 ValueError，航段i即飞往航点i的一段。速度须为正数，超过
+    MAX_SPEED 时限制为 MAX_SPEED。
+    """
+    waypoints = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if len(waypoints) == 0:
+        raise ValueError("Mission has no waypoints")
+    if len(waypoints) > settings.MISSION_MAX_WAYPOINTS:
+        raise ValueError(f"Mission has more than {settings.MISSION_MAX_WAYPOINTS} waypoints")
+    speeds = np.asarray(speeds, dtype=np.float64).reshape(-1)
+    if len(speeds) != len(waypoints):
+        raise ValueError("Mission needs one speed per waypoint")
+    if not np.all(np.isfinite(speeds) & (speeds > 0)):
+        raise ValueError("Mission speeds must be positive")
+
+    violations = safety_engine.check_path(waypoints, waypoints[0] if start is None else start)
+    if violations:
+        raise ValueError("Invalid mission: " +
+                         describe_violations(violations).replace("segment", "waypoint"))
+
+    speeds = np.minimum(speeds, settings.MAX_SPEED)
+    return waypoints, speeds
+
+
+def speed_groups(speeds: np.ndarray) -> List[Tuple[int, int, float]]:
+    """把连续相同速度的航点合并为一组，返回 [(起始序号, 结束序号(不含), 速度)]"""
+    changes = np.flatnonzero(np.diff(speeds)) + 1
+    bounds = [0, *changes.tolist(), len(speeds)]
+    return [(start, end, float(speeds[start])) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def to_path(waypoints: np.ndarray) -> List[Any]:
+    """航点数组转换为 moveOnPathAsync 使用的 Vector3r 列表"""
+    return [airsim.Vector3r(float(x), float(y), float(z)) for x, y, z in waypoints]
+
+
+class MissionTracker:
+    """
+    按航点序号跟踪任务进度
+
+    把当前位置投影到接下来 PROGRESS_WINDOW 个航段上，取最近的航段作为当前航段；
+    进度只前进不后退。某组航点的RPC返回时直接推进到该组末尾。
+    """
+
+    def __init__(self, waypoints: np.ndarray):
+        self.waypoints = waypoints
+        self.start = None
+        # 正在飞往的航点序号，等于航点数时表示已完成
+        self.current = 0
+
+    def begin(self, position: Sequence[float]):
+        """记录任务开始时的位置（第一个航段的起点）"""
+        self.start = np.asarray(position, dtype=np.float64)
+
+    def complete(self, index: int):
+        """某组航点已飞完"""
+        self.current = max(self.current, index)
+
+    def update(self, position: Sequence[float]):
+        """根据当前位置推进进度"""
+        count = len(self.waypoints)
+        if self.start is None or self.current >= count:
+            return
+        end = min(self.current + PROGRESS_WINDOW, count)
+        b = self.waypoints[self.current:end]
+        a = np.vstack([self.start if self.current == 0 else self.waypoints[self.current - 1],
+                       b[:-1]])
+        p = np.asarray(position, dtype=np.float64)
+        ab = b - a
+        length_sq = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", p - a, ab) / np.maximum(length_sq, 1e-9), 0.0, 1.0)
+        distance = np.linalg.norm(a + ab * t[:, None] - p, axis=1)
+        self.current += int(np.argmin(distance))
+
+    def progress(self) -> Dict[str, Any]:
+        count = len(self.waypoints)
+        return {
+            "waypoint_index": min(self.current, count - 1),
+            "completed_waypoints": self.current,
+            "total_waypoints": count
+        }
@@ -0,0 +1,525 @@
+"""
+三维占据地图
+
+稀疏体素哈希：空间按 OCCUPANCY_RESOLUTION 划分体素，每 16x16x16 个体素组成一个块，
+只有被观测到的块才分配（dict: 块键 -> int8[4096] 对数几率）。每个体素保存占据概率的
+对数几率（定点数，1/32 为单位，限制在 [-2.0, 3.5]），0 为未知，大于 0 视为占据。
+
+批量插入（一帧深度点云或 LiDAR 点云）：
+- 回波点按体素去重，每个被击中的体素加 LOG_ODDS_HIT
+- 传感器到各回波点的射线按分辨率步长采样（np.repeat 展开为一个数组，不做逐条循环），
+  经过的体素去重后减 LOG_ODDS_MISS（同一帧中被击中的体素不做减法）
+- 超出 OCCUPANCY_MAX_RANGE 的回波只清除量程内的空间
+- 更新按块分组，每个块一次向量化读改写，Python 循环只在被触及的块上
+
+每次插入后以传感器位置为中心淘汰 OCCUPANCY_RADIUS 以外的块，块数超过 OCCUPANCY_MAX_BLOCKS
+时再淘汰最远的块，内存有上界（每块 4 KB）。
+
+version 在任一体素的占据状态（占据/非占据）改变或淘汰了占据体素后递增，可用作依赖
+地图的缓存（航线规划等）的键。
+
+OCCUPANCY_ENABLED 时每架无人机一个 OccupancyMapper，在进程内订阅所有 LiDAR 和深度图像流，
+在单独的线程中插入（跟不上时只处理各路的最新帧）；飞往目标点前检查直飞航段。
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.pointcloud import depth_to_points
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SHIFT = 4
+BLOCK_SIZE = 1 << BLOCK_SHIFT          # 每块每边体素数
+BLOCK_MASK = BLOCK_SIZE - 1
+BLOCK_VOXELS = BLOCK_SIZE ** 3
+
+# 对数几率定点数：实际值 = 存储值 / LOG_ODDS_SCALE
+LOG_ODDS_SCALE = 32
+LOG_ODDS_HIT = round(0.85 * LOG_ODDS_SCALE)     # 命中概率 0.7
+LOG_ODDS_MISS = round(0.4 * LOG_ODDS_SCALE)     # 未命中概率 0.4
+LOG_ODDS_MIN = round(-2.0 * LOG_ODDS_SCALE)
+LOG_ODDS_MAX = round(3.5 * LOG_ODDS_SCALE)
+
+# 体素键每个轴占 21 位（有符号范围 ±2^20 个体素）
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+# 单次插入最多采样的射线点数，超出时按比例抽取射线
+MAX_RAY_SAMPLES = 2_000_000
+
+# 航段检查的膨胀半径上限（体素数），以及每批查询的体素键数（采样点分批处理）
+MAX_CLEARANCE_VOXELS = 8
+MAX_QUERY_KEYS = 1 << 20
+
+
+def _pack(cells: np.ndarray) -> np.ndarray:
+    """(3, N) 非负整数坐标 -> int64 键"""
+    return (cells[0] << (2 * _KEY_BITS)) | (cells[1] << _KEY_BITS) | cells[2]
+
+
+def _unpack(keys: np.ndarray) -> np.ndarray:
+    """int64 键 -> (3, N) 非负整数坐标"""
+    return np.stack([(keys >> (2 * _KEY_BITS)) & _KEY_MASK,
+                     (keys >> _KEY_BITS) & _KEY_MASK,
+                     keys & _KEY_MASK])
+
+
+class OccupancyMap:
+    """稀疏体素哈希占据地图（线程安全：插入、淘汰和查询都持有锁）"""
+
+    def __init__(self, resolution: float, max_range: float, radius: float, max_blocks: int):
+        self.resolution = resolution
+        self.max_range = max_range
+        self.radius = radius
+        self.max_blocks = max_blocks
+        self.blocks: Dict[int, np.ndarray] = {}
+        self.version = 0
+        self.inserts = 0
+        self.evicted = 0
+        self.last_insert_ms: Optional[float] = None
+        self._extent: Optional[np.ndarray] = None    # 已分配块的包围盒 (2, 3)，块集合改变时置空
+        self._lock = threading.Lock()
+
+    # ---- 坐标 ----
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        """(N, 3) 世界坐标 -> (3, N) 带偏移的体素坐标"""
+        cells = np.floor(np.asarray(points, dtype=np.float64).T / self.resolution).astype(np.int64)
+        cells += _KEY_OFFSET
+        return cells
+
+    def _keys(self, points: np.ndarray) -> np.ndarray:
+        return _pack(self._cells(points))
+
+    def _centers(self, keys: np.ndarray) -> np.ndarray:
+        """体素键 -> (N, 3) 体素中心"""
+        return ((_unpack(keys) - _KEY_OFFSET).T + 0.5) * self.resolution
+
+    def _group(self, keys: np.ndarray) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+        """体素键按块分组，返回 [(块键, 在keys中的下标, 块内偏移)]"""
+        cells = _unpack(keys)
+        block_keys = _pack(cells >> BLOCK_SHIFT)
+        local = ((cells[0] & BLOCK_MASK) << (2 * BLOCK_SHIFT)) \
+            | ((cells[1] & BLOCK_MASK) << BLOCK_SHIFT) | (cells[2] & BLOCK_MASK)
+        order = np.argsort(block_keys, kind="stable")
+        sorted_blocks = block_keys[order]
+        bounds = np.flatnonzero(np.diff(sorted_blocks)) + 1
+        groups = []
+        for start, end in zip([0, *bounds.tolist()], [*bounds.tolist(), len(order)]):
+            index = order[start:end]
+            groups.append((int(sorted_blocks[start]), index, local[index]))
+        return groups
+
+    def _block_center(self, block_key: int) -> np.ndarray:
+        cells = _unpack(np.array([block_key], dtype=np.int64))[:, 0]
+        return ((cells << BLOCK_SHIFT) - _KEY_OFFSET + BLOCK_SIZE / 2) * self.resolution
+
+    # ---- 更新 ----
+
+    def _apply(self, keys: np.ndarray, deltas: np.ndarray) -> bool:
+        """对一批互不相同的体素累加对数几率，返回是否有体素的占据状态改变"""
+        changed = False
+        for block_key, index, local in self._group(keys):
+            block = self.blocks.get(block_key)
+            if block is None:
+                block = self.blocks[block_key] = np.zeros(BLOCK_VOXELS, dtype=np.int8)
+                self._extent = None
+            before = block[local]
+            after = np.clip(before.astype(np.int16) + deltas[index], LOG_ODDS_MIN, LOG_ODDS_MAX)
+            block[local] = after
+            if not changed and ((before > 0) != (after > 0)).any():
+                changed = True
+        return changed
+
+    def _ray_samples(self, origin: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """各条射线从 origin 到端点（不含）按分辨率步长的采样点 (S, 3)"""
+        vectors = ends - origin
+        lengths = np.linalg.norm(vectors, axis=1)
+        steps = np.floor(lengths / self.resolution).astype(np.int64)
+        total = int(steps.sum())
+        if total > MAX_RAY_SAMPLES:
+            keep = np.arange(0, len(ends), int(np.ceil(total / MAX_RAY_SAMPLES)))
+            vectors, lengths, steps = vectors[keep], lengths[keep], steps[keep]
+            total = int(steps.sum())
+        if not total:
+            return np.empty((0, 3))
+        ray = np.repeat(np.arange(len(steps)), steps)
+        first = np.repeat(np.cumsum(steps) - steps, steps)
+        # 第k个采样点位于 k * 分辨率 处
+        fraction = (np.arange(total) - first) * self.resolution / lengths[ray]
+        return origin + vectors[ray] * fraction[:, None]
+
+    def insert(self, origin: Sequence[float], points: np.ndarray) -> bool:
+        """
+        插入一帧：origin 为传感器位置，points 为世界坐标系回波点 (N, 3)
+
+        返回地图的占据状态是否改变
+        """
+        started = time.perf_counter()
+        origin = np.asarray(origin, dtype=np.float64)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(points):
+            return False
+        vectors = points - origin
+        lengths = np.linalg.norm(vectors, axis=1)
+        hit = lengths <= self.max_range
+        far = ~hit
+        if far.any():
+            points = points.copy()
+            points[far] = origin + vectors[far] * (self.max_range / lengths[far])[:, None]
+
+        # 端点按体素去重：落在同一体素的射线几乎重合
+        end_keys, first = np.unique(self._keys(points), return_index=True)
+        hit_keys = np.unique(end_keys[hit[first]]) if hit.any() else end_keys[:0]
+        ends = self._centers(end_keys)
+        free_keys = np.unique(self._keys(self._ray_samples(origin, ends)))
+        free_keys = free_keys[~np.isin(free_keys, hit_keys, assume_unique=True)]
+
+        keys = np.concatenate([hit_keys, free_keys])
+        deltas = np.concatenate([np.full(len(hit_keys), LOG_ODDS_HIT, dtype=np.int16),
+                                 np.full(len(free_keys), -LOG_ODDS_MISS, dtype=np.int16)])
+        with self._lock:
+            changed = self._apply(keys, deltas)
+            changed = self._evict(origin) or changed
+            if changed:
+                self.version += 1
+            self.inserts += 1
+        self.last_insert_ms = (time.perf_counter() - started) * 1000.0
+        return changed
+
+    def _evict(self, center: np.ndarray) -> bool:
+        """淘汰 radius 以外的块，块数仍超过上限时淘汰最远的块；返回是否淘汰了占据体素"""
+        if not self.blocks:
+            return False
+        block_keys = np.fromiter(self.blocks.keys(), dtype=np.int64, count=len(self.blocks))
+        cells = _unpack(block_keys)
+        centers = ((cells << BLOCK_SHIFT) - _KEY_OFFSET + BLOCK_SIZE / 2).T * self.resolution
+        distance = np.linalg.norm(centers - center, axis=1)
+        evict = distance > self.radius
+        if len(block_keys) - int(evict.sum()) > self.max_blocks:
+            order = np.argsort(distance)
+            evict[order[self.max_blocks:]] = True
+        changed = False
+        if evict.any():
+            self._extent = None
+        for key in block_keys[evict].tolist():
+            block = self.blocks.pop(key)
+            changed = changed or bool((block > 0).any())
+        self.evicted += int(evict.sum())
+        return changed
+
+    def clear(self):
+        with self._lock:
+            had_occupied = any((block > 0).any() for block in self.blocks.values())
+            self.blocks = {}
+            self._extent = None
+            if had_occupied:
+                self.version += 1
+
+    # ---- 查询 ----
+
+    def _lookup(self, keys: np.ndarray) -> np.ndarray:
+        """体素键 -> 对数几率定点值（未观测为0）"""
+        values = np.zeros(len(keys), dtype=np.int8)
+        if not len(keys):
+            return values
+        with self._lock:
+            for block_key, index, local in self._group(keys):
+                block = self.blocks.get(block_key)
+                if block is not None:
+                    values[index] = block[local]
+        return values
+
+    def occupied(self, points: np.ndarray) -> np.ndarray:
+        """各点所在体素是否被占据 (N,) bool"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        return self._lookup(self._keys(points)) > 0
+
+    def probability(self, points: np.ndarray) -> np.ndarray:
+        """各点所在体素的占据概率（未观测为 0.5）"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        log_odds = self._lookup(self._keys(points)).astype(np.float64) / LOG_ODDS_SCALE
+        return 1.0 / (1.0 + np.exp(-log_odds))
+
+    def _content_extent(self) -> Optional[np.ndarray]:
+        """已分配块的包围盒 (2, 3)，地图为空时为None"""
+        with self._lock:
+            if self._extent is None and self.blocks:
+                block_keys = np.fromiter(self.blocks.keys(), dtype=np.int64, count=len(self.blocks))
+                cells = _unpack(block_keys) << BLOCK_SHIFT
+                self._extent = np.stack([cells.min(axis=1), cells.max(axis=1) + BLOCK_SIZE]) \
+                    .astype(np.float64)
+                self._extent = (self._extent - _KEY_OFFSET) * self.resolution
+            return self._extent
+
+    def _validate_clearance(self, clearance: float):
+        limit = MAX_CLEARANCE_VOXELS * self.resolution
+        if not 0 <= clearance <= limit:
+            raise ValueError(f"clearance must be between 0 and {limit:g} m "
+                             f"({MAX_CLEARANCE_VOXELS} voxels)")
+
+    def _offsets(self, clearance: float) -> np.ndarray:
+        """半径 clearance 内的体素偏移 (3, K)"""
+        r = int(np.ceil(clearance / self.resolution))
+        grid = np.mgrid[-r:r + 1, -r:r + 1, -r:r + 1].reshape(3, -1)
+        return grid[:, (grid ** 2).sum(axis=0) * self.resolution ** 2 <= clearance ** 2 + 1e-9]
+
+    def segment_hits(self, starts: np.ndarray, ends: np.ndarray, clearance: float = 0.0,
+                     start_margin: float = 0.0) -> List[Optional[np.ndarray]]:
+        """
+        一批航段 (K, 3) 与占据体素的第一个交点（考虑 clearance 膨胀），无碰撞为None
+
+        沿航段以半个体素为步长采样，每个采样点检查半径 clearance 内的体素；
+        各航段起点 start_margin 以内的采样点不检查（无人机所在位置，例如停在地面上）。
+        航段先裁剪到地图内容的包围盒（未观测的空间不会碰撞），采样点按 MAX_QUERY_KEYS 分批查询，
+        计算量和内存与航段长度无关，只取决于地图范围（OCCUPANCY_RADIUS）
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        self._validate_clearance(clearance)
+        offsets = self._offsets(clearance) if clearance > 0 else np.zeros((3, 1), dtype=np.int64)
+        if not (np.isfinite(starts).all() and np.isfinite(ends).all()):
+            raise ValueError("Path coordinates must be finite")
+        hits: List[Optional[np.ndarray]] = [None] * len(starts)
+        extent = self._content_extent()
+        if not len(starts) or extent is None:
+            return hits
+
+        # 按参数 t 裁剪到膨胀后的包围盒（slab 法）
+        vectors = ends - starts
+        lo, hi = extent[0] - clearance - self.resolution, extent[1] + clearance + self.resolution
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t0 = (lo - starts) / vectors
+            t1 = (hi - starts) / vectors
+        inside = (starts >= lo) & (starts <= hi)
+        t_min = np.where(vectors == 0, np.where(inside, 0.0, np.inf), np.minimum(t0, t1))
+        t_max = np.where(vectors == 0, np.where(inside, 1.0, -np.inf), np.maximum(t0, t1))
+        t_min = np.maximum(t_min.max(axis=1), 0.0)
+        t_max = np.minimum(t_max.min(axis=1), 1.0)
+        crossing = t_min <= t_max
+        t_min, t_max = np.where(crossing, t_min, 0.0), np.where(crossing, t_max, 0.0)
+        # 采样点取在整段的半体素网格上（与不裁剪时相同），只生成包围盒内的部分
+        with np.errstate(over="ignore"):
+            total_steps = np.ceil(np.linalg.norm(vectors, axis=1) / (self.resolution / 2))
+        base = starts
+        huge = ~(total_steps < 2.0 ** 52)
+        if huge.any():
+            # 步数超出浮点精度的航段直接在裁剪后的部分上采样
+            base = starts.copy()
+            base[huge] += vectors[huge] * t_min[huge, None]
+            vectors[huge] *= (t_max - t_min)[huge, None]
+            t_min[huge], t_max[huge] = 0.0, 1.0
+            total_steps[huge] = np.ceil(np.linalg.norm(vectors[huge], axis=1) / (self.resolution / 2))
+        first_step = np.floor(t_min * total_steps)
+        steps = (np.ceil(t_max * total_steps) - first_step).astype(np.int64) + 1
+        steps[~crossing] = 0
+        bounds = np.cumsum(steps)
+        total = int(bounds[-1])
+
+        chunk = max(1, MAX_QUERY_KEYS // offsets.shape[1])
+        for begin in range(0, total, chunk):
+            index = np.arange(begin, min(begin + chunk, total))
+            segment = np.searchsorted(bounds, index, side="right")
+            step = first_step[segment] + (index - (bounds[segment] - steps[segment]))
+            fraction = step / np.maximum(total_steps[segment], 1)
+            samples = base[segment] + vectors[segment] * fraction[:, None]
+
+            cells = self._cells(samples)
+            # 膨胀后的体素去重再查询，按采样点还原
+            keys = _pack((cells[:, :, None] + offsets[:, None, :]).reshape(3, -1))
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            occupied = (self._lookup(unique_keys) > 0)[inverse].reshape(len(samples), -1).any(axis=1)
+            if start_margin > 0:
+                occupied &= np.linalg.norm(samples - starts[segment], axis=1) >= start_margin
+            for sample in np.flatnonzero(occupied).tolist():
+                if hits[segment[sample]] is None:
+                    hits[segment[sample]] = samples[sample]
+        return hits
+
+    def segments_clear(self, starts: np.ndarray, ends: np.ndarray, clearance: float = 0.0,
+                       start_margin: float = 0.0) -> np.ndarray:
+        """一批航段是否都不经过占据体素 (K,) bool"""
+        hits = self.segment_hits(starts, ends, clearance, start_margin)
+        return np.array([hit is None for hit in hits], dtype=bool)
+
+    def check_path(self, points: Sequence[Sequence[float]],
+                   start: Optional[Sequence[float]] = None,
+                   clearance: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        检查折线路径，返回碰撞列表 [{"segment": i, "point": [x, y, z]}]
+
+        start 为无人机当前位置，其周围 clearance + 一个体素内的占据体素不计
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        margin = 0.0
+        if start is not None:
+            points = np.vstack([np.asarray(start, dtype=np.float64).reshape(1, 3), points])
+            margin = clearance + self.resolution
+        if len(points) == 1:
+            points = np.vstack([points, points])
+        hits = self.segment_hits(points[:1], points[1:2], clearance, margin) + \
+            self.segment_hits(points[1:-1], points[2:], clearance)
+        return [
+            {"segment": i, "point": [round(float(v), 3) for v in hit]}
+            for i, hit in enumerate(hits) if hit is not None
+        ]
+
+    def validate_path(self, points: Sequence[Sequence[float]],
+                      start: Optional[Sequence[float]] = None, clearance: float = 0.0):
+        """检查路径，经过占据体素时抛出ValueError"""
+        collisions = self.check_path(points, start, clearance)
+        if collisions:
+            first = collisions[0]
+            raise ValueError(f"Path blocked by obstacle: segment {first['segment']} "
+                             f"at ({', '.join(f'{v:.1f}' for v in first['point'])})")
+
+    def occupied_voxels(self) -> np.ndarray:
+        """所有占据体素的中心 (N, 3) float32"""
+        with self._lock:
+            items = list(self.blocks.items())
+        centers = []
+        for block_key, block in items:
+            local = np.flatnonzero(block > 0)
+            if not len(local):
+                continue
+            cells = _unpack(np.array([block_key], dtype=np.int64)) << BLOCK_SHIFT
+            cells = cells + np.stack([local >> (2 * BLOCK_SHIFT),
+                                      (local >> BLOCK_SHIFT) & BLOCK_MASK,
+                                      local & BLOCK_MASK])
+            centers.append(((cells - _KEY_OFFSET).T + 0.5) * self.resolution)
+        if not centers:
+            return np.empty((0, 3), dtype=np.float32)
+        return np.concatenate(centers).astype(np.float32)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            blocks = list(self.blocks.values())
+        return {
+            "resolution": self.resolution,
+            "version": self.version,
+            "blocks": len(blocks),
+            "max_blocks": self.max_blocks,
+            "memory_bytes": len(blocks) * BLOCK_VOXELS,
+            "occupied_voxels": int(sum(int((block > 0).sum()) for block in blocks)),
+            "free_voxels": int(sum(int((block < 0).sum()) for block in blocks)),
+            "inserts": self.inserts,
+            "evicted_blocks": self.evicted,
+            "last_insert_ms": round(self.last_insert_ms, 3) if self.last_insert_ms else None
+        }
+
+
+_insert_executor: Optional[ThreadPoolExecutor] = None
+
+
+def insert_executor() -> ThreadPoolExecutor:
+    """所有无人机共享的地图插入线程（numpy 运算期间释放GIL）"""
+    global _insert_executor
+    if _insert_executor is None:
+        _insert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="occupancy")
+    return _insert_executor
+
+
+class OccupancyMapper:
+    """单架无人机的占据地图，OCCUPANCY_ENABLED 时由 LiDAR 和深度图像流持续更新"""
+
+    def __init__(self, client):
+        self.client = client
+        self.map = OccupancyMap(settings.OCCUPANCY_RESOLUTION, settings.OCCUPANCY_MAX_RANGE,
+                                settings.OCCUPANCY_RADIUS, settings.OCCUPANCY_MAX_BLOCKS)
+        self.frames = 0
+        self.errors = 0
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        """订阅 LiDAR 和深度图像流（未启用或没有可用传感器时不做任何事）"""
+        if not settings.OCCUPANCY_ENABLED or self._tasks:
+            return
+        if self.client.lidar.specs:
+            self._tasks.append(asyncio.create_task(self._run_lidar()))
+        depth = [i for i, spec in enumerate(self.client.camera.specs) if spec.is_depth]
+        if depth:
+            self._tasks.append(asyncio.create_task(self._run_camera(depth)))
+        if not self._tasks:
+            logger.warning("Occupancy map enabled but no LiDAR or depth camera configured")
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def insert(self, origin: Sequence[float], points: np.ndarray):
+        await asyncio.get_event_loop().run_in_executor(
+            insert_executor(), self.map.insert, origin, points)
+        self.frames += 1
+
+    async def _run_lidar(self):
+        lidar = self.client.lidar
+        subscriber = lidar.subscribe(list(range(len(lidar.specs))))
+        try:
+            while True:
+                for frame in await subscriber.next_frames():
+                    try:
+                        await self.insert(frame.origin, frame.points)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Error inserting LiDAR frame: {e}")
+        finally:
+            lidar.unsubscribe(subscriber)
+
+    async def _run_camera(self, streams: List[int]):
+        camera = self.client.camera
+        viewer = camera.subscribe(streams)
+        try:
+            while True:
+                for frame in await viewer.next_frames():
+                    spec = camera.specs[frame.stream]
+                    try:
+                        fov = await camera.fov(spec.camera)
+                        # 先按地图分辨率降采样，同一体素的像素只插入一条射线
+                        points = await asyncio.get_event_loop().run_in_executor(
+                            insert_executor(), lambda: depth_to_points(
+                                frame.array, fov, frame.position, frame.orientation,
+                                planar=spec.image_type == "depth",
+                                max_depth=settings.POINTCLOUD_MAX_DEPTH,
+                                voxel=self.map.resolution))
+                        await self.insert(frame.position, points)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Error inserting depth frame: {e}")
+        finally:
+            camera.unsubscribe(viewer)
+
+    def validate_target(self, points: Sequence[Sequence[float]],
+                        start: Optional[Sequence[float]] = None):
+        """启用时检查路径（按 OCCUPANCY_CLEARANCE 膨胀），经过障碍物时抛出ValueError"""
+        if settings.OCCUPANCY_ENABLED:
+            self.map.validate_path(points, start, settings.OCCUPANCY_CLEARANCE)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.OCCUPANCY_ENABLED,
+            "running": self.enabled,
+            "frames": self.frames,
+            "errors": self.errors,
+            "range": self.map.max_range,
+            "radius": self.map.radius,
+            "clearance": settings.OCCUPANCY_CLEARANCE,
+            **self.map.to_dict()
+        }
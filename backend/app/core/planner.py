@@ -0,0 +1,326 @@
+"""
+航线规划
+
+从当前位置到目标点的无碰撞航点列表，同时避开安全包络（地理围栏、高度带、禁飞区）和占据地图：
+
+1. 直飞航段通过检查时直接返回目标点（不建网格）
+2. 否则在起点和终点包围盒外扩 PLANNER_MARGIN 的范围内建立粗网格（边长 PLANNER_GRID_CELL），
+   网格节点按禁飞区和占据体素（外扩 OCCUPANCY_CLEARANCE）标记为阻挡，再膨胀一个节点，
+   用 26 邻接 A* 搜索节点路径
+3. 节点路径只保留拐点，再做捷径平滑：从当前航点出发，一次批量检查到后续所有航点的航段，
+   取能直达的最远航点。保留下来的每个航段都经过与 goto 相同的精确检查，结果必然无碰撞
+4. 某个航段无法通过（粗网格漏掉了狭窄的障碍）时网格边长减半重试，直到 PLANNER_MIN_CELL
+
+规划结果按 (量化后的起点、终点、禁飞区版本、占据地图版本) 缓存在 LRU 中，重复的巡逻航线
+和相同的指令只规划一次（无法到达的结果也缓存）；地图变化后版本号改变，旧结果自然失效。
+命中缓存时用实际的起点和终点重新检查一遍（一次批量检查），不通过则重新规划。
+"""
+import heapq
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.occupancy import OccupancyMap
+from app.core.safety import describe_violations, safety_engine
+
+logger = logging.getLogger(__name__)
+
+# 26 邻接的节点偏移
+_NEIGHBORS = [(di, dj, dk) for di in (-1, 0, 1) for dj in (-1, 0, 1) for dk in (-1, 0, 1)
+              if di or dj or dk]
+
+
+class Plan(NamedTuple):
+    """规划结果：航点 (N, 3)（不含起点，最后一个为目标点），是否来自缓存"""
+    waypoints: np.ndarray
+    cached: bool
+
+
+def _dilate(blocked: np.ndarray, radius: int) -> np.ndarray:
+    """按立方体邻域膨胀阻挡节点（各轴分别膨胀）"""
+    result = blocked.copy()
+    for axis in range(3):
+        source = result.copy()
+        for shift in range(1, radius + 1):
+            if shift >= source.shape[axis]:
+                break
+            lo = [slice(None)] * 3
+            hi = [slice(None)] * 3
+            lo[axis] = slice(0, -shift)
+            hi[axis] = slice(shift, None)
+            result[tuple(lo)] |= source[tuple(hi)]
+            result[tuple(hi)] |= source[tuple(lo)]
+    return result
+
+
+def astar(blocked: np.ndarray, start: Tuple[int, int, int],
+          goal: Tuple[int, int, int]) -> Optional[List[Tuple[int, int, int]]]:
+    """26 邻接网格上的 A*（代价为欧氏距离，单位为节点间距），找不到路径返回None"""
+    nx, ny, nz = blocked.shape
+    flat = blocked.ravel().tolist()
+    offsets = [(di, dj, dk, (di * ny + dj) * nz + dk, math.sqrt(di * di + dj * dj + dk * dk))
+               for di, dj, dk in _NEIGHBORS]
+    gi, gj, gk = goal
+    start_index = (start[0] * ny + start[1]) * nz + start[2]
+    goal_index = (gi * ny + gj) * nz + gk
+    cost = {start_index: 0.0}
+    parent: Dict[int, int] = {}
+    closed = set()
+    heap = [(math.dist(start, goal), start_index, start)]
+    while heap:
+        _, index, (i, j, k) = heapq.heappop(heap)
+        if index == goal_index:
+            path = [index]
+            while path[-1] in parent:
+                path.append(parent[path[-1]])
+            path.reverse()
+            return [(n // (ny * nz), n // nz % ny, n % nz) for n in path]
+        if index in closed:
+            continue
+        closed.add(index)
+        base = cost[index]
+        for di, dj, dk, delta, step in offsets:
+            a, b, c = i + di, j + dj, k + dk
+            if not (0 <= a < nx and 0 <= b < ny and 0 <= c < nz):
+                continue
+            neighbor = index + delta
+            if flat[neighbor] or neighbor in closed:
+                continue
+            g = base + step
+            if g < cost.get(neighbor, math.inf):
+                cost[neighbor] = g
+                parent[neighbor] = index
+                h = math.sqrt((a - gi) ** 2 + (b - gj) ** 2 + (c - gk) ** 2)
+                heapq.heappush(heap, (g + h, neighbor, (a, b, c)))
+    return None
+
+
+def _turning_points(path: List[Tuple[int, int, int]]) -> List[int]:
+    """节点路径中方向改变处的序号（含首尾）"""
+    keep = [0]
+    for n in range(1, len(path) - 1):
+        before = tuple(p - q for p, q in zip(path[n], path[n - 1]))
+        after = tuple(p - q for p, q in zip(path[n + 1], path[n]))
+        if before != after:
+            keep.append(n)
+    keep.append(len(path) - 1)
+    return keep
+
+
+class PathPlanner:
+    """单架无人机的航线规划和缓存（在规划线程中运行，不加锁）"""
+
+    def __init__(self, occupancy_map: OccupancyMap):
+        self.occupancy_map = occupancy_map
+        # 量化键 -> 航点数组，或无法到达时的错误信息
+        self.cache: "OrderedDict[Tuple, Union[np.ndarray, str]]" = OrderedDict()
+        self.plans = 0
+        self.hits = 0
+        self.misses = 0
+        self.detours = 0
+        self.last_plan_ms: Optional[float] = None
+
+    # ---- 航段检查 ----
+
+    @property
+    def _use_occupancy(self) -> bool:
+        return settings.OCCUPANCY_ENABLED and bool(self.occupancy_map.blocks)
+
+    def segments_clear(self, starts: np.ndarray, ends: np.ndarray,
+                       from_vehicle: bool = False) -> np.ndarray:
+        """一批航段是否同时通过安全包络和占据地图检查；from_vehicle 表示航段都从无人机当前位置出发"""
+        if not len(starts):
+            return np.ones(0, dtype=bool)
+        clear = safety_engine.segments_safe(starts, ends, from_vehicle)
+        if self._use_occupancy and clear.any():
+            clearance = settings.OCCUPANCY_CLEARANCE
+            margin = clearance + self.occupancy_map.resolution if from_vehicle else 0.0
+            index = np.flatnonzero(clear)
+            clear[index] = self.occupancy_map.segments_clear(
+                np.asarray(starts).reshape(-1, 3)[index], np.asarray(ends).reshape(-1, 3)[index],
+                clearance, margin)
+        return clear
+
+    def path_clear(self, start: np.ndarray, waypoints: np.ndarray) -> bool:
+        points = np.vstack([start, waypoints])
+        return bool(self.segments_clear(points[:1], points[1:2], from_vehicle=True).all()) and \
+            bool(self.segments_clear(points[1:-1], points[2:]).all())
+
+    # ---- 规划 ----
+
+    def _key(self, start: np.ndarray, goal: np.ndarray) -> Tuple:
+        quantum = settings.PLANNER_CACHE_QUANTUM
+        return (tuple(np.round(start / quantum).astype(np.int64).tolist()),
+                tuple(np.round(goal / quantum).astype(np.int64).tolist()),
+                safety_engine.version,
+                self.occupancy_map.version if settings.OCCUPANCY_ENABLED else None)
+
+    def plan(self, start: Sequence[float], goal: Sequence[float]) -> Plan:
+        """
+        规划从 start 到 goal 的航线，返回 Plan
+
+        目标点本身违反安全包络或被占据时抛出 ValueError（与直飞检查相同的信息）；
+        找不到路径时抛出 ValueError
+        """
+        started = time.perf_counter()
+        start = np.asarray(start, dtype=np.float64)
+        goal = np.asarray(goal, dtype=np.float64)
+        self.plans += 1
+        key = self._key(start, goal)
+        cached = self.cache.get(key)
+        if isinstance(cached, str):
+            # 同一地图版本下已确认无法到达
+            self.cache.move_to_end(key)
+            self.hits += 1
+            raise ValueError(cached)
+        if cached is not None:
+            waypoints = np.vstack([cached[:-1], goal])
+            if self.path_clear(start, waypoints):
+                self.cache.move_to_end(key)
+                self.hits += 1
+                self.last_plan_ms = (time.perf_counter() - started) * 1000.0
+                return Plan(waypoints, True)
+        self.misses += 1
+
+        if self.path_clear(start, goal[None, :]):
+            waypoints = goal[None, :]
+        else:
+            self.detours += 1
+            try:
+                waypoints = self._search(start, goal)
+            except ValueError as e:
+                self._store(key, str(e))
+                raise
+        self._store(key, waypoints)
+        self.last_plan_ms = (time.perf_counter() - started) * 1000.0
+        return Plan(waypoints, False)
+
+    def _store(self, key: Tuple, value: Union[np.ndarray, str]):
+        """写入缓存：航点数组，或无法到达时的错误信息"""
+        self.cache[key] = value
+        while len(self.cache) > settings.PLANNER_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def _search(self, start: np.ndarray, goal: np.ndarray) -> np.ndarray:
+        """直飞不通时在网格上搜索，网格边长逐次减半"""
+        # 目标点本身不可达时直接报告原因
+        safety_engine.validate_path([goal])
+        if self._use_occupancy:
+            self.occupancy_map.validate_path([goal], None, settings.OCCUPANCY_CLEARANCE)
+        cell = settings.PLANNER_GRID_CELL
+        while True:
+            waypoints = self._search_grid(start, goal, cell)
+            if waypoints is not None:
+                return waypoints
+            if cell / 2 < settings.PLANNER_MIN_CELL:
+                break
+            cell /= 2
+        violations = safety_engine.check_path([goal], start)
+        reason = describe_violations(violations) if violations else "blocked by obstacle"
+        raise ValueError(f"No collision-free path found to ({', '.join(f'{v:.1f}' for v in goal)}), "
+                         f"direct path: {reason}")
+
+    def _grid(self, start: np.ndarray, goal: np.ndarray,
+              cell: float) -> Tuple[np.ndarray, float, Tuple[int, int, int]]:
+        """搜索范围的网格原点、边长和尺寸；节点数超过上限时放大边长"""
+        margin = settings.PLANNER_MARGIN
+        lo = np.minimum(start, goal) - margin
+        hi = np.maximum(start, goal) + margin
+        # 不低于两个端点中较低者，不高于 MAX_ALTITUDE（NED，z 向下）
+        lo[2] = max(lo[2], -settings.MAX_ALTITUDE)
+        hi[2] = max(start[2], goal[2])
+        if settings.SAFETY_MIN_ALTITUDE is not None:
+            hi[2] = min(hi[2], -settings.SAFETY_MIN_ALTITUDE)
+        extent = np.maximum(hi - lo, 0.0)
+        count = np.prod(np.floor(extent / cell) + 1)
+        if count > settings.PLANNER_MAX_CELLS:
+            cell *= (count / settings.PLANNER_MAX_CELLS) ** (1.0 / 3.0)
+        shape = tuple(int(n) for n in np.floor(extent / cell) + 1)
+        return lo, cell, shape
+
+    def _blocked(self, origin: np.ndarray, cell: float,
+                 shape: Tuple[int, int, int]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """网格节点的阻挡标记（禁飞区和占据体素），返回 (膨胀后, 膨胀前, 膨胀半径)"""
+        grid = np.indices(shape).reshape(3, -1).T * cell + origin
+        blocked = ~safety_engine.segments_safe(grid, grid)
+        blocked = blocked.reshape(shape)
+        radius = 1
+        if self._use_occupancy:
+            voxels = self.occupancy_map.occupied_voxels()
+            cells = np.rint((voxels - origin) / cell).astype(np.int64)
+            inside = ((cells >= 0) & (cells < np.array(shape))).all(axis=1)
+            cells = cells[inside]
+            blocked[cells[:, 0], cells[:, 1], cells[:, 2]] = True
+            radius = max(1, math.ceil((settings.OCCUPANCY_CLEARANCE +
+                                       self.occupancy_map.resolution) / cell))
+        return _dilate(blocked, radius), blocked, radius
+
+    def _search_grid(self, start: np.ndarray, goal: np.ndarray,
+                     cell: float) -> Optional[np.ndarray]:
+        origin, cell, shape = self._grid(start, goal, cell)
+        dilated, raw, radius = self._blocked(origin, cell, shape)
+        limit = np.array(shape) - 1
+        nodes = []
+        for point in (start, goal):
+            node = np.clip(np.rint((point - origin) / cell).astype(np.int64), 0, limit)
+            # 端点附近只保留真实的阻挡，不做膨胀（无人机已在此处 / 目标点已检查）
+            lo = np.maximum(node - radius, 0)
+            hi = node + radius + 1
+            region = tuple(slice(a, b) for a, b in zip(lo, hi))
+            dilated[region] = raw[region]
+            dilated[tuple(node)] = False
+            nodes.append(tuple(int(n) for n in node))
+        path = astar(dilated, nodes[0], nodes[1])
+        if path is None:
+            return None
+        points = np.array([path[n] for n in _turning_points(path)], dtype=np.float64) * cell + origin
+        points[0] = start
+        points[-1] = goal
+        return self._shortcut(points)
+
+    def _shortcut(self, points: np.ndarray) -> Optional[np.ndarray]:
+        """捷径平滑：每步批量检查到后续所有航点的航段，取能直达的最远航点"""
+        result = []
+        current = 0
+        while current < len(points) - 1:
+            candidates = points[current + 1:]
+            clear = self.segments_clear(np.broadcast_to(points[current], candidates.shape),
+                                        candidates, from_vehicle=current == 0)
+            reachable = np.flatnonzero(clear)
+            if not len(reachable):
+                return None
+            current += int(reachable[-1]) + 1
+            result.append(points[current])
+        return np.array(result)
+
+    def clear_cache(self):
+        self.cache.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.PLANNER_ENABLED,
+            "plans": self.plans,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "detours": self.detours,
+            "cache_size": len(self.cache),
+            "cache_capacity": settings.PLANNER_CACHE_SIZE,
+            "last_plan_ms": round(self.last_plan_ms, 3) if self.last_plan_ms else None
+        }
+
+
+_plan_executor: Optional[ThreadPoolExecutor] = None
+
+
+def plan_executor() -> ThreadPoolExecutor:
+    """所有无人机共享的规划线程（规划串行执行，缓存无需加锁）"""
+    global _plan_executor
+    if _plan_executor is None:
+        _plan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")
+    return _plan_executor
@@ -0,0 +1,103 @@
+"""
+深度图像转点云
+
+把 AirSim 的浮点深度图像（DepthPlanar / DepthPerspective，单位米）转换为世界坐标系（NED）
+下的 (N, 3) float32 点云，全部为 NumPy 向量运算：
+
+- 每种分辨率/视场角的像素射线表只计算一次（lru_cache），按 (3, H*W) 存放
+- 相机姿态旋转用一次 3x3 @ 3xN 矩阵乘法作用于射线表，再乘以深度、加上相机位置
+- 无效像素（非有限值、不大于 0、超过 max_depth，例如天空）用索引一次性剔除
+- 体素降采样：点坐标量化后打包为 int64 键，np.unique 去重，输出体素中心
+
+相机坐标系与 AirSim 一致：x 向前，y 向右，z 向下；像素 (行 r, 列 c) 对应射线
+[1, (c + 0.5 - W/2) / f, (r + 0.5 - H/2) / f]，f = W / (2 tan(fov/2))。
+DepthPlanar 为沿光轴的距离，点 = 射线 * 深度；DepthPerspective 为到相机的直线距离，
+点 = 单位射线 * 深度。
+"""
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+
+# 体素键每个轴占 21 位（有符号范围 ±2^20 个体素）
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+
+@lru_cache(maxsize=16)
+def ray_table(width: int, height: int, fov_degrees: float, planar: bool = True) -> np.ndarray:
+    """相机坐标系下每个像素的射线，(3, height*width) float32，只读"""
+    focal = width / (2.0 * np.tan(np.radians(fov_degrees) / 2.0))
+    cols = (np.arange(width, dtype=np.float64) + 0.5 - width / 2.0) / focal
+    rows = (np.arange(height, dtype=np.float64) + 0.5 - height / 2.0) / focal
+    rays = np.empty((3, height, width), dtype=np.float64)
+    rays[0] = 1.0
+    rays[1] = cols[None, :]
+    rays[2] = rows[:, None]
+    rays = rays.reshape(3, -1)
+    if not planar:
+        rays /= np.linalg.norm(rays, axis=0)
+    rays = rays.astype(np.float32)
+    rays.flags.writeable = False
+    return rays
+
+
+def quaternion_matrix(w: float, x: float, y: float, z: float) -> np.ndarray:
+    """四元数（w, x, y, z）对应的旋转矩阵，float32"""
+    n = w * w + x * x + y * y + z * z
+    if n == 0.0:
+        return np.eye(3, dtype=np.float32)
+    s = 2.0 / n
+    return np.array([
+        [1.0 - s * (y * y + z * z), s * (x * y - w * z), s * (x * z + w * y)],
+        [s * (x * y + w * z), 1.0 - s * (x * x + z * z), s * (y * z - w * x)],
+        [s * (x * z - w * y), s * (y * z + w * x), 1.0 - s * (x * x + y * y)],
+    ], dtype=np.float32)
+
+
+def _voxel_centers(columns: np.ndarray, voxel: float) -> np.ndarray:
+    """(3, N) 点坐标 -> 被占据体素的中心 (M, 3)"""
+    cells = np.floor(columns * (1.0 / voxel)).astype(np.int64)
+    cells += _KEY_OFFSET
+    keys = (cells[0] << (2 * _KEY_BITS)) | (cells[1] << _KEY_BITS) | cells[2]
+    keys = np.unique(keys)
+    centers = np.empty((keys.size, 3), dtype=np.float32)
+    centers[:, 0] = (keys >> (2 * _KEY_BITS)) & _KEY_MASK
+    centers[:, 1] = (keys >> _KEY_BITS) & _KEY_MASK
+    centers[:, 2] = keys & _KEY_MASK
+    centers -= _KEY_OFFSET - 0.5
+    centers *= voxel
+    return centers
+
+
+def voxel_downsample(points: np.ndarray, voxel: float) -> np.ndarray:
+    """体素降采样：(N, 3) 点云中每个被占据的体素输出一个体素中心，返回 (M, 3) float32"""
+    return _voxel_centers(np.asarray(points).T, voxel)
+
+
+def depth_to_points(depth: np.ndarray, fov_degrees: float = 90.0,
+                    position: Sequence[float] = (0.0, 0.0, 0.0),
+                    orientation: Sequence[float] = (1.0, 0.0, 0.0, 0.0),
+                    planar: bool = True, max_depth: float = 100.0,
+                    voxel: Optional[float] = None) -> np.ndarray:
+    """
+    深度图像（米）转世界坐标系点云，返回 (N, 3) float32
+
+    position/orientation 为相机在世界坐标系下的位置和姿态四元数（w, x, y, z）；
+    voxel 大于 0 时按体素降采样
+    """
+    height, width = depth.shape
+    rays = ray_table(width, height, float(fov_degrees), planar)
+    depth = depth.reshape(-1)
+
+    points = quaternion_matrix(*orientation) @ rays
+    points *= depth
+    points += np.asarray(position, dtype=np.float32)[:, None]
+
+    valid = (depth > 0.0) & (depth <= max_depth)
+    if not valid.all():
+        points = points.take(np.flatnonzero(valid), axis=1)
+    if voxel:
+        return _voxel_centers(points, voxel)
+    return np.ascontiguousarray(points.T)
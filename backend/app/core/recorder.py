@@ -0,0 +1,262 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import logging
+
+from app.core.config import settings
+from app.core.history import HISTORY_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# 记录类型
+KIND_STATE = 0
+KIND_COMMAND = 1
+
+CHUNK_PREFIX = {KIND_STATE: "states", KIND_COMMAND: "commands"}
+
+# 索引文件每行对应一次批量写入
+INDEX_DTYPE = np.dtype([
+    ("kind", "u1"),          # 记录类型
+    ("chunk", "u4"),         # 分块编号
+    ("offset", "u8"),        # 批次在分块文件中的字节偏移
+    ("count", "u4"),         # 批次记录数
+    ("first_time", "f8"),    # 批次第一条记录的时间
+    ("last_time", "f8"),     # 批次最后一条记录的时间
+])
+
+# 指令记录头：时间戳 + JSON负载长度
+COMMAND_HEADER = struct.Struct("<dI")
+
+INDEX_FILE = "index.bin"
+
+
+def chunk_name(kind: int, chunk: int) -> str:
+    """分块文件名"""
+    return f"{CHUNK_PREFIX[kind]}_{chunk:06d}.bin"
+
+
+class _ChunkWriter:
+    """某一类记录的分块文件写入器"""
+
+    def __init__(self, directory: str, kind: int, max_bytes: int):
+        self.directory = directory
+        self.kind = kind
+        self.max_bytes = max_bytes
+        self.chunk = -1
+        self.offset = 0
+        self.file = None
+
+    def write(self, payload: bytes) -> tuple:
+        """写入一批数据，返回(分块编号, 偏移)"""
+        if self.file is None or (self.offset and self.offset + len(payload) > self.max_bytes):
+            self._rotate()
+        chunk, offset = self.chunk, self.offset
+        self.file.write(payload)
+        self.offset += len(payload)
+        return chunk, offset
+
+    def _rotate(self):
+        self.close()
+        self.chunk += 1
+        self.offset = 0
+        self.file = open(os.path.join(self.directory, chunk_name(self.kind, self.chunk)), "wb")
+
+    def sync(self):
+        if self.file:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+
+class FlightRecorder:
+    """
+    飞行记录器：追加记录状态采样和控制指令
+
+    热路径只把记录放入内存队列，由后台线程批量写入分块文件，并按
+    RECORDER_FSYNC_INTERVAL 批量fsync。状态分块是连续的 HISTORY_DTYPE 记录，
+    可直接用 np.memmap 打开；指令分块是 COMMAND_HEADER + JSON 的变长记录；
+    index.bin 为 INDEX_DTYPE 数组，用于按时间快速定位。
+    """
+
+    def __init__(self):
+        self.directory: Optional[str] = None
+        self.dropped_records = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.RECORDER_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_recording(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, directory: Optional[str] = None):
+        """开始新的记录会话"""
+        if self.is_recording:
+            return
+        session = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.directory = directory or os.path.join(settings.RECORDER_DIR, session)
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._writer_loop, name="flight-recorder",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"Flight recorder writing to {self.directory}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止记录，写完队列中剩余的数据"""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record_state(self, timestamp: float, position: Sequence[float],
+                     attitude: Sequence[float], velocity: Sequence[float], flags: int):
+        """记录一个状态采样（不阻塞）"""
+        if self._thread is not None:
+            self._put((KIND_STATE, (timestamp, position, attitude, velocity, flags)))
+
+    def record_command(self, command: str, parameters: Optional[Dict[str, Any]] = None,
+                       source: str = "api"):
+        """记录一条控制指令（不阻塞）"""
+        if self._thread is not None:
+            self._put((KIND_COMMAND, (time.time(), {
+                "command": command,
+                "parameters": parameters or {},
+                "source": source
+            })))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_records += 1
+
+    def _drain(self, block: bool) -> List[tuple]:
+        """取出队列中当前所有记录"""
+        items = []
+        try:
+            items.append(self._queue.get(timeout=0.1) if block else self._queue.get_nowait())
+            while True:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+
+    def _writer_loop(self):
+        """后台写入线程"""
+        writers = {
+            kind: _ChunkWriter(self.directory, kind, settings.RECORDER_CHUNK_BYTES)
+            for kind in CHUNK_PREFIX
+        }
+        index = open(os.path.join(self.directory, INDEX_FILE), "ab")
+        last_sync = time.monotonic()
+        try:
+            while True:
+                stopping = self._stop_event.is_set()
+                items = self._drain(block=not stopping)
+                if items:
+                    self._write_batch(items, writers, index)
+                if stopping and not items:
+                    break
+                if time.monotonic() - last_sync >= settings.RECORDER_FSYNC_INTERVAL:
+                    for writer in writers.values():
+                        writer.sync()
+                    index.flush()
+                    os.fsync(index.fileno())
+                    last_sync = time.monotonic()
+        except Exception as e:
+            logger.error(f"Flight recorder error: {e}")
+        finally:
+            for writer in writers.values():
+                writer.close()
+            index.flush()
+            os.fsync(index.fileno())
+            index.close()
+
+    def _write_batch(self, items: List[tuple], writers: Dict[int, _ChunkWriter], index):
+        """写入一批记录并追加索引"""
+        states = [data for kind, data in items if kind == KIND_STATE]
+        commands = [data for kind, data in items if kind == KIND_COMMAND]
+        entries = []
+
+        if states:
+            records = np.array(states, dtype=HISTORY_DTYPE)
+            chunk, offset = writers[KIND_STATE].write(records.tobytes())
+            entries.append((KIND_STATE, chunk, offset, len(records),
+                            records["time"][0], records["time"][-1]))
+
+        if commands:
+            parts = []
+            for timestamp, payload in commands:
+                body = json.dumps(payload).encode("utf-8")
+                parts.append(COMMAND_HEADER.pack(timestamp, len(body)))
+                parts.append(body)
+            chunk, offset = writers[KIND_COMMAND].write(b"".join(parts))
+            entries.append((KIND_COMMAND, chunk, offset, len(commands),
+                            commands[0][0], commands[-1][0]))
+
+        index.write(np.array(entries, dtype=INDEX_DTYPE).tobytes())
+
+
+class FlightRecording:
+    """读取一次记录会话"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = np.fromfile(os.path.join(directory, INDEX_FILE), dtype=INDEX_DTYPE)
+
+    def _entries(self, kind: int, start: Optional[float], end: Optional[float]) -> np.ndarray:
+        """按时间筛选索引项"""
+        entries = self.index[self.index["kind"] == kind]
+        if start is not None:
+            entries = entries[entries["last_time"] >= start]
+        if end is not None:
+            entries = entries[entries["first_time"] <= end]
+        return entries
+
+    def states(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """读取时间范围内的状态记录"""
+        parts = []
+        for chunk in np.unique(self._entries(KIND_STATE, start, end)["chunk"]):
+            path = os.path.join(self.directory, chunk_name(KIND_STATE, int(chunk)))
+            # 异常退出时最后一条记录可能不完整，只映射完整的记录
+            count = os.path.getsize(path) // HISTORY_DTYPE.itemsize
+            if count == 0:
+                continue
+            records = np.memmap(path, dtype=HISTORY_DTYPE, mode="r", shape=(count,))
+            lo = 0 if start is None else np.searchsorted(records["time"], start, side="left")
+            hi = len(records) if end is None else \
+                np.searchsorted(records["time"], end, side="right")
+            parts.append(records[lo:hi])
+        if not parts:
+            return np.zeros(0, dtype=HISTORY_DTYPE)
+        return np.concatenate(parts)
+
+    def commands(self, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """按时间顺序读取时间范围内的指令记录"""
+        for entry in self._entries(KIND_COMMAND, start, end):
+            path = os.path.join(self.directory, chunk_name(KIND_COMMAND, int(entry["chunk"])))
+            with open(path, "rb") as f:
+                f.seek(int(entry["offset"]))
+                for _ in range(int(entry["count"])):
+                    timestamp, length = COMMAND_HEADER.unpack(f.read(COMMAND_HEADER.size))
+                    payload = json.loads(f.read(length))
+                    if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+                        yield {"time": timestamp, **payload}
+
+
+# 全局飞行记录器
+flight_recorder = FlightRecorder()
@@ -0,0 +1,190 @@
+import airsim
+import math
+import threading
+import time
+import numpy as np
+from typing import Optional
+import logging
+
+from app.core.config import settings
+from app.core.history import HISTORY_DTYPE, FLAG_FLYING
+from app.core.recorder import FlightRecording
+
+logger = logging.getLogger(__name__)
+
+# 多无人机回放时各无人机沿y轴错开的距离(米)
+VEHICLE_SPACING = 10.0
+
+
+class _CompletedFuture:
+    """与AirSim异步调用返回值接口一致的已完成future"""
+
+    def __init__(self, duration: float = 0.0):
+        self._duration = duration
+
+    def join(self):
+        if self._duration > 0:
+            time.sleep(self._duration)
+
+
+def synthetic_track(seconds: float = 600.0, rate: float = 10.0) -> np.ndarray:
+    """生成一段合成的绕圈飞行轨迹，没有记录文件时使用"""
+    count = int(seconds * rate)
+    records = np.zeros(count, dtype=HISTORY_DTYPE)
+    t = np.arange(count) / rate
+    angle = t * 2 * np.pi / 60.0
+    records["time"] = t
+    records["position"][:, 0] = 50.0 * np.cos(angle)
+    records["position"][:, 1] = 50.0 * np.sin(angle)
+    records["position"][:, 2] = -20.0
+    records["attitude"][:, 2] = np.degrees(angle + np.pi / 2) % 360.0 - 180.0
+    records["velocity"][:, 0] = -50.0 * 2 * np.pi / 60.0 * np.sin(angle)
+    records["velocity"][:, 1] = 50.0 * 2 * np.pi / 60.0 * np.cos(angle)
+    records["flags"] = FLAG_FLYING
+    return records
+
+
+class ReplayClient:
+    """
+    回放后端：实现DroneClient使用的MultirotorClient接口子集
+
+    状态按记录时间（乘以回放倍速）循环回放；飞行指令只被接受并立即完成，
+    不改变回放轨迹。用于在没有AirSim的环境中运行和压测服务。
+    配置了 VEHICLES 时每架无人机回放同一轨迹，按 VEHICLE_SPACING 错开。
+    """
+
+    def __init__(self, recording: Optional[str] = None, speed: float = 1.0,
+                 command_delay: float = 0.0):
+        if recording:
+            records = np.array(FlightRecording(recording).states())
+            if len(records) == 0:
+                raise ValueError(f"Recording has no state samples: {recording}")
+        else:
+            records = synthetic_track()
+        self.records = records
+        self.speed = speed
+        self.command_delay = command_delay
+        self._times = records["time"] - records["time"][0]
+        self._duration = max(float(self._times[-1]), 1e-3)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._api_control = False
+        self._armed = False
+        logger.info(f"Replay backend loaded {len(records)} samples "
+                    f"({self._duration:.1f}s at {speed}x)")
+
+    def _current_record(self):
+        """按回放时钟取当前采样"""
+        elapsed = ((time.monotonic() - self._started) * self.speed) % self._duration
+        index = int(np.searchsorted(self._times, elapsed, side="right")) - 1
+        return self.records[max(index, 0)]
+
+    def confirmConnection(self):
+        return True
+
+    def ping(self):
+        return True
+
+    def enableApiControl(self, is_enabled, vehicle_name=''):
+        self._api_control = is_enabled
+
+    def isApiControlEnabled(self, vehicle_name=''):
+        return self._api_control
+
+    def armDisarm(self, arm, vehicle_name=''):
+        self._armed = arm
+        return True
+
+    def listVehicles(self):
+        return list(settings.VEHICLES) or ["Drone1"]
+
+    def _vehicle_offset(self, vehicle_name: str) -> float:
+        names = self.listVehicles()
+        return VEHICLE_SPACING * (names.index(vehicle_name) if vehicle_name in names else 0)
+
+    def reset(self):
+        with self._lock:
+            self._started = time.monotonic()
+
+    def getMultirotorState(self, vehicle_name=''):
+        record = self._current_record()
+        state = airsim.MultirotorState()
+        # kinematics_estimated 默认值是类级共享实例，必须新建
+        kinematics = airsim.KinematicsState()
+        x, y, z = (float(v) for v in record["position"])
+        kinematics.position = airsim.Vector3r(x, y + self._vehicle_offset(vehicle_name), z)
+        kinematics.linear_velocity = airsim.Vector3r(*(float(v) for v in record["velocity"]))
+        roll, pitch, yaw = (math.radians(float(v)) for v in record["attitude"])
+        kinematics.orientation = airsim.to_quaternion(pitch, roll, yaw)
+        state.kinematics_estimated = kinematics
+        state.landed_state = airsim.LandedState.Flying if record["flags"] & FLAG_FLYING \
+            else airsim.LandedState.Landed
+        state.timestamp = time.time_ns()
+        return state
+
+    # 传感器：由当前采样推算的理想读数
+    def getImuData(self, imu_name='', vehicle_name=''):
+        record = self._current_record()
+        data = airsim.ImuData()
+        roll, pitch, yaw = (math.radians(float(v)) for v in record["attitude"])
+        data.orientation = airsim.to_quaternion(pitch, roll, yaw)
+        data.linear_acceleration = airsim.Vector3r(0.0, 0.0, -9.80665)
+        data.time_stamp = time.time_ns()
+        return data
+
+    def getBarometerData(self, barometer_name='', vehicle_name=''):
+        record = self._current_record()
+        data = airsim.BarometerData()
+        data.altitude = -float(record["position"][2])
+        # 标准大气
+        data.pressure = 101325.0 * (1.0 - 2.25577e-5 * data.altitude) ** 5.25588
+        data.time_stamp = time.time_ns()
+        return data
+
+    def getMagnetometerData(self, magnetometer_name='', vehicle_name=''):
+        data = airsim.MagnetometerData()
+        yaw = math.radians(float(self._current_record()["attitude"][2]))
+        data.magnetic_field_body = airsim.Vector3r(0.2 * math.cos(yaw), -0.2 * math.sin(yaw), 0.4)
+        data.time_stamp = time.time_ns()
+        return data
+
+    def getGpsData(self, gps_name='', vehicle_name=''):
+        data = airsim.GpsData()
+        # AirSim消息类型的默认值是类属性，替换而不是原地修改
+        data.gnss = airsim.GnssReport()
+        data.gnss.geo_point = airsim.GeoPoint()
+        data.gnss.velocity = airsim.Vector3r(*(float(v) for v in self._current_record()["velocity"]))
+        data.is_valid = True
+        data.time_stamp = time.time_ns()
+        return data
+
+    def getDistanceSensorData(self, distance_sensor_name='', vehicle_name=''):
+        data = airsim.DistanceSensorData()
+        data.distance = -float(self._current_record()["position"][2])
+        data.time_stamp = time.time_ns()
+        return data
+
+    # 飞行指令：接受并立即完成
+    def takeoffAsync(self, timeout_sec=20, vehicle_name=''):
+        return _CompletedFuture(self.command_delay)
+
+    def landAsync(self, timeout_sec=60, vehicle_name=''):
+        return _CompletedFuture(self.command_delay)
+
+    def hoverAsync(self, vehicle_name=''):
+        return _CompletedFuture()
+
+    def moveToZAsync(self, z, velocity, *args, **kwargs):
+        return _CompletedFuture(self.command_delay)
+
+    def moveToPositionAsync(self, x, y, z, velocity, *args, **kwargs):
+        return _CompletedFuture(self.command_delay)
+
+    def moveOnPathAsync(self, path, velocity, *args, **kwargs):
+        return _CompletedFuture(self.command_delay)
+
+    def moveByVelocityAsync(self, vx, vy, vz, duration, *args, **kwargs):
+        return _CompletedFuture()
+
+    def cancelLastTask(self, vehicle_name=''):
+        pass
@@ -0,0 +1,158 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from app.core.backend import create_airsim_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 连接通道：不同用途使用各自的连接，互不排队
+LANE_TELEMETRY = "telemetry"   # 状态轮询
+LANE_COMMAND = "command"       # 飞行指令（包括长时间阻塞的 .join()）
+LANE_SENSOR = "sensor"         # 传感器/图像等批量数据
+LANE_CONTROL = "control"       # 实时速度控制（不等待 .join()，不与飞行指令排队）
+LANE_LIDAR = "lidar"           # LiDAR 点云（单次数据量大，不与传感器/图像排队）
+
+
+class _Lane:
+    """单个通道：最多size个连接，按需创建"""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.created = 0
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+
+
+class RpcPool:
+    """
+    按用途划分通道的AirSim RPC连接池
+
+    每个连接同一时间只被一个线程使用；通道内连接数达到上限时，
+    借出方阻塞等待直到有连接归还或超时。
+    """
+
+    def __init__(self, sizes: Optional[Dict[str, int]] = None,
+                 factory: Callable[[], Any] = create_airsim_client):
+        sizes = sizes or {
+            LANE_TELEMETRY: settings.RPC_POOL_TELEMETRY,
+            LANE_COMMAND: settings.RPC_POOL_COMMAND,
+            # 每个配置的传感器在每个轮询周期各占一个连接，图像采集另占一个
+            LANE_SENSOR: max(settings.RPC_POOL_SENSOR,
+                             len(settings.SENSORS) + (1 if settings.CAMERAS else 0)),
+            LANE_CONTROL: settings.RPC_POOL_CONTROL,
+            # 每个配置的 LiDAR 在每个周期各占一个连接
+            LANE_LIDAR: max(settings.RPC_POOL_LIDAR, len(settings.LIDARS)),
+        }
+        self._factory = factory
+        self._lanes = {name: _Lane(name, size) for name, size in sizes.items()}
+        self._lock = threading.Lock()
+        # 重建连接时递增，旧代的连接归还时直接丢弃
+        self._generation = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        执行阻塞RPC的线程池，线程数等于各通道连接数之和
+
+        每个线程同一时间最多占用一个连接，多架无人机的 .join() 不会因事件循环的
+        默认线程池（线程数随CPU核数）过小而排队
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=sum(target.size for target in self._lanes.values()),
+                    thread_name_prefix="airsim-rpc"
+                )
+            return self._executor
+
+    def checkout(self, lane: str, timeout: Optional[float] = None):
+        """借出一个连接，返回 (连接, 代数)"""
+        target = self._lanes[lane]
+        with self._lock:
+            generation = self._generation
+            try:
+                return target.idle.get_nowait(), generation
+            except queue.Empty:
+                create = target.created < target.size
+                if create:
+                    target.created += 1
+        if create:
+            try:
+                return self._factory(), generation
+            except Exception:
+                with self._lock:
+                    target.created -= 1
+                raise
+        try:
+            return target.idle.get(timeout=timeout or settings.RPC_POOL_TIMEOUT), generation
+        except queue.Empty:
+            raise Exception(f"No free AirSim connection in '{lane}' lane")
+
+    def checkin(self, lane: str, client, generation: int, broken: bool = False):
+        """归还连接；出错或已过期的连接被丢弃"""
+        target = self._lanes[lane]
+        with self._lock:
+            if broken or generation != self._generation:
+                if generation == self._generation:
+                    target.created -= 1
+                return
+            target.idle.put(client)
+
+    @contextmanager
+    def lane(self, lane: str, timeout: Optional[float] = None):
+        """借用某个通道的连接：with pool.lane(LANE_COMMAND) as client: ..."""
+        client, generation = self.checkout(lane, timeout)
+        broken = False
+        try:
+            yield client
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.checkin(lane, client, generation, broken)
+
+    def call(self, lane: str, func: Callable[[Any], Any]):
+        """借用连接执行一次调用（阻塞，适合在线程池中运行）"""
+        with self.lane(lane) as client:
+            return func(client)
+
+    def size(self, lane: str) -> int:
+        """通道的连接数上限"""
+        return self._lanes[lane].size
+
+    def ensure_size(self, lane: str, size: int):
+        """把通道的连接数上限提高到至少size（按无人机数量扩容时使用，不会缩小）"""
+        with self._lock:
+            target = self._lanes[lane]
+            if size <= target.size:
+                return
+            target.size = size
+            # 线程池按新的连接总数重建，执行中的调用在旧线程池中完成
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def reset(self):
+        """丢弃所有连接，之后按需重新创建（仿真器重启后使用）"""
+        with self._lock:
+            self._generation += 1
+            for target in self._lanes.values():
+                target.idle = queue.LifoQueue()
+                target.created = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """各通道连接使用情况"""
+        return {
+            name: {
+                "size": target.size,
+                "created": target.created,
+                "idle": target.idle.qsize(),
+            }
+            for name, target in self._lanes.items()
+        }
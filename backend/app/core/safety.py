@@ -0,0 +1,390 @@
+import json
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from app.core.config import settings
+from app.models.drone import NoFlyZone
+
+logger = logging.getLogger(__name__)
+
+# 违规类型
+VIOLATION_GEOFENCE = "geofence"
+VIOLATION_ALTITUDE = "altitude"
+VIOLATION_ZONE = "zone"
+
+# 精确相交测试每批处理的(航段, 区域)对数，限制临时数组大小
+PAIR_CHUNK = 32768
+
+# 网格坐标编码为int64键时的偏移
+_CELL_OFFSET = 1 << 20
+
+# 单个航段最多展开的格子数，超出时直接与所有禁飞区做精确测试
+MAX_SEGMENT_CELLS = 4096
+
+
+def _cell_keys(cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    return (cx.astype(np.int64) + _CELL_OFFSET) * (1 << 22) + (cy.astype(np.int64) + _CELL_OFFSET)
+
+
+def _expand_cells(lo: np.ndarray, hi: np.ndarray, cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """展开每个包围盒覆盖的所有格子，返回 (包围盒序号, 格子键)"""
+    lo = np.floor(lo / cell_size).astype(np.int64)
+    hi = np.floor(hi / cell_size).astype(np.int64)
+    ny = hi[:, 1] - lo[:, 1] + 1
+    counts = (hi[:, 0] - lo[:, 0] + 1) * ny
+    owner = np.repeat(np.arange(len(lo)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ny_rep = ny[owner]
+    return owner, _cell_keys(lo[owner, 0] + local // ny_rep, lo[owner, 1] + local % ny_rep)
+
+
+class _ZoneIndex:
+    """
+    禁飞区的不可变索引快照（均匀网格）
+
+    多边形顶点补齐到相同数量后存为 (区域数, 最大顶点数, 2) 的边数组，
+    便于对一批(航段, 区域)对做向量化的精确相交测试。
+    """
+
+    def __init__(self, zones: List[NoFlyZone], cell_size: float):
+        self.zones = zones
+        self.cell_size = cell_size
+        count = len(zones)
+        counts = np.array([len(z.polygon) for z in zones], dtype=np.int64)
+        max_vertices = int(counts.max()) if count else 3
+        self.edge_start = np.zeros((count, max_vertices, 2))
+        self.edge_end = np.zeros((count, max_vertices, 2))
+        self.edge_valid = np.zeros((count, max_vertices), dtype=bool)
+        self.floor = np.array([-np.inf if z.min_altitude is None else z.min_altitude
+                               for z in zones], dtype=np.float64)
+        self.ceiling = np.array([np.inf if z.max_altitude is None else z.max_altitude
+                                 for z in zones], dtype=np.float64)
+        self.bbox = np.zeros((count, 4))
+        # 所有禁飞区的总包围盒，航段包围盒先裁剪到其中再展开格子
+        self.extent = np.zeros(4)
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_start = np.zeros(0, dtype=np.int64)
+        self.cell_length = np.zeros(0, dtype=np.int64)
+        self.cell_zones = np.zeros(0, dtype=np.int64)
+        self.wide_zones = np.zeros(0, dtype=np.int64)
+        if not count:
+            return
+
+        # 所有顶点拼成一个数组，按(区域, 顶点序号)填入边数组，最后一条边回到第一个顶点
+        vertices = np.array([p for z in zones for p in z.polygon], dtype=np.float64)
+        first = np.cumsum(counts) - counts
+        zone_of = np.repeat(np.arange(count), counts)
+        position = np.arange(len(vertices)) - first[zone_of]
+        following = np.where(position + 1 == counts[zone_of], first[zone_of],
+                             np.arange(len(vertices)) + 1)
+        self.edge_start[zone_of, position] = vertices
+        self.edge_end[zone_of, position] = vertices[following]
+        self.edge_valid[zone_of, position] = True
+        self.bbox[:, :2] = np.minimum.reduceat(vertices, first)
+        self.bbox[:, 2:] = np.maximum.reduceat(vertices, first)
+        self.extent[:2] = self.bbox[:, :2].min(axis=0)
+        self.extent[2:] = self.bbox[:, 2:].max(axis=0)
+
+        # 网格：有序的格子键 + CSR 形式的区域列表；覆盖格子过多的区域不进网格，与所有航段配对
+        cells = np.prod(np.floor(self.bbox[:, 2:] / cell_size) -
+                        np.floor(self.bbox[:, :2] / cell_size) + 1, axis=1)
+        wide = cells > MAX_SEGMENT_CELLS
+        self.wide_zones = np.flatnonzero(wide)
+        gridded = np.flatnonzero(~wide)
+        zone, keys = _expand_cells(self.bbox[gridded, :2], self.bbox[gridded, 2:], cell_size)
+        zone = gridded[zone]
+        order = np.argsort(keys, kind="stable")
+        self.cell_keys, self.cell_start, self.cell_length = \
+            np.unique(keys[order], return_index=True, return_counts=True)
+        self.cell_zones = zone[order]
+
+    def candidates(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按网格找出可能相交的(航段序号, 区域序号)对
+
+        航段包围盒先裁剪到禁飞区的总包围盒（远处的目标点不会展开大量格子）；裁剪后仍超过
+        MAX_SEGMENT_CELLS 个格子的航段直接与所有禁飞区配对
+        """
+        count = len(self.zones)
+        if not count or not len(a):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        lo = np.maximum(np.minimum(a[:, :2], b[:, :2]), self.extent[:2])
+        hi = np.minimum(np.maximum(a[:, :2], b[:, :2]), self.extent[2:])
+        # 与禁飞区范围不重叠（含 NaN 坐标）的航段没有候选
+        overlap = np.flatnonzero((lo <= hi).all(axis=1))
+        lo, hi = lo[overlap], hi[overlap]
+        cells = np.prod(np.floor(hi / self.cell_size) - np.floor(lo / self.cell_size) + 1, axis=1)
+        large = cells > MAX_SEGMENT_CELLS
+        small = overlap[~large]
+        segment, keys = _expand_cells(lo[~large], hi[~large], self.cell_size)
+        segment = small[segment]
+
+        # 查找格子（有序键上二分查找），丢弃没有区域的格子
+        if len(self.cell_keys):
+            slot = np.searchsorted(self.cell_keys, keys)
+            slot = np.minimum(slot, len(self.cell_keys) - 1)
+            hit = self.cell_keys[slot] == keys
+        else:
+            # 所有区域都过大未入网格
+            slot = np.zeros(len(keys), dtype=np.int64)
+            hit = np.zeros(len(keys), dtype=bool)
+        segment, slot = segment[hit], slot[hit]
+
+        # 展开格子中的区域
+        lengths = self.cell_length[slot]
+        pair_segment = np.repeat(segment, lengths)
+        offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pair_zone = self.cell_zones[np.repeat(self.cell_start[slot], lengths) + offset]
+
+        # 覆盖格子过多的航段与所有禁飞区配对，所有航段与不在网格中的大区域配对
+        wide = overlap[large]
+        if len(wide):
+            pair_segment = np.concatenate([pair_segment, np.repeat(wide, count)])
+            pair_zone = np.concatenate([pair_zone, np.tile(np.arange(count), len(wide))])
+        if len(self.wide_zones):
+            pair_segment = np.concatenate([pair_segment, np.repeat(overlap, len(self.wide_zones))])
+            pair_zone = np.concatenate([pair_zone, np.tile(self.wide_zones, len(overlap))])
+
+        # 同一航段经过多个格子时去重
+        pair_key = np.unique(pair_segment * count + pair_zone)
+        return pair_key // count, pair_key % count
+
+    def intersects(self, a: np.ndarray, b: np.ndarray, zone: np.ndarray) -> np.ndarray:
+        """(航段, 区域)对的精确相交测试：先按高度带裁剪航段，再做二维多边形相交"""
+        # 包围盒粗筛
+        seg_lo = np.minimum(a[:, :2], b[:, :2])
+        seg_hi = np.maximum(a[:, :2], b[:, :2])
+        box = self.bbox[zone]
+        result = (seg_hi[:, 0] >= box[:, 0]) & (seg_lo[:, 0] <= box[:, 2]) & \
+                 (seg_hi[:, 1] >= box[:, 1]) & (seg_lo[:, 1] <= box[:, 3])
+
+        # 高度（-z）在区域高度带内的参数区间 [t0, t1]
+        alt_a, alt_b = -a[:, 2], -b[:, 2]
+        delta = alt_b - alt_a
+        floor, ceiling = self.floor[zone], self.ceiling[zone]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tf = (floor - alt_a) / delta
+            tc = (ceiling - alt_a) / delta
+        flat = np.abs(delta) < 1e-9
+        t0 = np.where(flat, 0.0, np.maximum(0.0, np.fmin(tf, tc)))
+        t1 = np.where(flat, 1.0, np.minimum(1.0, np.fmax(tf, tc)))
+        in_band = np.where(flat, (alt_a >= floor) & (alt_a <= ceiling), t0 <= t1)
+        result &= in_band
+
+        idx = np.flatnonzero(result)
+        if not len(idx):
+            return result
+        d = (b - a)[idx, :2]
+        p0 = a[idx, :2] + d * t0[idx, None]
+        p1 = a[idx, :2] + d * t1[idx, None]
+        e0 = self.edge_start[zone[idx]]
+        e1 = self.edge_end[zone[idx]]
+        valid = self.edge_valid[zone[idx]]
+
+        # 起点在多边形内（射线法）
+        px, py = p0[:, 0:1], p0[:, 1:2]
+        ex0, ey0, ex1, ey1 = e0[..., 0], e0[..., 1], e1[..., 0], e1[..., 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross_x = (ex1 - ex0) * (py - ey0) / (ey1 - ey0) + ex0
+        crossing = ((ey0 > py) != (ey1 > py)) & (px < cross_x) & valid
+        inside = crossing.sum(axis=1) % 2 == 1
+
+        # 航段与任一边相交
+        def cross(ox, oy, ux, uy, vx, vy):
+            return (ux - ox) * (vy - oy) - (uy - oy) * (vx - ox)
+        q0x, q0y, q1x, q1y = p0[:, 0:1], p0[:, 1:2], p1[:, 0:1], p1[:, 1:2]
+        d1 = cross(ex0, ey0, ex1, ey1, q0x, q0y)
+        d2 = cross(ex0, ey0, ex1, ey1, q1x, q1y)
+        d3 = cross(q0x, q0y, q1x, q1y, ex0, ey0)
+        d4 = cross(q0x, q0y, q1x, q1y, ex1, ey1)
+        edge_hit = ((d1 * d2 <= 0) & (d3 * d4 <= 0) & valid).any(axis=1)
+
+        result[idx] = inside | edge_hit
+        return result
+
+
+class SafetyEngine:
+    """
+    安全包络检查：地理围栏、全局高度带和多边形/棱柱禁飞区
+
+    禁飞区修改时重建索引快照并整体替换引用，检查方无需加锁。
+    version 在每次修改后递增，可用作依赖禁飞区的缓存的键。
+    """
+
+    def __init__(self, cell_size: Optional[float] = None):
+        self.cell_size = cell_size or settings.SAFETY_GRID_CELL
+        self.version = 0
+        self._zones: Dict[str, NoFlyZone] = {}
+        self._lock = threading.Lock()
+        self._index = _ZoneIndex([], self.cell_size)
+        self._next_id = 1
+
+    @property
+    def zones(self) -> List[NoFlyZone]:
+        return list(self._index.zones)
+
+    def add_zone(self, zone: NoFlyZone) -> NoFlyZone:
+        """添加（或按id替换）禁飞区"""
+        return self.add_zones([zone])[0]
+
+    def add_zones(self, zones: List[NoFlyZone]) -> List[NoFlyZone]:
+        """批量添加禁飞区，只重建一次索引"""
+        added = []
+        with self._lock:
+            for zone in zones:
+                if not zone.id:
+                    zone = zone.model_copy(update={"id": f"zone-{self._next_id}"})
+                    self._next_id += 1
+                self._zones[zone.id] = zone
+                added.append(zone)
+            self._rebuild()
+        return added
+
+    def remove_zone(self, zone_id: str):
+        with self._lock:
+            if zone_id not in self._zones:
+                raise KeyError(f"Unknown no-fly zone: {zone_id}")
+            del self._zones[zone_id]
+            self._rebuild()
+
+    def clear(self):
+        with self._lock:
+            self._zones.clear()
+            self._rebuild()
+
+    def load(self, path: str):
+        """从JSON文件加载禁飞区列表"""
+        with open(path, "r", encoding="utf-8") as f:
+            zones = [NoFlyZone(**item) for item in json.load(f)]
+        self.add_zones(zones)
+        logger.info(f"Loaded {len(zones)} no-fly zones from {path}")
+
+    def _rebuild(self):
+        self._index = _ZoneIndex(list(self._zones.values()), self.cell_size)
+        self.version += 1
+
+    def _violations(self, a: np.ndarray, b: np.ndarray, vehicle: np.ndarray
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        一批航段的违规：(地理围栏违规, 高度违规, 禁飞区违规的航段序号, 区域序号)
+
+        vehicle 标记从无人机当前位置出发的航段：起点本身已在包络外时不能因此拒绝返回，
+        这些航段的围栏和高度只检查终点（两者都是凸的，终点合规则整段不会比起点更远离合规范围），
+        起点所在的禁飞区在终点离开该区域时不计（非凸区域的离开航段不检查重新进入）
+        """
+        a_env = np.where(vehicle[:, None], b, a)
+        # 圆形围栏和高度带都是凸的，端点都在内即整段在内（NaN 坐标视为违规）
+        radius = np.maximum(np.hypot(a_env[:, 0], a_env[:, 1]), np.hypot(b[:, 0], b[:, 1]))
+        bad_fence = ~(radius <= settings.GEOFENCE_RADIUS)
+        alt_hi = np.maximum(-a_env[:, 2], -b[:, 2])
+        alt_lo = np.minimum(-a_env[:, 2], -b[:, 2])
+        bad_alt = ~(alt_hi <= settings.MAX_ALTITUDE)
+        if settings.SAFETY_MIN_ALTITUDE is not None:
+            bad_alt |= ~(alt_lo >= settings.SAFETY_MIN_ALTITUDE)
+
+        index = self._index
+        segment, zone = self._zone_hits(index, a, b)
+        if vehicle.any() and len(segment):
+            count = len(index.zones)
+            rows = np.flatnonzero(vehicle)
+            # 起点/终点所在的区域（退化航段的相交测试即点在区域内）
+            start_in = self._zone_hits(index, a[rows], a[rows])
+            end_in = self._zone_hits(index, b[rows], b[rows])
+            leaving = np.setdiff1d(rows[start_in[0]] * count + start_in[1],
+                                   rows[end_in[0]] * count + end_in[1])
+            keep = ~np.isin(segment * count + zone, leaving)
+            segment, zone = segment[keep], zone[keep]
+        return bad_fence, bad_alt, segment, zone
+
+    def check_segments(self, starts: np.ndarray, ends: np.ndarray,
+                       from_vehicle: bool = False) -> List[Dict[str, Any]]:
+        """
+        检查一批航段（NED坐标，形状均为(K,3)）
+
+        from_vehicle 表示第一个航段从无人机当前位置出发（见 _violations）；
+        返回违规列表 [{"segment": i, "reason": ..., "zone": ...}]，按航段序号排序
+        """
+        a = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        b = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        vehicle = np.zeros(len(a), dtype=bool)
+        vehicle[:1] = from_vehicle
+        bad_fence, bad_alt, segment, zone = self._violations(a, b, vehicle)
+
+        violations: List[Tuple[int, str, Optional[str]]] = []
+        for i in np.flatnonzero(bad_fence).tolist():
+            violations.append((i, VIOLATION_GEOFENCE, None))
+        for i in np.flatnonzero(bad_alt).tolist():
+            violations.append((i, VIOLATION_ALTITUDE, None))
+        zones = self._index.zones
+        for i, z in zip(segment.tolist(), zone.tolist()):
+            violations.append((i, VIOLATION_ZONE, zones[z].id))
+
+        violations.sort(key=lambda v: v[0])
+        return [
+            {"segment": i, "reason": reason, **({"zone": zone_id} if zone_id else {})}
+            for i, reason, zone_id in violations
+        ]
+
+    @staticmethod
+    def _zone_hits(index: _ZoneIndex, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """与禁飞区相交的 (航段序号, 区域序号)"""
+        segment, zone = index.candidates(a, b)
+        hits = []
+        for lo in range(0, len(segment), PAIR_CHUNK):
+            seg = segment[lo:lo + PAIR_CHUNK]
+            zid = zone[lo:lo + PAIR_CHUNK]
+            hit = index.intersects(a[seg], b[seg], zid)
+            hits.append((seg[hit], zid[hit]))
+        if not hits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate([h[0] for h in hits]), np.concatenate([h[1] for h in hits])
+
+    def segments_safe(self, starts: np.ndarray, ends: np.ndarray,
+                      from_vehicle: bool = False) -> np.ndarray:
+        """
+        一批航段是否都不违反安全包络 (K,) bool，不生成违规列表（航线规划批量检查使用）
+
+        from_vehicle 表示这批航段都从无人机当前位置出发
+        """
+        a = np.asarray(starts, dtype=np.float64).reshape(-1, 3)
+        b = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        vehicle = np.full(len(a), from_vehicle, dtype=bool)
+        bad_fence, bad_alt, segment, _ = self._violations(a, b, vehicle)
+        safe = ~(bad_fence | bad_alt)
+        safe[segment] = False
+        return safe
+
+    def check_path(self, points: Sequence[Sequence[float]],
+                   start: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+        """检查折线路径；给出start（无人机当前位置）时第一段从start飞往第一个点，start 本身不检查"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if start is not None:
+            points = np.vstack([np.asarray(start, dtype=np.float64).reshape(1, 3), points])
+        if len(points) == 1:
+            return self.check_segments(points, points)
+        return self.check_segments(points[:-1], points[1:], from_vehicle=start is not None)
+
+    def validate_path(self, points: Sequence[Sequence[float]],
+                      start: Optional[Sequence[float]] = None):
+        """检查路径，有违规时抛出ValueError"""
+        violations = self.check_path(points, start)
+        if violations:
+            raise ValueError("Path violates safety envelope: " + describe_violations(violations))
+
+
+def describe_violations(violations: List[Dict[str, Any]], limit: int = 5) -> str:
+    """违规列表的简短描述"""
+    parts = []
+    for v in violations[:limit]:
+        reason = f"zone {v['zone']}" if v["reason"] == VIOLATION_ZONE else v["reason"]
+        parts.append(f"segment {v['segment']} ({reason})")
+    if len(violations) > limit:
+        parts.append(f"... ({len(violations)} total)")
+    return ", ".join(parts)
+
+
+# 全局安全引擎
+safety_engine = SafetyEngine()
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from app.core.rpc_pool import RpcPool, LANE_SENSOR
+
+logger = logging.getLogger(__name__)
+
+
+def _vector(v) -> Dict[str, float]:
+    return {"x": v.x_val, "y": v.y_val, "z": v.z_val}
+
+
+def _read_imu(client, name: str, vehicle_name: str = '') -> Dict[str, Any]:
+    data = client.getImuData(imu_name=name, vehicle_name=vehicle_name)
+    q = data.orientation
+    return {
+        "sim_timestamp": data.time_stamp,
+        "orientation": {"w": q.w_val, "x": q.x_val, "y": q.y_val, "z": q.z_val},
+        "angular_velocity": _vector(data.angular_velocity),
+        "linear_acceleration": _vector(data.linear_acceleration),
+    }
+
+
+def _read_barometer(client, name: str, vehicle_name: str = '') -> Dict[str, Any]:
+    data = client.getBarometerData(barometer_name=name, vehicle_name=vehicle_name)
+    return {
+        "sim_timestamp": data.time_stamp,
+        "altitude": data.altitude,
+        "pressure": data.pressure,
+        "qnh": data.qnh,
+    }
+
+
+def _read_magnetometer(client, name: str, vehicle_name: str = '') -> Dict[str, Any]:
+    data = client.getMagnetometerData(magnetometer_name=name, vehicle_name=vehicle_name)
+    return {
+        "sim_timestamp": data.time_stamp,
+        "magnetic_field_body": _vector(data.magnetic_field_body),
+    }
+
+
+def _read_gps(client, name: str, vehicle_name: str = '') -> Dict[str, Any]:
+    data = client.getGpsData(gps_name=name, vehicle_name=vehicle_name)
+    gnss = data.gnss
+    return {
+        "sim_timestamp": data.time_stamp,
+        "is_valid": data.is_valid,
+        "latitude": gnss.geo_point.latitude,
+        "longitude": gnss.geo_point.longitude,
+        "altitude": gnss.geo_point.altitude,
+        "eph": gnss.eph,
+        "epv": gnss.epv,
+        "fix_type": int(gnss.fix_type),
+        "velocity": _vector(gnss.velocity),
+    }
+
+
+def _read_distance(client, name: str, vehicle_name: str = '') -> Dict[str, Any]:
+    data = client.getDistanceSensorData(distance_sensor_name=name, vehicle_name=vehicle_name)
+    return {
+        "sim_timestamp": data.time_stamp,
+        "distance": data.distance,
+        "min_distance": data.min_distance,
+        "max_distance": data.max_distance,
+    }
+
+
+# 传感器类型 -> 读取函数
+SENSOR_READERS: Dict[str, Callable[[Any, str, str], Dict[str, Any]]] = {
+    "imu": _read_imu,
+    "barometer": _read_barometer,
+    "magnetometer": _read_magnetometer,
+    "gps": _read_gps,
+    "distance": _read_distance,
+}
+
+
+def parse_sensor_spec(spec: str) -> Tuple[str, str]:
+    """解析传感器配置 "类型" 或 "类型:名称"，返回(类型, 名称)"""
+    kind, _, name = spec.partition(":")
+    if kind not in SENSOR_READERS:
+        raise ValueError(f"Unknown sensor type: {kind}")
+    return kind, name
+
+
+class SensorAcquisition:
+    """
+    多传感器采集：每个轮询周期并发读取所有配置的传感器
+
+    每个传感器读取占用传感器通道的一个连接，与遥测通道上的状态读取同时进行，
+    单周期耗时取决于最慢的一次RPC，而不是所有RPC耗时之和。
+    上一次读取尚未完成的传感器不再排队新的读取，而是继续等待原来的读取，
+    仿真器变慢或无响应时排队的读取不会无限增长。
+    """
+
+    def __init__(self, pool: RpcPool, specs: List[str], vehicle_name: str = ""):
+        self.pool = pool
+        self.vehicle_name = vehicle_name
+        self.sensors = [(spec, *parse_sensor_spec(spec)) for spec in specs]
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 各传感器已发起、结果尚未收集的读取
+        self._inflight: Dict[str, Future] = {}
+        if self.sensors:
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self.sensors),
+                thread_name_prefix="airsim-sensor"
+            )
+
+    def submit(self) -> List[Tuple[str, Future]]:
+        """发起本周期所有传感器读取（上一次读取仍在进行或结果尚未收集的传感器沿用原来的读取）"""
+        if not self._executor:
+            return []
+        pending = []
+        for spec, kind, name in self.sensors:
+            future = self._inflight.get(spec)
+            if future is None:
+                future = self._inflight[spec] = self._executor.submit(
+                    self.pool.call, LANE_SENSOR,
+                    lambda client, kind=kind, name=name:
+                        SENSOR_READERS[kind](client, name, self.vehicle_name)
+                )
+            pending.append((spec, future))
+        return pending
+
+    def collect(self, pending: List[Tuple[str, Future]],
+                timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待本周期的读取结果；失败或超时的传感器本周期不出现在结果中"""
+        if not pending:
+            return None
+        wait([future for _, future in pending], timeout=timeout)
+        readings: Dict[str, Any] = {}
+        for spec, future in pending:
+            if not future.done():
+                continue
+            if self._inflight.get(spec) is future:
+                del self._inflight[spec]
+            try:
+                readings[spec] = future.result()
+            except Exception as e:
+                logger.debug(f"Error reading sensor {spec}: {e}")
+        return readings
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
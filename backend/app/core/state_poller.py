@@ -0,0 +1,414 @@
+import airsim
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import logging
+
+from app.models.drone import DroneState, DronePosition, DroneAttitude, DroneVelocity
+from app.core.config import settings
+from app.core.rpc_pool import RpcPool, LANE_TELEMETRY
+from app.core.history import TelemetryHistory, FLAG_ARMED, FLAG_FLYING
+from app.core.recorder import flight_recorder
+from app.core.sensors import SensorAcquisition
+
+logger = logging.getLogger(__name__)
+
+
+class StateRecord:
+    """
+    紧凑的内部状态记录，轮询线程原地更新
+
+    每次轮询只写入标量字段，不创建pydantic模型、datetime或NumPy标量；
+    DroneState只在REST等边界处按需生成。
+    """
+
+    __slots__ = (
+        "seq", "timestamp",
+        "x", "y", "z",
+        "roll", "pitch", "yaw",
+        "vx", "vy", "vz",
+        "flags", "battery_level",
+        "has_gps", "latitude", "longitude", "altitude",
+        "sim_timestamp", "sensors",
+    )
+
+    def __init__(self):
+        self.seq = 0
+        self.timestamp = 0.0
+        self.x = self.y = self.z = 0.0
+        self.roll = self.pitch = self.yaw = 0.0
+        self.vx = self.vy = self.vz = 0.0
+        self.flags = 0
+        # 电池（模拟）：AirSim不提供电池信息
+        self.battery_level = 100.0
+        self.has_gps = False
+        self.latitude = self.longitude = self.altitude = 0.0
+        # 仿真器时间戳(ns)和本周期的传感器读数（未配置传感器时为None）
+        self.sim_timestamp = 0
+        self.sensors: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_armed(self) -> bool:
+        return bool(self.flags & FLAG_ARMED)
+
+    @property
+    def is_flying(self) -> bool:
+        return bool(self.flags & FLAG_FLYING)
+
+    def update_from(self, state, seq: int, timestamp: float,
+                    sensors: Optional[Dict[str, Any]] = None):
+        """用AirSim的MultirotorState和本周期的传感器读数原地更新"""
+        kinematics = state.kinematics_estimated
+        pos = kinematics.position
+        self.x = pos.x_val
+        self.y = pos.y_val
+        self.z = pos.z_val
+
+        pitch, roll, yaw = airsim.to_eularian_angles(kinematics.orientation)
+        self.roll = math.degrees(roll)
+        self.pitch = math.degrees(pitch)
+        self.yaw = math.degrees(yaw)
+
+        vel = kinematics.linear_velocity
+        self.vx = vel.x_val
+        self.vy = vel.y_val
+        self.vz = vel.z_val
+
+        flying = state.landed_state == airsim.LandedState.Flying
+        self.flags = FLAG_ARMED | FLAG_FLYING if flying else 0
+
+        gps = getattr(state, "gps_location", None)
+        self.has_gps = gps is not None
+        if gps is not None:
+            self.latitude = gps.latitude
+            self.longitude = gps.longitude
+            self.altitude = gps.altitude
+
+        self.sim_timestamp = state.timestamp
+        self.sensors = sensors
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def history_sample(self) -> tuple:
+        """历史缓冲区/飞行记录器使用的采样元组"""
+        return (
+            self.timestamp,
+            (self.x, self.y, self.z),
+            (self.roll, self.pitch, self.yaw),
+            (self.vx, self.vy, self.vz),
+            self.flags
+        )
+
+    def gps_location(self) -> Optional[Dict[str, float]]:
+        if not self.has_gps:
+            return None
+        return {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "altitude": self.altitude
+        }
+
+    def to_drone_state(self) -> DroneState:
+        """生成对外的DroneState模型"""
+        timestamp = datetime.fromtimestamp(self.timestamp)
+        return DroneState(
+            position=DronePosition(x=self.x, y=self.y, z=self.z, timestamp=timestamp),
+            attitude=DroneAttitude(roll=self.roll, pitch=self.pitch, yaw=self.yaw,
+                                   timestamp=timestamp),
+            velocity=DroneVelocity(vx=self.vx, vy=self.vy, vz=self.vz),
+            is_armed=self.is_armed,
+            is_flying=self.is_flying,
+            battery_level=self.battery_level,
+            gps_location=self.gps_location(),
+            sim_timestamp=self.sim_timestamp,
+            sensors=self.sensors
+        )
+
+    def to_telemetry(self) -> Dict[str, Any]:
+        """直接生成遥测数据（与state_to_telemetry输出一致）"""
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "position": {"x": self.x, "y": self.y, "z": self.z},
+            "attitude": {"roll": self.roll, "pitch": self.pitch, "yaw": self.yaw},
+            "velocity": {"vx": self.vx, "vy": self.vy, "vz": self.vz},
+            "is_armed": self.is_armed,
+            "is_flying": self.is_flying,
+            "battery_level": self.battery_level,
+            "gps_location": self.gps_location(),
+            "sim_timestamp": self.sim_timestamp,
+            "sensors": self.sensors
+        }
+
+
+class PollerStats:
+    """轮询RPC延迟统计（cycle为包含传感器读取在内的整个采集周期）"""
+
+    # 指数滑动平均系数
+    EWMA_ALPHA = 0.1
+
+    def __init__(self):
+        self.polls = 0
+        self.errors = 0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_poll_time: Optional[float] = None
+        self.last_cycle_ms = 0.0
+        self.avg_cycle_ms = 0.0
+
+    def record_cycle(self, cycle_ms: float):
+        """记录一次采集周期（状态+传感器）的耗时"""
+        self.last_cycle_ms = cycle_ms
+        if self.polls <= 1:
+            self.avg_cycle_ms = cycle_ms
+        else:
+            self.avg_cycle_ms += self.EWMA_ALPHA * (cycle_ms - self.avg_cycle_ms)
+
+    def record(self, latency_ms: float):
+        """记录一次成功轮询的RPC耗时"""
+        self.polls += 1
+        self.last_latency_ms = latency_ms
+        if self.polls == 1:
+            self.avg_latency_ms = latency_ms
+        else:
+            self.avg_latency_ms += self.EWMA_ALPHA * (latency_ms - self.avg_latency_ms)
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.last_poll_time = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "polls": self.polls,
+            "errors": self.errors,
+            "last_latency_ms": round(self.last_latency_ms, 3),
+            "avg_latency_ms": round(self.avg_latency_ms, 3),
+            "max_latency_ms": round(self.max_latency_ms, 3),
+            "last_cycle_ms": round(self.last_cycle_ms, 3),
+            "avg_cycle_ms": round(self.avg_cycle_ms, 3),
+            "last_poll_time": self.last_poll_time
+        }
+
+
+def fetch_states(client, names: List[str]) -> list:
+    """
+    在一个连接上读取多架无人机的状态
+
+    msgpack-rpc 客户端支持流水线：先发出全部请求再依次取回响应，同一连接上
+    N架无人机只需约一次往返时间；不支持的客户端（如回放后端）逐个读取。
+    """
+    rpc = getattr(client, "client", None)
+    if len(names) > 1 and hasattr(rpc, "call_async"):
+        futures = [rpc.call_async("getMultirotorState", name) for name in names]
+        return [airsim.MultirotorState.from_msgpack(future.get()) for future in futures]
+    return [client.getMultirotorState(vehicle_name=name) for name in names]
+
+
+class VehicleState:
+    """
+    单架无人机的轮询状态：频率需求、双缓冲状态记录、统计和传感器采集
+
+    轮询频率按需调整：取各订阅方请求的最高频率与飞行阶段对应的频率
+    （降落状态为 POLL_MIN_RATE，飞行中为 POLL_FLYING_RATE）中的较大者，
+    并限制在 [POLL_MIN_RATE, POLL_MAX_RATE] 之间。
+    """
+
+    def __init__(self, name: str, pool: RpcPool,
+                 history: Optional[TelemetryHistory] = None,
+                 demands: Optional[Dict[str, float]] = None,
+                 sensors: Optional[List[str]] = None,
+                 record_flight: bool = True):
+        self.name = name
+        self.history = history
+        # 各订阅方请求的轮询频率(Hz)，由事件循环线程修改
+        self.demands: Dict[str, float] = demands if demands is not None else {}
+        self.sensors = SensorAcquisition(pool, settings.SENSORS if sensors is None else sensors,
+                                         name)
+        # 飞行记录器的记录格式不区分无人机，只记录一架
+        self.record_flight = record_flight
+        self.stats = PollerStats()
+        # 双缓冲：轮询线程写入后台记录后整体替换引用，读取方无需加锁。
+        # 读取方应在下一次轮询前用完记录（或比较seq确认未被覆盖）
+        self._records = (StateRecord(), StateRecord())
+        self._latest_record: Optional[StateRecord] = None
+        self._seq = 0
+        # 上次轮询开始的时间(perf_counter)，失败后1秒再重试
+        self.last_started = 0.0
+        self.failed = False
+
+    @property
+    def rate(self) -> float:
+        """当前轮询频率(Hz)"""
+        demand = max(list(self.demands.values()), default=0.0)
+        record = self._latest_record
+        if record is not None and not record.is_flying:
+            phase_rate = settings.POLL_MIN_RATE
+        else:
+            phase_rate = settings.POLL_FLYING_RATE
+        return min(max(demand, phase_rate, settings.POLL_MIN_RATE), settings.POLL_MAX_RATE)
+
+    @property
+    def interval(self) -> float:
+        """当前轮询间隔(秒)"""
+        return 1.0 / self.rate
+
+    @property
+    def due_at(self) -> float:
+        """下次轮询的时间(perf_counter)"""
+        return self.last_started + (1.0 if self.failed else self.interval)
+
+    @property
+    def latest_record(self) -> Optional[StateRecord]:
+        """最新一次轮询得到的状态记录"""
+        return self._latest_record
+
+    def apply(self, state, timestamp: float, sensors: Optional[Dict[str, Any]] = None):
+        """写入一次轮询结果，并追加到历史环形缓冲区和飞行记录器"""
+        self._seq += 1
+        record = self._records[self._seq & 1]
+        record.update_from(state, self._seq, timestamp, sensors)
+        self._latest_record = record
+        sample = record.history_sample()
+        if self.history is not None:
+            self.history.append(*sample)
+        if self.record_flight:
+            flight_recorder.record_state(*sample)
+
+
+class StatePoller:
+    """
+    独立线程轮询所有无人机的AirSim状态，使用连接池遥测通道的连接，不阻塞事件循环
+
+    每架无人机按各自的频率到期；同一轮到期的无人机分到遥测通道的多个连接上并行读取，
+    每个连接内再用流水线批量读取（见 fetch_states），一轮耗时约为一次往返时间加上
+    每个连接上的请求处理时间，而不是无人机数量乘以往返时间。
+
+    配置了 SENSORS 时，每一轮先在传感器通道上并发发起到期无人机的所有传感器读取，
+    再读取状态。
+    """
+
+    def __init__(self, pool: RpcPool):
+        self.pool = pool
+        # 写时复制：增删无人机时整体替换字典，轮询线程无需加锁
+        self.vehicles: Dict[str, VehicleState] = {}
+        # 每一轮批量读取的统计
+        self.stats = PollerStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def add_vehicle(self, name: str, **kwargs) -> VehicleState:
+        """登记一架无人机，参数同 VehicleState"""
+        vehicle = VehicleState(name, self.pool, **kwargs)
+        previous = self.vehicles.get(name)
+        self.vehicles = {**self.vehicles, name: vehicle}
+        if previous is not None:
+            previous.sensors.shutdown()
+        self.wake()
+        return vehicle
+
+    def remove_vehicle(self, name: str):
+        """注销一架无人机"""
+        vehicles = dict(self.vehicles)
+        vehicle = vehicles.pop(name, None)
+        self.vehicles = vehicles
+        if vehicle is not None:
+            vehicle.sensors.shutdown()
+
+    @property
+    def workers(self) -> int:
+        """并行读取使用的遥测通道连接数"""
+        return max(1, self.pool.size(LANE_TELEMETRY))
+
+    def start(self):
+        """启动轮询线程"""
+        if self.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="airsim-state-poller", daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def wake(self):
+        """请求频率变化后立即唤醒轮询线程"""
+        self._wake_event.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止轮询线程"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _fetch(self, vehicles: List[VehicleState]) -> list:
+        """借用一个遥测连接读取一组无人机的状态"""
+        with self.pool.lane(LANE_TELEMETRY) as client:
+            return fetch_states(client, [vehicle.name for vehicle in vehicles])
+
+    def poll(self, due: List[VehicleState]):
+        """轮询一组到期的无人机"""
+        started = time.perf_counter()
+        pending = [vehicle.sensors.submit() for vehicle in due]
+
+        # 按连接数分组：第一组在本线程读取，其余组并行
+        count = min(self.workers, len(due))
+        chunks = [due[i::count] for i in range(count)]
+        if count > 1 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers - 1,
+                                                thread_name_prefix="airsim-state-fetch")
+        futures = [self._executor.submit(self._fetch, chunk) for chunk in chunks[1:]]
+        results = []
+        for chunk, future in zip(chunks, [None, *futures]):
+            try:
+                results.append((chunk, future.result() if future else self._fetch(chunk)))
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Error updating state of {[v.name for v in chunk]}: {e}")
+                for vehicle in chunk:
+                    vehicle.stats.errors += 1
+                    vehicle.failed = True
+                    vehicle.last_started = started
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        self.stats.record(latency_ms)
+
+        # 超过一个轮询间隔仍未返回的传感器本轮不再等待
+        deadline = started + min(vehicle.interval for vehicle in due)
+        sensor_futures = dict(zip(map(id, due), pending))
+        for chunk, states in results:
+            for vehicle, state in zip(chunk, states):
+                sensors = vehicle.sensors.collect(
+                    sensor_futures[id(vehicle)],
+                    timeout=max(0.0, deadline - time.perf_counter())
+                )
+                vehicle.stats.record(latency_ms)
+                vehicle.stats.record_cycle((time.perf_counter() - started) * 1000.0)
+                vehicle.apply(state, time.time(), sensors)
+                vehicle.failed = False
+                vehicle.last_started = started
+
+    def run(self):
+        """轮询循环：每次唤醒时轮询所有到期的无人机"""
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            due = [vehicle for vehicle in self.vehicles.values() if vehicle.due_at <= now]
+            if due:
+                try:
+                    self.poll(due)
+                except Exception as e:
+                    logger.error(f"Error polling vehicles: {e}")
+                    for vehicle in due:
+                        vehicle.failed = True
+                        vehicle.last_started = now
+            next_due = min((v.due_at for v in self.vehicles.values()), default=now + 1.0)
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                self._wake_event.wait(delay)
+                self._wake_event.clear()
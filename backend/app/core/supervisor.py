@@ -0,0 +1,193 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.backend import close_airsim_client, create_airsim_client
+from app.core.config import settings
+from app.core.vehicles import VehicleRegistry, vehicle_registry
+
+logger = logging.getLogger(__name__)
+
+# 连接状态
+STATE_CONNECTING = "connecting"       # 启动后首次连接
+STATE_CONNECTED = "connected"
+STATE_RECONNECTING = "reconnecting"   # 连接中断后重连
+STATE_STOPPED = "stopped"
+
+
+class ConnectionSupervisor:
+    """
+    AirSim连接监控
+
+    服务启动时不等待连接，由后台任务连接所有无人机；连接后定期检查状态轮询，
+    所有无人机的轮询都失败时用独立的探测连接确认仿真器是否可用，确认中断后丢弃连接池中的
+    全部连接，按带抖动的指数退避重连（重新发现无人机并重新启用API控制）。
+    探测连接的RPC超时为 SUPERVISOR_PROBE_TIMEOUT，每次重连前先探测，仿真器不可用时
+    不占用连接池的线程（连接池的连接使用默认的长超时）。
+    记录每次中断到恢复的耗时。
+    """
+
+    # 保留最近若干次恢复耗时
+    RECOVERY_HISTORY = 50
+
+    def __init__(self, registry: VehicleRegistry):
+        self.registry = registry
+        self.state = STATE_STOPPED
+        self.attempts = 0            # 当前这轮连接的尝试次数
+        self.last_error: Optional[str] = None
+        self.connected_since: Optional[float] = None
+        self.disconnected_at: Optional[float] = None
+        self.outages = 0
+        self.recovery_times: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+        # 探测连接：成功时复用，失败时关闭，下次探测重新创建
+        self._probe_client = None
+
+    def start(self):
+        """启动监控任务（立即返回）"""
+        if self._task is None or self._task.done():
+            self.state = STATE_CONNECTING
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_probe_client()
+        self.state = STATE_STOPPED
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次失败后的等待时间：指数退避，乘以[0.5, 1)的随机抖动"""
+        delay = min(settings.SUPERVISOR_BACKOFF_MAX,
+                    settings.SUPERVISOR_BACKOFF_MIN * 2 ** max(attempt - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _connect(self) -> bool:
+        """尝试连接所有无人机（先探测，仿真器不可用时不使用连接池）"""
+        self.attempts += 1
+        if not await self._probe():
+            return False
+        try:
+            connected = await asyncio.wait_for(self.registry.connect_all(),
+                                               settings.SUPERVISOR_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            connected = False
+            self.last_error = "Connection attempt timed out"
+        else:
+            if not connected:
+                self.last_error = "Failed to connect to AirSim"
+        if not connected:
+            # 下次重试使用全新的连接
+            self.registry.drop_all()
+            self.registry.default.pool.reset()
+        return connected
+
+    def _ping(self):
+        """在线程中执行：用探测连接 ping 仿真器（RPC超时为 SUPERVISOR_PROBE_TIMEOUT）"""
+        if self._probe_client is None:
+            self._probe_client = create_airsim_client(timeout=settings.SUPERVISOR_PROBE_TIMEOUT)
+        client = self._probe_client
+        try:
+            client.ping()
+        except Exception:
+            # 出错的连接不再复用
+            if self._probe_client is client:
+                self._close_probe_client()
+            raise
+
+    def _close_probe_client(self):
+        client, self._probe_client = self._probe_client, None
+        if client is not None:
+            try:
+                close_airsim_client(client)
+            except Exception as e:
+                logger.debug(f"Error closing probe connection: {e}")
+
+    async def _probe(self) -> bool:
+        """用不属于连接池的探测连接确认仿真器是否可用"""
+        try:
+            # RPC 本身也会在超时后返回，等待超时时线程不会长时间阻塞
+            await asyncio.wait_for(
+                asyncio.get_event_loop().run_in_executor(None, self._ping),
+                settings.SUPERVISOR_PROBE_TIMEOUT + 1.0
+            )
+            return True
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self._close_probe_client()
+            self.last_error = str(e) or type(e).__name__
+            return False
+
+    def _polling_failed(self) -> bool:
+        """所有已连接无人机最近一次状态轮询都失败"""
+        clients = [c for c in self.registry.vehicles.values() if c.is_connected]
+        return bool(clients) and all(client.poll_failed for client in clients)
+
+    def _on_connected(self):
+        now = time.time()
+        if self.disconnected_at is not None:
+            recovery = now - self.disconnected_at
+            self.recovery_times = (self.recovery_times + [recovery])[-self.RECOVERY_HISTORY:]
+            logger.info(f"Reconnected to AirSim after {recovery:.2f}s "
+                        f"({self.attempts} attempts)")
+            self.disconnected_at = None
+        self.state = STATE_CONNECTED
+        self.connected_since = now
+        self.attempts = 0
+        self.last_error = None
+
+    def _on_disconnected(self):
+        logger.warning("Lost connection to AirSim, reconnecting")
+        self.state = STATE_RECONNECTING
+        self.disconnected_at = time.time()
+        self.connected_since = None
+        self.outages += 1
+        self.registry.drop_all()
+        self.registry.default.pool.reset()
+
+    async def _run(self):
+        while True:
+            try:
+                if self.state == STATE_CONNECTED:
+                    await asyncio.sleep(settings.SUPERVISOR_CHECK_INTERVAL)
+                    if self._polling_failed() and not await self._probe():
+                        self._on_disconnected()
+                    continue
+
+                if await self._connect():
+                    self._on_connected()
+                else:
+                    delay = self.backoff(self.attempts)
+                    logger.info(f"AirSim not available ({self.last_error}), "
+                                f"retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Connection supervisor error: {e}")
+                await asyncio.sleep(settings.SUPERVISOR_CHECK_INTERVAL)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        recoveries = self.recovery_times
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "connected_for": round(now - self.connected_since, 3) if self.connected_since else None,
+            "disconnected_for": round(now - self.disconnected_at, 3) if self.disconnected_at else None,
+            "outages": self.outages,
+            "last_recovery_s": round(recoveries[-1], 3) if recoveries else None,
+            "avg_recovery_s": round(sum(recoveries) / len(recoveries), 3) if recoveries else None,
+            "max_recovery_s": round(max(recoveries), 3) if recoveries else None
+        }
+
+
+# 全局连接监控
+connection_supervisor = ConnectionSupervisor(vehicle_registry)
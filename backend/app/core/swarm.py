@@ -0,0 +1,230 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.core.commands import (
+    COMMAND_CANCELLED,
+    COMMAND_PENDING,
+    COMMAND_PREEMPTED,
+    COMMAND_RUNNING,
+    COMMAND_SUCCEEDED,
+    COMMAND_FAILED,
+    PRIORITY_NORMAL,
+    Command,
+)
+from app.models.drone import Vector3
+
+logger = logging.getLogger(__name__)
+
+# 成员：(无人机客户端, 指令协程工厂, 参数, 进度采样)
+Member = Tuple[Any, Callable[[], Awaitable[Any]], Dict[str, Any],
+               Optional[Callable[[], Optional[Dict[str, Any]]]]]
+
+
+def offset_position(position: Vector3, offset: Optional[Vector3]) -> Vector3:
+    """编队目标点加上某架无人机的偏移"""
+    if offset is None:
+        return position.model_copy()
+    return Vector3(x=position.x + offset.x, y=position.y + offset.y, z=position.z + offset.z)
+
+
+class StartBarrier:
+    """
+    编队起步屏障
+
+    各成员的指令在自己的指令执行器中开始执行后先在屏障处等待，全部到齐后同时发出RPC；
+    超过 timeout 仍有成员未就绪（被排队中的指令阻塞、被取消等）时屏障失效，整组放弃。
+    """
+
+    def __init__(self, parties: int, timeout: float):
+        self.parties = parties
+        self.timeout = timeout
+        self.arrived = 0
+        self.broken = False
+        self.released_at: Optional[float] = None
+        self._event = asyncio.Event()
+
+    @property
+    def released(self) -> bool:
+        return self.released_at is not None
+
+    async def wait(self):
+        if not self._event.is_set():
+            self.arrived += 1
+            if self.arrived >= self.parties:
+                self.released_at = time.time()
+                self._event.set()
+            else:
+                try:
+                    await asyncio.wait_for(self._event.wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    self.abort()
+                except asyncio.CancelledError:
+                    self.abort()
+                    raise
+        if self.broken:
+            raise Exception(f"Swarm start barrier broken ({self.arrived}/{self.parties} ready)")
+
+    def abort(self):
+        """放弃整组（已放行后无效）"""
+        if not self._event.is_set():
+            self.broken = True
+            self._event.set()
+
+
+class SwarmGroup:
+    """一次编队指令：每架无人机一条指令，状态按成员汇总"""
+
+    def __init__(self, name: str, parameters: Dict[str, Any], barrier: Optional[StartBarrier]):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.parameters = parameters
+        self.barrier = barrier
+        self.commands: Dict[str, Command] = {}
+        self.clients: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        """
+        汇总状态：有成员未结束时为 pending/running；全部成功为 succeeded；
+        全部被取消或抢占为 cancelled；否则为 failed（部分成员失败）
+        """
+        statuses = [command.status for command in self.commands.values()]
+        if COMMAND_RUNNING in statuses:
+            return COMMAND_RUNNING
+        if COMMAND_PENDING in statuses:
+            return COMMAND_PENDING
+        if all(status == COMMAND_SUCCEEDED for status in statuses):
+            return COMMAND_SUCCEEDED
+        if all(status in (COMMAND_CANCELLED, COMMAND_PREEMPTED) for status in statuses):
+            return COMMAND_CANCELLED
+        return COMMAND_FAILED
+
+    async def wait(self, timeout: Optional[float] = None) -> "SwarmGroup":
+        """等待所有成员结束"""
+        await asyncio.wait_for(
+            asyncio.gather(*(command.wait() for command in self.commands.values())), timeout
+        )
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for command in self.commands.values():
+            counts[command.status] = counts.get(command.status, 0) + 1
+        return {
+            "id": self.id,
+            "name": self.name,
+            "parameters": self.parameters,
+            "status": self.status,
+            "counts": counts,
+            "created_at": self.created_at,
+            "started_at": self.barrier.released_at if self.barrier else self.created_at,
+            "finished_at": self.finished_at,
+            "vehicles": {
+                vehicle_name: {
+                    "command_id": command.id,
+                    "status": command.status,
+                    "progress": command.progress,
+                    "error": command.error
+                }
+                for vehicle_name, command in self.commands.items()
+            }
+        }
+
+
+class SwarmDispatcher:
+    """
+    编队指令分发
+
+    每个成员的指令提交到各自无人机的指令执行器，各无人机并发执行；默认经过起步屏障，
+    所有成员同时开始飞行，整组耗时约等于单条指令的耗时。
+    """
+
+    def __init__(self):
+        self.groups: "OrderedDict[str, SwarmGroup]" = OrderedDict()
+
+    def dispatch(self, name: str, members: Dict[str, Member],
+                 parameters: Optional[Dict[str, Any]] = None, source: str = "api",
+                 priority: int = PRIORITY_NORMAL, barrier: bool = True) -> SwarmGroup:
+        """提交一组指令，立即返回（成员需先全部通过校验）"""
+        if not members:
+            raise ValueError("Swarm command has no vehicles")
+        group = SwarmGroup(name, parameters or {},
+                           StartBarrier(len(members), settings.SWARM_BARRIER_TIMEOUT)
+                           if barrier else None)
+        try:
+            for vehicle_name, (client, run, member_parameters, progress) in members.items():
+                group.commands[vehicle_name] = client.commands.submit(
+                    name, self._member_run(group, run),
+                    {**member_parameters, "group_id": group.id}, source, priority, progress
+                )
+                group.clients[vehicle_name] = client
+        except Exception:
+            # 部分成员提交失败时，已提交的成员在屏障处放弃
+            if group.barrier:
+                group.barrier.abort()
+            raise
+
+        self.groups[group.id] = group
+        self._trim()
+        group._supervisor = asyncio.create_task(self._supervise(group))
+        return group
+
+    def get(self, group_id: str) -> SwarmGroup:
+        group = self.groups.get(group_id)
+        if group is None:
+            raise KeyError(f"Unknown swarm command: {group_id}")
+        return group
+
+    async def cancel(self, group_id: str) -> SwarmGroup:
+        """取消整组指令"""
+        group = self.get(group_id)
+        if group.barrier:
+            group.barrier.abort()
+        results = await asyncio.gather(
+            *(group.clients[vehicle_name].commands.cancel(command.id)
+              for vehicle_name, command in group.commands.items()),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error cancelling swarm command {group_id}: {result}")
+        return group
+
+    @staticmethod
+    def _member_run(group: SwarmGroup, run: Callable[[], Awaitable[Any]]):
+        async def run_member():
+            if group.barrier:
+                await group.barrier.wait()
+            return await run()
+        return run_member
+
+    async def _supervise(self, group: SwarmGroup):
+        """屏障放行前有成员结束（失败、被取消或抢占）时放弃整组；记录整组结束时间"""
+        waits = {asyncio.ensure_future(command.wait()) for command in group.commands.values()}
+        try:
+            pending = waits
+            while pending:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if group.barrier and not group.barrier.released:
+                    group.barrier.abort()
+            group.finished_at = time.time()
+        finally:
+            for wait in waits:
+                wait.cancel()
+
+    def _trim(self):
+        """只保留最近 COMMAND_HISTORY_SIZE 组"""
+        while len(self.groups) > settings.COMMAND_HISTORY_SIZE:
+            self.groups.popitem(last=False)
+
+
+# 全局编队指令分发器
+swarm_dispatcher = SwarmDispatcher()
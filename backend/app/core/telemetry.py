@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.core.telemetry_codec import (
+    FLAG_DELTA,
+    FLAG_KEYFRAME,
+    FORMAT_BINARY,
+    FORMAT_JSON,
+    FIELD_SECTIONS,
+    FULL_MASK,
+    MODE_DELTA,
+    MODE_FULL,
+    MODE_PROJECTION,
+    DeltaEncoder,
+    encode_binary,
+    fields_mask,
+)
+from app.core.state_poller import StateRecord
+
+Frame = Union[str, bytes]
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetrySubscriber:
+    """单个订阅者的有界帧队列，队列满时丢弃最旧的帧"""
+
+    def __init__(self, maxsize: int, format: str = FORMAT_JSON, mode: str = MODE_FULL):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.format = format
+        # 连接时选择的帧模式（完整/增量），字段投影结束后恢复到该模式
+        self.stream_mode = mode
+        self.dropped_frames = 0
+        # 增量模式下，新订阅、丢帧或客户端请求重同步时需要先收到关键帧
+        self.needs_keyframe = mode == MODE_DELTA
+        # 投影模式下订阅的字段及频率(Hz)
+        self.rates: Dict[str, float] = {}
+
+    @property
+    def mode(self) -> str:
+        """当前帧模式：有字段投影时为投影模式，否则为连接时选择的模式"""
+        return MODE_PROJECTION if self.rates else self.stream_mode
+
+    def push(self, frame: Frame):
+        """放入一帧（不阻塞）"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped_frames += 1
+                if self.mode == MODE_DELTA:
+                    self.needs_keyframe = True
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(frame)
+
+    async def next_frame(self) -> Frame:
+        """等待下一帧"""
+        return await self.queue.get()
+
+    def request_resync(self):
+        """客户端检测到序号不连续，请求在下个周期发送关键帧"""
+        self.needs_keyframe = True
+
+    def set_projection(self, rates: Dict[str, float]):
+        """设置字段投影订阅；空字典恢复连接时选择的模式（增量模式从关键帧重新开始）"""
+        for field, hz in rates.items():
+            if field not in FIELD_SECTIONS:
+                raise ValueError(f"Unknown telemetry field: {field}")
+            if not isinstance(hz, (int, float)) or isinstance(hz, bool) or hz <= 0:
+                raise ValueError(f"Invalid rate for {field}: {hz}")
+        self.rates = {
+            field: min(float(rates[field]), settings.TELEMETRY_MAX_RATE)
+            for field in FIELD_SECTIONS if field in rates
+        }
+        self.needs_keyframe = self.stream_mode == MODE_DELTA
+
+    @property
+    def rate(self) -> float:
+        """该订阅者需要的最高频率"""
+        if self.mode == MODE_PROJECTION:
+            return max(self.rates.values())
+        return 1.0 / settings.WS_MESSAGE_INTERVAL
+
+    def due_fields(self, tick: int, tick_rate: float) -> Tuple[str, ...]:
+        """本周期需要发送的投影字段（频率按广播周期取整）"""
+        return tuple(
+            field for field, hz in self.rates.items()
+            if tick % max(1, round(tick_rate / hz)) == 0
+        )
+
+
+class TelemetryHub:
+    """遥测广播中心：每个周期只读取并序列化一次状态，再分发给所有订阅者
+
+    广播频率跟随订阅者中的最高需求（上限 TELEMETRY_MAX_RATE），
+    完整帧和增量帧订阅者仍按 WS_MESSAGE_INTERVAL 接收。每架无人机（DroneClient）各有一个。
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.subscribers: List[TelemetrySubscriber] = []
+        self.seq = 0
+        self.delta_encoder = DeltaEncoder(
+            settings.TELEMETRY_KEYFRAME_INTERVAL,
+            settings.TELEMETRY_DELTA_EPSILON
+        )
+        self._telemetry_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._broadcast_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动广播任务"""
+        if self._broadcast_task is None or self._broadcast_task.done():
+            self._broadcast_task = asyncio.create_task(self._broadcast_loop())
+
+    async def stop(self):
+        """停止广播任务"""
+        if self._broadcast_task:
+            self._broadcast_task.cancel()
+            try:
+                await self._broadcast_task
+            except asyncio.CancelledError:
+                pass
+            self._broadcast_task = None
+
+    def subscribe(self, format: str = FORMAT_JSON, mode: str = MODE_FULL) -> TelemetrySubscriber:
+        """注册订阅者"""
+        subscriber = TelemetrySubscriber(settings.TELEMETRY_QUEUE_SIZE, format, mode)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: TelemetrySubscriber):
+        """注销订阅者"""
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def _encode_full(self, telemetry: Optional[Dict[str, Any]], timestamp: float,
+                     format: str) -> Frame:
+        """编码完整帧；telemetry为None表示未连接"""
+        if format == FORMAT_BINARY:
+            return encode_binary(telemetry, self.seq, timestamp)
+        if telemetry is None:
+            return json.dumps({
+                "error": "Drone not connected",
+                "is_connected": False
+            })
+        return json.dumps(telemetry)
+
+    def _encode_keyframe(self, timestamp: float, format: str) -> Frame:
+        """按增量编码器的参考状态编码关键帧"""
+        encoder = self.delta_encoder
+        if format == FORMAT_BINARY:
+            return encode_binary(encoder.reference, encoder.seq, timestamp,
+                                 FULL_MASK, FLAG_KEYFRAME)
+        return json.dumps({"type": "keyframe", "seq": encoder.seq, **encoder.reference})
+
+    def _encode_delta(self, changes: Dict[str, Any], timestamp: float, format: str) -> Frame:
+        """编码增量帧"""
+        encoder = self.delta_encoder
+        if format == FORMAT_BINARY:
+            return encode_binary(encoder.reference, encoder.seq, timestamp,
+                                 fields_mask(changes), FLAG_DELTA)
+        return json.dumps({
+            "type": "delta",
+            "seq": encoder.seq,
+            "timestamp": encoder.reference["timestamp"],
+            "changes": changes
+        })
+
+    def _encode_projection(self, telemetry: Dict[str, Any], timestamp: float,
+                           fields: Tuple[str, ...], format: str) -> Frame:
+        """编码只包含指定字段的投影帧"""
+        if format == FORMAT_BINARY:
+            return encode_binary(telemetry, self.seq, timestamp, fields_mask(fields))
+        frame = {"seq": self.seq, "timestamp": telemetry["timestamp"]}
+        for field in fields:
+            frame[field] = telemetry[field]
+        return json.dumps(frame)
+
+    @property
+    def tick_rate(self) -> float:
+        """当前广播频率(Hz)"""
+        rate = max((s.rate for s in self.subscribers), default=0.0)
+        base = 1.0 / settings.WS_MESSAGE_INTERVAL
+        return min(max(rate, base), settings.TELEMETRY_MAX_RATE)
+
+    def _telemetry(self, record: StateRecord) -> Dict[str, Any]:
+        """状态记录转换为遥测数据，同一采样只转换一次"""
+        if self._telemetry_cache is None or self._telemetry_cache[0] != record.seq:
+            self._telemetry_cache = (record.seq, record.to_telemetry())
+        return self._telemetry_cache[1]
+
+    def _publish(self, record: Optional[StateRecord]):
+        """把一个周期的状态编码并分发给所有订阅者，每种帧只编码一次"""
+        telemetry = self._telemetry(record) if record else None
+        timestamp = record.timestamp if record else time.time()
+        tick_rate = self.tick_rate
+        full_due = self.seq % max(1, round(tick_rate * settings.WS_MESSAGE_INTERVAL)) == 0
+
+        delta: Optional[Tuple[bool, Dict[str, Any]]] = None
+        if full_due and telemetry is not None \
+                and any(s.mode == MODE_DELTA for s in self.subscribers):
+            delta = self.delta_encoder.update(telemetry, time.monotonic())
+
+        frames: Dict[Tuple[Any, ...], Frame] = {}
+        for subscriber in self.subscribers:
+            if subscriber.mode == MODE_PROJECTION and telemetry is not None:
+                fields = subscriber.due_fields(self.seq, tick_rate)
+                if not fields:
+                    continue
+                key = (subscriber.format, MODE_PROJECTION, fields)
+                frame = frames.get(key)
+                if frame is None:
+                    frame = self._encode_projection(telemetry, timestamp, fields,
+                                                    subscriber.format)
+                    frames[key] = frame
+                subscriber.push(frame)
+                continue
+
+            if not full_due:
+                continue
+            if subscriber.mode != MODE_DELTA or telemetry is None:
+                kind = "full"
+                if subscriber.mode == MODE_DELTA:
+                    subscriber.needs_keyframe = True
+            elif subscriber.needs_keyframe or (delta is not None and delta[0]):
+                kind = "keyframe"
+                subscriber.needs_keyframe = False
+            elif delta is not None:
+                kind = "delta"
+            else:
+                # 没有变化，本周期不发送
+                continue
+
+            key = (subscriber.format, kind)
+            frame = frames.get(key)
+            if frame is None:
+                if kind == "full":
+                    frame = self._encode_full(telemetry, timestamp, subscriber.format)
+                elif kind == "keyframe":
+                    frame = self._encode_keyframe(timestamp, subscriber.format)
+                else:
+                    frame = self._encode_delta(delta[1], timestamp, subscriber.format)
+                frames[key] = frame
+            subscriber.push(frame)
+
+    async def _broadcast_loop(self):
+        """广播循环"""
+        while True:
+            try:
+                # 让状态轮询频率跟随订阅需求
+                self.client.set_poll_demand(
+                    "telemetry", self.tick_rate if self.subscribers else 0.0
+                )
+                if self.subscribers:
+                    self.seq += 1
+                    record = None
+                    if self.client.is_connected:
+                        record = self.client.get_state_record()
+                    self._publish(record)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error broadcasting telemetry: {e}")
+            await asyncio.sleep(1.0 / self.tick_rate)
@@ -0,0 +1,329 @@
+"""
+遥测帧编码
+
+支持两种格式：
+- json:   默认格式，文本帧，与原有前端兼容
+- binary: 紧凑二进制帧，通过 ?format=binary 或子协议 airsim-telemetry.v1 协商
+
+二进制帧格式（版本 1，小端序）::
+
+    帧头 18 字节
+      u8   magic      固定 0xA5
+      u8   version    格式版本，当前为 1
+      u8   flags      bit0 = 已连接 AirSim, bit1 = 关键帧, bit2 = 增量帧
+      u8   reserved   保留，置 0
+      u16  mask       段掩码，表示帧中包含哪些数据段
+      u32  seq        帧序号（每个广播周期加 1，溢出回绕）
+      f64  timestamp  Unix 时间戳（秒）
+
+    数据段，按掩码位从低到高依次排列，只出现被置位的段
+      bit0 position   3 x f32   x, y, z（米，NED）
+      bit1 attitude   3 x f32   roll, pitch, yaw（度）
+      bit2 velocity   3 x f32   vx, vy, vz（米/秒）
+      bit3 status     u8 + f32  状态位(bit0 已解锁, bit1 飞行中) + 电量(%)
+      bit4 gps        2 x f64 + f32   纬度, 经度, 海拔（米）
+      bit5 imu        u64 + 6 x f32   仿真时间戳(ns), 角速度 x/y/z, 线加速度 x/y/z
+      bit6 barometer  u64 + 2 x f32   仿真时间戳(ns), 气压高度(米), 气压(Pa)
+      bit7 magnetometer u64 + 3 x f32 仿真时间戳(ns), 机体系磁场 x/y/z（高斯）
+      bit8 distance   u64 + f32       仿真时间戳(ns), 距离(米)
+
+    bit5~bit8 只在配置了对应传感器（SENSORS）且本周期读取成功时出现；同类传感器
+    有多个时二进制帧只携带第一个，完整读数见 JSON 的 sensors 字段。
+
+增量模式（?mode=delta）：
+    每隔 TELEMETRY_KEYFRAME_INTERVAL 秒发送一个关键帧（完整数据），其间只在有字段
+    变化超过 TELEMETRY_DELTA_EPSILON 时发送增量帧，没有变化的周期不发送任何帧。
+    增量流有独立的序号，每发出一帧（关键帧或增量帧）加 1，客户端发现序号不连续时
+    发送 "resync"（或 {"type": "resync"}）即可在下一个周期收到关键帧。
+    JSON 增量帧形如 {"type": "delta", "seq": n, "timestamp": ..., "changes": {...}}，
+    changes 只包含变化的字段；二进制增量帧以数据段为粒度，任一分量变化即发送整段。
+
+字段投影（订阅消息）：
+    客户端发送 {"position": 50, "attitude": 20, "gps_location": 1}（字段 -> Hz，
+    也可写成 {"type": "subscribe", "fields": {...}}）后，只按各自频率收到这些字段。
+    频率按广播周期取整，上限为 TELEMETRY_MAX_RATE；发送空字典恢复连接时的完整帧或增量模式
+    （增量模式从关键帧重新开始）。
+    JSON 投影帧形如 {"seq": n, "timestamp": ..., "position": {...}}；二进制投影帧
+    只包含对应数据段（is_armed/is_flying/battery_level 同属 status 段，sensors
+    对应 imu/barometer/magnetometer/distance 各段）。
+
+版本兼容规则：新增数据段只会使用更高的掩码位并追加在末尾，版本号不变；
+客户端遇到不认识的掩码位时停止解析即可。改变已有段的布局时才会提升版本号。
+"""
+import copy
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.drone import DroneState
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+MODE_FULL = "full"
+MODE_DELTA = "delta"
+MODE_PROJECTION = "projection"
+
+# WebSocket 子协议名，与二进制格式版本对应
+BINARY_SUBPROTOCOL = "airsim-telemetry.v1"
+
+MAGIC = 0xA5
+VERSION = 1
+
+FLAG_CONNECTED = 0x01
+FLAG_KEYFRAME = 0x02
+FLAG_DELTA = 0x04
+
+STATUS_ARMED = 0x01
+STATUS_FLYING = 0x02
+
+HEADER = struct.Struct("<BBBBHId")
+
+# (掩码位, 段名, struct格式)，顺序即帧内排列顺序
+SECTIONS = [
+    (0x0001, "position", "3f"),
+    (0x0002, "attitude", "3f"),
+    (0x0004, "velocity", "3f"),
+    (0x0008, "status", "Bf"),
+    (0x0010, "gps", "ddf"),
+    (0x0020, "imu", "Q6f"),
+    (0x0040, "barometer", "Q2f"),
+    (0x0080, "magnetometer", "Q3f"),
+    (0x0100, "distance", "Qf"),
+]
+
+# 传感器数据段（段名即传感器类型）
+SENSOR_SECTIONS = ("imu", "barometer", "magnetometer", "distance")
+
+SECTION_BITS = {name: bit for bit, name, _ in SECTIONS}
+FULL_MASK = 0
+for _bit, _name, _fmt in SECTIONS:
+    FULL_MASK |= _bit
+
+_structs: Dict[int, struct.Struct] = {}
+
+
+def _frame_struct(mask: int) -> struct.Struct:
+    """按掩码获取（并缓存）整帧的struct"""
+    frame_struct = _structs.get(mask)
+    if frame_struct is None:
+        fmt = HEADER.format + "".join(f for bit, _, f in SECTIONS if mask & bit)
+        frame_struct = struct.Struct(fmt)
+        _structs[mask] = frame_struct
+    return frame_struct
+
+
+def state_to_telemetry(state: DroneState) -> Dict[str, Any]:
+    """将无人机状态转换为可序列化的遥测数据"""
+    return {
+        "timestamp": state.position.timestamp.isoformat(),
+        "position": {
+            "x": state.position.x,
+            "y": state.position.y,
+            "z": state.position.z
+        },
+        "attitude": {
+            "roll": state.attitude.roll,
+            "pitch": state.attitude.pitch,
+            "yaw": state.attitude.yaw
+        },
+        "velocity": {
+            "vx": state.velocity.vx,
+            "vy": state.velocity.vy,
+            "vz": state.velocity.vz
+        },
+        "is_armed": state.is_armed,
+        "is_flying": state.is_flying,
+        "battery_level": state.battery_level,
+        "gps_location": state.gps_location,
+        "sim_timestamp": state.sim_timestamp,
+        "sensors": state.sensors
+    }
+
+
+def _sensor_reading(telemetry: Dict[str, Any], kind: str) -> Optional[Dict[str, Any]]:
+    """取某类传感器的第一个读数（键为 "类型" 或 "类型:名称"）"""
+    for key, reading in (telemetry.get("sensors") or {}).items():
+        if key == kind or key.startswith(kind + ":"):
+            return reading
+    return None
+
+
+def _vector_values(v: Dict[str, float]) -> List[float]:
+    return [v["x"], v["y"], v["z"]]
+
+
+def _section_values(name: str, telemetry: Dict[str, Any]) -> List[Any]:
+    """取出某个数据段的数值"""
+    if name == "position":
+        position = telemetry["position"]
+        return [position["x"], position["y"], position["z"]]
+    if name == "attitude":
+        attitude = telemetry["attitude"]
+        return [attitude["roll"], attitude["pitch"], attitude["yaw"]]
+    if name == "velocity":
+        velocity = telemetry["velocity"]
+        return [velocity["vx"], velocity["vy"], velocity["vz"]]
+    if name == "status":
+        flags = (STATUS_ARMED if telemetry["is_armed"] else 0) | \
+            (STATUS_FLYING if telemetry["is_flying"] else 0)
+        return [flags, telemetry["battery_level"]]
+    if name in SENSOR_SECTIONS:
+        reading = _sensor_reading(telemetry, name)
+        values = [reading["sim_timestamp"]]
+        if name == "imu":
+            values += _vector_values(reading["angular_velocity"])
+            values += _vector_values(reading["linear_acceleration"])
+        elif name == "barometer":
+            values += [reading["altitude"], reading["pressure"]]
+        elif name == "magnetometer":
+            values += _vector_values(reading["magnetic_field_body"])
+        else:
+            values.append(reading["distance"])
+        return values
+    gps = telemetry["gps_location"]
+    return [gps["latitude"], gps["longitude"], gps["altitude"]]
+
+
+def encode_binary(telemetry: Optional[Dict[str, Any]], seq: int, timestamp: float = 0.0,
+                  mask: int = FULL_MASK, flags: int = 0) -> bytes:
+    """编码二进制帧；telemetry为None时编码一个未连接帧"""
+    if telemetry is None:
+        return HEADER.pack(MAGIC, VERSION, flags, 0, 0, seq & 0xFFFFFFFF, timestamp)
+
+    if telemetry.get("gps_location") is None:
+        mask &= ~SECTION_BITS["gps"]
+    for name in SENSOR_SECTIONS:
+        if mask & SECTION_BITS[name] and _sensor_reading(telemetry, name) is None:
+            mask &= ~SECTION_BITS[name]
+
+    values: List[Any] = [
+        MAGIC, VERSION, flags | FLAG_CONNECTED, 0, mask, seq & 0xFFFFFFFF, timestamp
+    ]
+    for bit, name, _ in SECTIONS:
+        if mask & bit:
+            values.extend(_section_values(name, telemetry))
+    return _frame_struct(mask).pack(*values)
+
+
+def decode_binary(frame: bytes) -> Dict[str, Any]:
+    """解码二进制帧（参考实现，供客户端和测试脚本使用）"""
+    magic, version, flags, _, mask, seq, timestamp = HEADER.unpack_from(frame, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Invalid telemetry frame magic: {magic:#x}")
+    if version != VERSION:
+        raise ValueError(f"Unsupported telemetry frame version: {version}")
+
+    result: Dict[str, Any] = {
+        "seq": seq,
+        "timestamp": timestamp,
+        "is_connected": bool(flags & FLAG_CONNECTED),
+        "is_keyframe": bool(flags & FLAG_KEYFRAME),
+        "is_delta": bool(flags & FLAG_DELTA)
+    }
+    offset = HEADER.size
+    for bit, name, fmt in SECTIONS:
+        if not mask & bit:
+            continue
+        section = struct.Struct("<" + fmt)
+        values = section.unpack_from(frame, offset)
+        offset += section.size
+        if name == "position":
+            result[name] = dict(zip(("x", "y", "z"), values))
+        elif name == "attitude":
+            result[name] = dict(zip(("roll", "pitch", "yaw"), values))
+        elif name == "velocity":
+            result[name] = dict(zip(("vx", "vy", "vz"), values))
+        elif name == "status":
+            result["is_armed"] = bool(values[0] & STATUS_ARMED)
+            result["is_flying"] = bool(values[0] & STATUS_FLYING)
+            result["battery_level"] = values[1]
+        elif name in SENSOR_SECTIONS:
+            sensors = result.setdefault("sensors", {})
+            reading: Dict[str, Any] = {"sim_timestamp": values[0]}
+            if name == "imu":
+                reading["angular_velocity"] = dict(zip("xyz", values[1:4]))
+                reading["linear_acceleration"] = dict(zip("xyz", values[4:7]))
+            elif name == "barometer":
+                reading["altitude"], reading["pressure"] = values[1:3]
+            elif name == "magnetometer":
+                reading["magnetic_field_body"] = dict(zip("xyz", values[1:4]))
+            else:
+                reading["distance"] = values[1]
+            sensors[name] = reading
+        else:
+            result["gps_location"] = dict(zip(("latitude", "longitude", "altitude"), values))
+    return result
+
+
+# 遥测顶层字段 -> 所属二进制数据段（增量比较和字段投影都按这些字段进行）
+FIELD_SECTIONS = {
+    "position": ("position",),
+    "attitude": ("attitude",),
+    "velocity": ("velocity",),
+    "is_armed": ("status",),
+    "is_flying": ("status",),
+    "battery_level": ("status",),
+    "gps_location": ("gps",),
+    "sensors": SENSOR_SECTIONS,
+}
+
+
+def _changed(old: Any, new: Any, epsilon: float) -> bool:
+    """判断数值变化是否超过阈值"""
+    if isinstance(new, bool) or not isinstance(new, (int, float)) \
+            or not isinstance(old, (int, float)):
+        return old != new
+    return abs(new - old) > epsilon
+
+
+class DeltaEncoder:
+    """共享的增量编码器：维护所有同步客户端共同认可的参考状态"""
+
+    def __init__(self, keyframe_interval: float, epsilon: float):
+        self.keyframe_interval = keyframe_interval
+        self.epsilon = epsilon
+        self.seq = 0
+        self.reference: Optional[Dict[str, Any]] = None
+        self._last_keyframe: Optional[float] = None
+
+    def update(self, telemetry: Dict[str, Any], now: float) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """
+        用新的遥测数据更新参考状态
+
+        返回 (是否关键帧, 变化字段)；没有需要发送的内容时返回None
+        """
+        if self.reference is None or self._last_keyframe is None \
+                or now - self._last_keyframe >= self.keyframe_interval:
+            self.reference = copy.deepcopy(telemetry)
+            self._last_keyframe = now
+            self.seq += 1
+            return True, self.reference
+
+        changes: Dict[str, Any] = {}
+        for key in FIELD_SECTIONS:
+            old = self.reference.get(key)
+            new = telemetry.get(key)
+            if isinstance(new, dict) and isinstance(old, dict):
+                changed = {k: v for k, v in new.items() if _changed(old.get(k), v, self.epsilon)}
+                if changed:
+                    old.update(changed)
+                    changes[key] = changed
+            elif _changed(old, new, self.epsilon):
+                self.reference[key] = copy.deepcopy(new)
+                changes[key] = new
+
+        self.reference["timestamp"] = telemetry["timestamp"]
+        if not changes:
+            return None
+        self.seq += 1
+        return False, changes
+
+
+
+def fields_mask(fields) -> int:
+    """一组遥测字段对应的二进制段掩码"""
+    mask = 0
+    for key in fields:
+        for name in FIELD_SECTIONS[key]:
+            mask |= SECTION_BITS[name]
+    return mask
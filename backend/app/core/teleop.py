@@ -0,0 +1,125 @@
+import asyncio
+import math
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.core.drone_client import clamp_speed
+from app.core.recorder import flight_recorder
+from app.core.rpc_pool import LANE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+# 二进制设定点帧：vx, vy, vz（米/秒，NED），可选 u32 序号
+SETPOINT = struct.Struct("<3f")
+SETPOINT_WITH_SEQ = struct.Struct("<3fI")
+
+
+def parse_setpoint(message: Any) -> Tuple[float, float, float, Optional[int]]:
+    """解析设定点：JSON {"vx", "vy", "vz", "seq"?} 或二进制帧，返回 (vx, vy, vz, seq)"""
+    if isinstance(message, bytes):
+        if len(message) == SETPOINT_WITH_SEQ.size:
+            setpoint = SETPOINT_WITH_SEQ.unpack(message)
+        elif len(message) == SETPOINT.size:
+            setpoint = (*SETPOINT.unpack(message), None)
+        else:
+            raise ValueError(f"Invalid setpoint frame length: {len(message)}")
+    else:
+        try:
+            seq = message.get("seq")
+            setpoint = (float(message.get("vx", 0.0)), float(message.get("vy", 0.0)),
+                        float(message.get("vz", 0.0)), None if seq is None else int(seq))
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError("Setpoint must be {\"vx\": .., \"vy\": .., \"vz\": ..}")
+    # JSON 的 NaN/Infinity 和二进制帧都可能带来非有限值，clamp 无法限制
+    if not all(math.isfinite(v) for v in setpoint[:3]):
+        raise ValueError("Setpoint velocities must be finite")
+    return setpoint
+
+
+class VelocitySession:
+    """
+    单个控制连接的速度设定点通道
+
+    收到的设定点只保存最新的一个（latest-wins），发送循环最多以 CONTROL_MAX_RATE
+    转发给 moveByVelocityAsync，RPC进行中或限速等待期间到达的设定点被合并。
+    超过 CONTROL_DEADMAN_TIMEOUT 没有新设定点时悬停；每个设定点的持续时间也设为
+    该超时，服务端失联时飞控同样会停止执行旧的速度。
+    转发设定点前抢占指令执行器中的指令（被打断的 goto/任务不会被记为成功）。
+    """
+
+    def __init__(self, client, owner: str):
+        self.client = client
+        self.owner = owner
+        self.received = 0
+        self.forwarded = 0
+        # 是否正在按设定点飞行（deadman只在此期间生效）
+        self.active = False
+        self._latest: Optional[Tuple[float, float, float]] = None
+        self._latest_seq: Optional[int] = None
+        self._last_setpoint = 0.0
+        self._event = asyncio.Event()
+
+    def submit(self, vx: float, vy: float, vz: float, seq: Optional[int] = None):
+        """收到新的设定点（覆盖尚未转发的旧设定点）"""
+        self._latest = clamp_speed(vx, vy, vz)
+        self._latest_seq = seq
+        self._last_setpoint = time.monotonic()
+        self.received += 1
+        self._event.set()
+
+    async def _hover(self):
+        try:
+            await self.client.hover(lane=LANE_CONTROL)
+        except Exception as e:
+            logger.error(f"Deadman hover failed: {e}")
+        self.active = False
+
+    async def run(self, send_event: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """发送循环，直到任务被取消；退出时若仍在飞行则悬停"""
+        interval = 1.0 / settings.CONTROL_MAX_RATE
+        deadman = settings.CONTROL_DEADMAN_TIMEOUT
+        self.client.set_poll_demand(self.owner, settings.CONTROL_POLL_RATE)
+        try:
+            while True:
+                timeout = None
+                if self.active:
+                    timeout = max(0.0, deadman - (time.monotonic() - self._last_setpoint))
+                try:
+                    await asyncio.wait_for(self._event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    await self._hover()
+                    await send_event({"type": "deadman", "timeout": deadman})
+                    continue
+                self._event.clear()
+
+                started = time.monotonic()
+                (vx, vy, vz), seq = self._latest, self._latest_seq
+                # 接管控制：排队中和正在执行的飞行指令被抢占
+                self.client.commands.preempt()
+                try:
+                    await self.client.send_velocity(vx, vy, vz, duration=deadman)
+                except Exception as e:
+                    await send_event({"type": "error", "error": str(e)})
+                else:
+                    self.forwarded += 1
+                    self.active = True
+                    flight_recorder.record_command(
+                        "velocity", {"vx": vx, "vy": vy, "vz": vz}, "ws")
+                    if seq is not None:
+                        await send_event({
+                            "type": "ack",
+                            "seq": seq,
+                            "received": self.received,
+                            "forwarded": self.forwarded
+                        })
+                # 限速：等待期间到达的设定点只保留最新的
+                delay = interval - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        finally:
+            self.client.set_poll_demand(self.owner, 0)
+            if self.active:
+                await self._hover()
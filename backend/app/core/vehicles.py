@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.drone_client import DroneClient, drone_client
+from app.core.rpc_pool import LANE_COMMAND, LANE_CONTROL, LANE_LIDAR, LANE_SENSOR
+
+logger = logging.getLogger(__name__)
+
+
+class VehicleRegistry:
+    """
+    多无人机注册表，按AirSim的vehicle_name索引DroneClient
+
+    所有无人机共享默认客户端的RPC连接池和状态轮询线程；只有默认无人机写入飞行记录器。
+    无人机列表取 VEHICLES 配置，为空时在连接时通过 listVehicles 发现。
+    """
+
+    def __init__(self, default: DroneClient):
+        self.default = default
+        self.vehicles: Dict[str, DroneClient] = {default.vehicle_name: default}
+        self._started = False
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.vehicles)
+
+    def get(self, vehicle_name: Optional[str] = None) -> DroneClient:
+        """按名称取无人机，名称为空时返回默认无人机；未知名称抛出 KeyError"""
+        if not vehicle_name:
+            return self.default
+        client = self.vehicles.get(vehicle_name)
+        if client is None:
+            raise KeyError(f"Unknown vehicle: {vehicle_name}")
+        return client
+
+    def select(self, names: Optional[List[str]] = None) -> Dict[str, DroneClient]:
+        """按名称选取一组无人机（留空为全部），未知名称抛出 KeyError"""
+        if not names:
+            return dict(self.vehicles)
+        clients = [self.get(name) for name in names]
+        return {client.vehicle_name: client for client in clients}
+
+    async def discover(self) -> List[str]:
+        """返回配置的无人机列表，未配置时向仿真器查询"""
+        if settings.VEHICLES:
+            return list(settings.VEHICLES)
+        try:
+            return list(await self.default._rpc(lambda client: client.listVehicles()))
+        except Exception as e:
+            logger.error(f"Failed to list vehicles: {e}")
+            return []
+
+    async def _register(self, names: List[str]):
+        """按无人机列表建立客户端，第一架沿用默认客户端（重新发现时保留已有的客户端）"""
+        if not names:
+            return
+        self.default.vehicle_name = names[0]
+        vehicles = {names[0]: self.default}
+        for name in names[1:]:
+            client = self.vehicles.get(name)
+            if client is None or client is self.default:
+                client = DroneClient(name, pool=self.default.pool, poller=self.default.poller,
+                                     record_flight=False)
+                if self._started:
+                    client.commands.start()
+                    client.telemetry.start()
+                    client.occupancy.start()
+            vehicles[name] = client
+        removed = [c for c in self.vehicles.values() if c not in vehicles.values()]
+        self.vehicles = vehicles
+        for client in removed:
+            await client.disconnect()
+            await client.occupancy.stop()
+            await client.camera.stop()
+            await client.lidar.stop()
+            await client.telemetry.stop()
+            await client.commands.stop()
+
+        # 每架无人机同一时间最多一条阻塞的飞行指令和一个速度控制连接
+        pool = self.default.pool
+        count = len(vehicles)
+        pool.ensure_size(LANE_COMMAND, settings.RPC_POOL_COMMAND + count - 1)
+        pool.ensure_size(LANE_CONTROL, settings.RPC_POOL_CONTROL * count)
+        pool.ensure_size(LANE_SENSOR,
+                         (len(settings.SENSORS) + (1 if settings.CAMERAS else 0)) * count)
+        pool.ensure_size(LANE_LIDAR, len(settings.LIDARS) * count)
+
+    async def connect_all(self) -> bool:
+        """发现无人机并全部连接，返回是否全部连接成功"""
+        await self._register(await self.discover())
+        results = await asyncio.gather(*(client.connect() for client in self.vehicles.values()))
+        if len(self.vehicles) > 1:
+            logger.info(f"Vehicles: {', '.join(self.vehicles)}")
+        return all(results)
+
+    async def disconnect_all(self):
+        await asyncio.gather(*(client.disconnect() for client in self.vehicles.values()))
+
+    def drop_all(self):
+        """仿真器连接中断：所有无人机标记为未连接（不发送RPC）"""
+        for client in self.vehicles.values():
+            client.drop_connection()
+
+    def start(self):
+        """启动各无人机的指令执行器、遥测广播和占据地图（之后发现的无人机自动启动）"""
+        self._started = True
+        for client in self.vehicles.values():
+            client.commands.start()
+            client.telemetry.start()
+            client.occupancy.start()
+
+    async def stop(self):
+        self._started = False
+        for client in self.vehicles.values():
+            await client.occupancy.stop()
+            await client.camera.stop()
+            await client.lidar.stop()
+            await client.telemetry.stop()
+            await client.commands.stop()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """各无人机的连接状态和最新位置"""
+        result = []
+        for name, client in self.vehicles.items():
+            position = client.current_position()
+            result.append({
+                "vehicle_name": name,
+                "default": client is self.default,
+                "is_connected": client.is_connected,
+                "position": dict(zip("xyz", position)) if position else None
+            })
+        return result
+
+
+# 全局注册表，默认无人机即 drone_client
+vehicle_registry = VehicleRegistry(drone_client)
@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from fastapi import WebSocket
 import json
 import asyncio
@@ -11,8 +11,8 @@ class ConnectionManager:
         self.active_connections: List[WebSocket] = []
         self._broadcast_task = None
         
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, subprotocol: Optional[str] = None):
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
         logger.info(f"WebSocket client connected. Total connections: {len(self.active_connections)}")
         
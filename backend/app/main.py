@@ -5,7 +5,11 @@ import logging
 
 from app.core.config import settings
 from app.core.drone_client import drone_client
-from app.api import control, status, chat
+from app.core.recorder import flight_recorder
+from app.core.safety import safety_engine
+from app.core.supervisor import connection_supervisor
+from app.core.vehicles import vehicle_registry
+from app.api import camera, control, lidar, occupancy, status, chat, swarm, vehicles
 from app.mcp import mcp_router
 
 # 配置日志
@@ -20,11 +24,20 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时
     logger.info("Starting AirSim Drone Control Service...")
-    await drone_client.connect()
+    if settings.RECORDER_ENABLED:
+        flight_recorder.start()
+    if settings.NO_FLY_ZONES_FILE:
+        safety_engine.load(settings.NO_FLY_ZONES_FILE)
+    # 不等待AirSim：连接监控在后台连接，仿真器重启后自动重连
+    vehicle_registry.start()
+    connection_supervisor.start()
     yield
     # 关闭时
     logger.info("Shutting down AirSim Drone Control Service...")
-    await drone_client.disconnect()
+    await connection_supervisor.stop()
+    await vehicle_registry.stop()
+    await vehicle_registry.disconnect_all()
+    flight_recorder.stop(timeout=5.0)
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -55,6 +68,68 @@ app.include_router(
     tags=["status"]
 )
 
+app.include_router(
+    camera.router,
+    prefix=f"{settings.API_V1_STR}/camera",
+    tags=["camera"]
+)
+
+app.include_router(
+    lidar.router,
+    prefix=f"{settings.API_V1_STR}/lidar",
+    tags=["lidar"]
+)
+
+app.include_router(
+    occupancy.router,
+    prefix=f"{settings.API_V1_STR}/occupancy",
+    tags=["occupancy"]
+)
+
+# 多无人机：/vehicles 列表，控制、状态、相机、LiDAR 和占据地图接口按无人机名挂载；
+# 上面不带无人机名的接口作用于默认无人机（或由 ?vehicle_name= 指定）
+app.include_router(
+    vehicles.router,
+    prefix=f"{settings.API_V1_STR}/vehicles",
+    tags=["vehicles"]
+)
+
+app.include_router(
+    control.router,
+    prefix=f"{settings.API_V1_STR}/vehicles/{{vehicle_name}}/control",
+    tags=["control"]
+)
+
+app.include_router(
+    status.router,
+    prefix=f"{settings.API_V1_STR}/vehicles/{{vehicle_name}}/status",
+    tags=["status"]
+)
+
+app.include_router(
+    camera.router,
+    prefix=f"{settings.API_V1_STR}/vehicles/{{vehicle_name}}/camera",
+    tags=["camera"]
+)
+
+app.include_router(
+    lidar.router,
+    prefix=f"{settings.API_V1_STR}/vehicles/{{vehicle_name}}/lidar",
+    tags=["lidar"]
+)
+
+app.include_router(
+    occupancy.router,
+    prefix=f"{settings.API_V1_STR}/vehicles/{{vehicle_name}}/occupancy",
+    tags=["occupancy"]
+)
+
+app.include_router(
+    swarm.router,
+    prefix=f"{settings.API_V1_STR}/swarm",
+    tags=["swarm"]
+)
+
 app.include_router(
     chat.router,
     prefix=f"{settings.API_V1_STR}/chat",
@@ -83,7 +158,8 @@ async def health_check():
     """健康检查"""
     return {
         "status": "healthy",
-        "drone_connected": drone_client.is_connected
+        "drone_connected": drone_client.is_connected,
+        "connection": connection_supervisor.to_dict()
     }
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends, Header
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
-from app.core.drone_client import drone_client
+from app.core.commands import COMMAND_SUCCEEDED, PRIORITY_EMERGENCY, PRIORITY_NORMAL
+from app.core.drone_client import DroneClient
+from app.core.vehicles import vehicle_registry
+from app.core.recorder import flight_recorder
 from app.models.drone import Vector3, DroneState
 import logging
 
@@ -29,7 +32,7 @@ AVAILABLE_TOOLS = {
         "handler": "handle_land"
     },
     "move_to_position": {
-        "description": "Move to specified position",
+        "description": "Move to specified position, planning a detour around no-fly zones and obstacles if needed",
         "handler": "handle_move_to_position"
     },
     "hover": {
@@ -43,9 +46,20 @@ AVAILABLE_TOOLS = {
     "emergency_stop": {
         "description": "Emergency stop",
         "handler": "handle_emergency_stop"
+    },
+    "list_vehicles": {
+        "description": "List available vehicles",
+        "handler": "handle_list_vehicles"
     }
 }
 
+# Tools that only read state and bypass the command executor
+READ_ONLY_TOOLS = ("get_drone_state", "list_vehicles")
+
+# Tools that act immediately instead of queueing behind running commands
+# (same as REST /control/hover); emergency_stop preempts through the executor
+IMMEDIATE_TOOLS = ("hover",)
+
 # Simple authentication check
 async def verify_mcp_token(authorization: str = Header(...)) -> bool:
     """Verify MCP auth token"""
@@ -56,23 +70,23 @@ async def verify_mcp_token(authorization: str = Header(...)) -> bool:
     return True
 
 # Tool handlers
-async def handle_takeoff(params: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_takeoff(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
     """Handle takeoff command"""
     altitude = params.get("altitude", 10)
     if altitude < 1 or altitude > 100:
         raise ValueError("Altitude must be between 1 and 100 meters")
     
     # Use the built-in takeoff method which handles altitude
-    await drone_client.takeoff(altitude)
+    await client.takeoff(altitude)
     
     return {"message": f"Takeoff to {altitude}m completed"}
 
-async def handle_land(params: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_land(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
     """Handle land command"""
-    await drone_client.land()
+    await client.land()
     return {"message": "Landing completed"}
 
-async def handle_move_to_position(params: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_move_to_position(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
     """Handle move to position command"""
     x = params.get("x", 0)
     y = params.get("y", 0)
@@ -81,28 +95,36 @@ async def handle_move_to_position(params: Dict[str, Any]) -> Dict[str, Any]:
     
     # Create Vector3 position
     position = Vector3(x=x, y=y, z=z)
-    await drone_client.move_to_position(position, velocity)
+    # Plan around no-fly zones and obstacles (cached for repeated moves)
+    route = await client.plan_route(position)
+    await client.move_to_position(position, velocity, route)
     
     return {
         "message": f"Moved to position ({x}, {y}, {z})",
-        "position": {"x": x, "y": y, "z": z}
+        "position": {"x": x, "y": y, "z": z},
+        "waypoints": len(route)
     }
 
-async def handle_hover(params: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle hover command"""
-    await drone_client.hover()
+async def handle_hover(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle hover command (preempts queued and running commands, like REST hover)"""
+    client.commands.preempt()
+    await client.hover()
     return {"message": "Hovering at current position"}
 
-async def handle_get_state(params: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_get_state(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
     """Handle get state command"""
-    state = await drone_client.get_state()
+    state = await client.get_state()
     return {"state": state}
 
-async def handle_emergency_stop(params: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_emergency_stop(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
     """Handle emergency stop command"""
-    await drone_client.emergency_stop()
+    await client.emergency_stop()
     return {"message": "Emergency stop executed"}
 
+async def handle_list_vehicles(client: DroneClient, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle list vehicles command"""
+    return {"vehicles": vehicle_registry.summary()}
+
 # Main MCP endpoints
 @router.post("/execute", response_model=MCPResponse, dependencies=[Depends(verify_mcp_token)])
 async def execute_tool(request: MCPRequest):
@@ -127,8 +149,35 @@ async def execute_tool(request: MCPRequest):
                 error=f"Handler not found for tool: {tool_name}"
             )
         
-        # Execute tool
-        result = await handler(parameters)
+        # Every tool accepts an optional "vehicle_name"; the default vehicle otherwise
+        try:
+            client = vehicle_registry.get(parameters.get("vehicle_name"))
+        except KeyError as e:
+            return MCPResponse(success=False, error=e.args[0])
+        
+        if tool_name in READ_ONLY_TOOLS:
+            result = await handler(client, parameters)
+        elif tool_name in IMMEDIATE_TOOLS:
+            flight_recorder.record_command(tool_name, parameters, "mcp")
+            result = await handler(client, parameters)
+        else:
+            # Record state-changing tools in the flight recorder
+            flight_recorder.record_command(tool_name, parameters, "mcp")
+
+            # Run through the command executor so MCP commands are ordered with
+            # REST commands; MCP callers still wait for completion
+            priority = PRIORITY_EMERGENCY if tool_name == "emergency_stop" else PRIORITY_NORMAL
+            command = client.commands.submit(
+                tool_name, lambda: handler(client, parameters), parameters, "mcp", priority
+            )
+            await command.wait()
+            if command.status != COMMAND_SUCCEEDED:
+                return MCPResponse(
+                    success=False,
+                    error=command.error or f"Command {command.status}",
+                    result={"command_id": command.id, "status": command.status}
+                )
+            result = {**command.result, "command_id": command.id}
         
         return MCPResponse(
             success=True,
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 class Vector3(BaseModel):
     x: float = 0.0
@@ -38,6 +38,8 @@ class DroneState(BaseModel):
     is_flying: bool = False
     battery_level: float = 100.0
     gps_location: Optional[dict] = None
+    sim_timestamp: Optional[int] = None   # 仿真器时间戳(ns)
+    sensors: Optional[dict] = None        # 传感器读数，键为配置中的传感器名
     
 class ControlCommand(BaseModel):
     command: str
@@ -52,4 +54,46 @@ class MoveCommand(BaseModel):
     
 class GotoCommand(BaseModel):
     position: Vector3
-    speed: float = 5.0 
\ No newline at end of file
+    speed: float = 5.0
+
+class NoFlyZone(BaseModel):
+    id: Optional[str] = None
+    polygon: List[Tuple[float, float]] = Field(min_length=3)  # 水平多边形顶点(x, y)，NED坐标(米)
+    min_altitude: Optional[float] = None   # 棱柱底部高度(米，向上为正)，留空表示不限
+    max_altitude: Optional[float] = None   # 棱柱顶部高度(米)，留空表示不限
+
+class PathCheckRequest(BaseModel):
+    points: List[Vector3]
+    start: Optional[Vector3] = None        # 留空时第一个点即起点
+
+class OccupancyQuery(BaseModel):
+    points: List[Vector3]
+
+class PlanRequest(BaseModel):
+    goal: Vector3
+    start: Optional[Vector3] = None        # 留空时从当前位置出发
+
+class MissionWaypoint(BaseModel):
+    x: float
+    y: float
+    z: float
+    speed: Optional[float] = Field(default=None, gt=0)  # 留空时使用任务默认速度
+
+class MissionCommand(BaseModel):
+    waypoints: List[MissionWaypoint]
+    speed: float = Field(default=5.0, gt=0) 
+
+class SwarmCommand(BaseModel):
+    vehicles: Optional[List[str]] = None   # 参与的无人机，留空表示全部
+    formation: Dict[str, Vector3] = {}     # 各无人机相对编队目标点的偏移(米，NED)，未列出的无人机偏移为0
+
+class SwarmTakeoffCommand(SwarmCommand):
+    altitude: float = 10.0                 # 编队基准起飞高度，各无人机再加上 -偏移.z
+
+class SwarmGotoCommand(SwarmCommand):
+    position: Vector3
+    speed: float = 5.0
+
+class SwarmMissionCommand(SwarmCommand):
+    waypoints: List[MissionWaypoint]
+    speed: float = Field(default=5.0, gt=0)
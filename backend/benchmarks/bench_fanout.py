@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+遥测广播压测 - 同时打开N个 /status/ws 连接，统计收到的帧率和字节数
+
+先以回放后端启动服务（无需AirSim）：
+    DRONE_BACKEND=replay uvicorn app.main:app --port 8000
+再运行：
+    python -m benchmarks.bench_fanout --clients 500 --seconds 10
+"""
+
+import argparse
+import asyncio
+import time
+
+import websockets
+
+
+async def client(url: str, deadline: float, stats: dict):
+    frames = 0
+    received = 0
+    try:
+        async with websockets.connect(url, max_queue=None) as ws:
+            while time.monotonic() < deadline:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                frames += 1
+                received += len(message)
+    except Exception as e:
+        stats["errors"] += 1
+        stats["last_error"] = str(e)
+    stats["frames"] += frames
+    stats["bytes"] += received
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="遥测广播压测")
+    parser.add_argument("--url", default="ws://localhost:8000/api/v1/status/ws")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    stats = {"frames": 0, "bytes": 0, "errors": 0, "last_error": None}
+    deadline = time.monotonic() + args.seconds
+    await asyncio.gather(*(client(args.url, deadline, stats) for _ in range(args.clients)))
+
+    print(f"=== 遥测广播压测: {args.clients} 个客户端, {args.seconds}s ===")
+    print(f"总帧数: {stats['frames']}  ({stats['frames'] / args.seconds:.1f} 帧/秒)")
+    print(f"每客户端: {stats['frames'] / args.clients / args.seconds:.2f} 帧/秒, "
+          f"{stats['bytes'] / args.clients / args.seconds:.0f} B/s")
+    print(f"连接错误: {stats['errors']}" +
+          (f" (最后一个: {stats['last_error']})" if stats["last_error"] else ""))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+共享内存帧环基准 - 1080p 未压缩图像分发给N个读取进程：共享内存帧环 vs multiprocessing.Queue
+
+写入方以最高速度写入 1920x1080x3 的帧（模拟 simGetImages 返回的 bytes），每个读取进程
+等待新帧并复制到自己的数组。帧环方式只传递帧描述，Queue 方式对每个读取方 pickle 整帧。
+统计写入帧率、各读取方完整读到的帧率以及因落后被覆盖而作废的帧数。
+
+运行: python -m benchmarks.bench_frame_ring [--readers 1,2,4] [--seconds 3] [--slots 8]
+"""
+
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from app.core.frame_ring import FrameReader, FrameRing
+
+WIDTH, HEIGHT, CHANNELS = 1920, 1080, 3
+
+
+def _ring_reader(name: str, seconds: float, results):
+    reader = FrameReader(name)
+    out = np.empty((HEIGHT, WIDTH, CHANNELS), dtype=np.uint8)
+    read = torn = 0
+    seq = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        descriptor = reader.wait(seq, timeout=0.1)
+        if descriptor is None:
+            continue
+        if reader.read(descriptor, out) is None:
+            torn += 1
+        else:
+            read += 1
+        seq = descriptor.seq
+    reader.close()
+    results.put((read, torn))
+
+
+def _queue_reader(queue, seconds: float, results):
+    read = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            data = queue.get(timeout=0.1)
+        except Exception:
+            continue
+        np.frombuffer(data, dtype=np.uint8).reshape(HEIGHT, WIDTH, CHANNELS)
+        read += 1
+    results.put((read, 0))
+
+
+def bench_ring(readers: int, seconds: float, slots: int):
+    frame = bytes(WIDTH * HEIGHT * CHANNELS)
+    ring = FrameRing(slots, len(frame))
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_ring_reader, args=(ring.name, seconds, results))
+                 for _ in range(readers)]
+    for process in processes:
+        process.start()
+    written = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ring.write(frame, (HEIGHT, WIDTH, CHANNELS), np.uint8, written)
+        written += 1
+    counts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    ring.close()
+    return written, counts
+
+
+def bench_queue(readers: int, seconds: float, slots: int):
+    frame = bytes(WIDTH * HEIGHT * CHANNELS)
+    queues = [multiprocessing.Queue(maxsize=slots) for _ in range(readers)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_queue_reader, args=(queue, seconds, results))
+                 for queue in queues]
+    for process in processes:
+        process.start()
+    written = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for queue in queues:
+            try:
+                queue.put(frame, timeout=0.1)
+            except Exception:
+                pass
+        written += 1
+    counts = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    for queue in queues:
+        queue.cancel_join_thread()
+    return written, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", default="1,2,4")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--slots", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{WIDTH}x{HEIGHT}x{CHANNELS} uint8 ({WIDTH * HEIGHT * CHANNELS / 1e6:.1f} MB/帧)  "
+          f"槽位 {args.slots}  每项 {args.seconds} 秒")
+    print(f"{'读取方':>6} {'方式':>8} {'写入(帧/秒)':>12} {'每个读取方(帧/秒)':>18} {'作废':>6}")
+    for readers in (int(n) for n in args.readers.split(",")):
+        for label, bench in (("shm", bench_ring), ("queue", bench_queue)):
+            written, counts = bench(readers, args.seconds, args.slots)
+            per_reader = sum(read for read, _ in counts) / len(counts) / args.seconds
+            torn = sum(t for _, t in counts)
+            print(f"{readers:>6} {label:>8} {written / args.seconds:>12.1f} "
+                  f"{per_reader:>18.1f} {torn:>6}")
+
+
+if __name__ == "__main__":
+    main()
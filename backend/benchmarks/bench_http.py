@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+HTTP接口吞吐压测 - 对 MCP 或聊天接口并发发送请求
+
+先以回放后端启动服务（无需AirSim）：
+    DRONE_BACKEND=replay uvicorn app.main:app --port 8000
+再运行：
+    python -m benchmarks.bench_http --target mcp --requests 2000 --concurrency 32
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+TARGETS = {
+    "mcp": (
+        "POST", "/api/v1/mcp/execute",
+        json.dumps({"tool": "get_drone_state", "parameters": {}}),
+        {"Authorization": "Bearer default-dev-token", "Content-Type": "application/json"}
+    ),
+    "chat": ("POST", "/api/v1/chat/message?message=" + quote("status"), None, {}),
+    "state": ("GET", "/api/v1/status/state", None, {}),
+}
+
+
+def worker(host: str, port: int, target: str, count: int):
+    method, path, body, headers = TARGETS[target]
+    conn = http.client.HTTPConnection(host, port)
+    latencies = []
+    errors = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        if response.status != 200:
+            errors += 1
+    conn.close()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP接口吞吐压测")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--target", choices=sorted(TARGETS), default="mcp")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    per_worker = max(1, args.requests // args.concurrency)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(
+            lambda _: worker(args.host, args.port, args.target, per_worker),
+            range(args.concurrency)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for result, _ in results for l in result)
+    errors = sum(e for _, e in results)
+    print(f"=== {args.target}: {len(latencies)} 个请求, 并发 {args.concurrency} ===")
+    print(f"吞吐: {len(latencies) / elapsed:.1f} 请求/秒")
+    print(f"延迟: 中位数 {statistics.median(latencies):.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+    print(f"非200响应: {errors}")
+
+
+if __name__ == "__main__":
+    main()
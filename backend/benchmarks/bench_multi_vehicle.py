@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+多无人机状态轮询基准 - 每一轮读取N架无人机状态的耗时：逐架顺序读取 vs 轮询线程的并行+流水线读取
+
+使用模拟的RPC连接：每次调用有固定的网络往返时间，同一连接上的请求由服务端依次处理。
+
+运行: python -m benchmarks.bench_multi_vehicle [--vehicles 1,5,10,25] [--latency 2.0] [--service 0.2]
+"""
+
+import argparse
+import threading
+import time
+
+import airsim
+
+from app.core.rpc_pool import RpcPool, LANE_TELEMETRY
+from app.core.state_poller import StatePoller
+
+
+class _Future:
+    def __init__(self, ready_at: float, value):
+        self.ready_at = ready_at
+        self.value = value
+
+    def get(self):
+        delay = self.ready_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return self.value
+
+
+class SimulatedRpc:
+    """模拟的msgpack-rpc连接：服务端依次处理请求，响应在处理完成后经过往返时间返回"""
+
+    def __init__(self, latency: float, service: float):
+        self.latency = latency
+        self.service = service
+        self.busy_until = 0.0
+        self.payload = airsim.MultirotorState().to_msgpack()
+        self._lock = threading.Lock()
+
+    def call_async(self, method: str, *args) -> _Future:
+        with self._lock:
+            start = max(time.perf_counter(), self.busy_until)
+            self.busy_until = start + self.service
+            return _Future(self.busy_until + self.latency, self.payload)
+
+
+class SimulatedClient:
+    """模拟的MultirotorClient：同步调用等于发出请求后立即等待响应"""
+
+    def __init__(self, latency: float, service: float):
+        self.client = SimulatedRpc(latency, service)
+
+    def getMultirotorState(self, vehicle_name=''):
+        return airsim.MultirotorState.from_msgpack(
+            self.client.call_async("getMultirotorState", vehicle_name).get())
+
+
+def measure(func, repeat: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多无人机状态轮询基准")
+    parser.add_argument("--vehicles", default="1,5,10,25")
+    parser.add_argument("--latency", type=float, default=2.0, help="网络往返时间(毫秒)")
+    parser.add_argument("--service", type=float, default=0.2, help="服务端处理一次请求的时间(毫秒)")
+    parser.add_argument("--workers", type=int, default=4, help="遥测通道连接数")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    latency, service = args.latency / 1000.0, args.service / 1000.0
+    print(f"往返时间 {args.latency} ms  服务端处理 {args.service} ms  遥测连接 {args.workers}")
+    print(f"{'无人机':>6} {'顺序读取(ms)':>14} {'轮询线程(ms)':>14} {'加速':>6} {'每架(ms)':>10}")
+    for count in (int(n) for n in args.vehicles.split(",")):
+        names = [f"Drone{i + 1}" for i in range(count)]
+
+        client = SimulatedClient(latency, service)
+        sequential_ms = measure(
+            lambda: [client.getMultirotorState(vehicle_name=name) for name in names],
+            args.repeat
+        )
+
+        pool = RpcPool({LANE_TELEMETRY: args.workers},
+                       factory=lambda: SimulatedClient(latency, service))
+        poller = StatePoller(pool)
+        for name in names:
+            poller.add_vehicle(name, sensors=[], record_flight=False)
+        # 不启动轮询线程，直接测量一轮的耗时
+        vehicles = list(poller.vehicles.values())
+        poller_ms = measure(lambda: poller.poll(vehicles), args.repeat)
+        poller.stop()
+
+        print(f"{count:>6} {sequential_ms:>14.2f} {poller_ms:>14.2f} "
+              f"{sequential_ms / poller_ms:>5.1f}x {poller_ms / count:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
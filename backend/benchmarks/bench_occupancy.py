@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+占据地图基准 - 单帧插入和航段查询耗时
+
+合成场景为传感器前方的起伏墙面加地面，点数为一帧 LiDAR 的量级；插入多帧（传感器逐帧移动）后
+测量单帧插入耗时，再测量一批随机航段的碰撞查询耗时（带 clearance 膨胀）。
+
+运行: python -m benchmarks.bench_occupancy [--points 20000] [--frames 20] [--segments 1000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.occupancy import OccupancyMap
+
+
+def synthetic_frame(count: int, origin: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """一半点在前方 30 米处的起伏墙面上，一半点在地面（z=0）上"""
+    half = count // 2
+    y = rng.uniform(-20.0, 20.0, half)
+    z = rng.uniform(-15.0, 0.0, half)
+    wall = np.stack([origin[0] + 30.0 + 2.0 * np.sin(y / 3.0), origin[1] + y, z], axis=1)
+    ground = np.stack([origin[0] + rng.uniform(0.0, 30.0, count - half),
+                       origin[1] + rng.uniform(-20.0, 20.0, count - half),
+                       np.zeros(count - half)], axis=1)
+    return np.concatenate([wall, ground])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--segments", type=int, default=1000)
+    parser.add_argument("--resolution", type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    occupancy_map = OccupancyMap(args.resolution, 50.0, 200.0, 8192)
+    elapsed = []
+    for frame in range(args.frames):
+        origin = np.array([frame * 1.0, 0.0, -5.0])
+        points = synthetic_frame(args.points, origin, rng)
+        started = time.perf_counter()
+        occupancy_map.insert(origin, points)
+        elapsed.append((time.perf_counter() - started) * 1000.0)
+    stats = occupancy_map.to_dict()
+    print(f"插入 {args.frames} 帧 x {args.points} 点  平均 {np.mean(elapsed):.2f} ms  "
+          f"最大 {np.max(elapsed):.2f} ms  块 {stats['blocks']}  占据体素 {stats['occupied_voxels']}")
+
+    starts = rng.uniform([0.0, -20.0, -15.0], [40.0, 20.0, -1.0], (args.segments, 3))
+    ends = starts + rng.uniform(-20.0, 20.0, (args.segments, 3))
+    for clearance in (0.0, 1.0):
+        started = time.perf_counter()
+        clear = occupancy_map.segments_clear(starts, ends, clearance)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        print(f"{args.segments} 航段  clearance {clearance}  {elapsed_ms:.2f} ms  "
+              f"无碰撞 {int(clear.sum())}")
+
+
+if __name__ == "__main__":
+    main()
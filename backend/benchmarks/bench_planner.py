@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+航线规划基准 - 直飞、绕行和缓存命中的规划耗时
+
+合成场景为一排随机禁飞区（挡在起点和终点之间）加一面占据地图中的墙；分别测量直飞通过、
+需要绕行（缓存未命中）以及相同起点和终点再次规划（缓存命中）的耗时。
+
+运行: python -m benchmarks.bench_planner [--zones 20] [--distance 200] [--repeat 20]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.occupancy import OccupancyMap
+from app.core.planner import PathPlanner
+from app.core.safety import safety_engine
+from app.models.drone import NoFlyZone
+
+
+def build_scene(zones: int, distance: float, rng: np.random.Generator) -> OccupancyMap:
+    """起点和终点中间的一排矩形禁飞区，以及 1/4 处的一面墙"""
+    safety_engine.clear()
+    for _ in range(zones):
+        x = rng.uniform(distance * 0.4, distance * 0.6)
+        y = rng.uniform(-40.0, 40.0)
+        w, h = rng.uniform(5.0, 15.0, 2)
+        safety_engine.add_zone(NoFlyZone(polygon=[[x, y], [x + w, y], [x + w, y + h], [x, y + h]]))
+    occupancy_map = OccupancyMap(0.5, 50.0, 200.0, 8192)
+    yy, zz = np.mgrid[-15:15:0.2, -25:0:0.2]
+    wall = np.stack([np.full(yy.size, distance / 4), yy.ravel(), zz.ravel()], axis=1)
+    for _ in range(3):
+        occupancy_map.insert((0.0, 0.0, -10.0), wall)
+    return occupancy_map
+
+
+def timed(planner: PathPlanner, start, goal, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        plan = planner.plan(start, goal)
+    return (time.perf_counter() - started) * 1000.0 / repeat, plan
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zones", type=int, default=20)
+    parser.add_argument("--distance", type=float, default=200.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings.OCCUPANCY_ENABLED = True
+    rng = np.random.default_rng(0)
+    planner = PathPlanner(build_scene(args.zones, args.distance, rng))
+    start = (0.0, 0.0, -10.0)
+
+    elapsed, plan = timed(planner, start, (0.0, 60.0, -10.0), args.repeat)
+    print(f"直飞          {elapsed:8.2f} ms  航点 {len(plan.waypoints)}  缓存命中 {plan.cached}")
+
+    goal = (args.distance, 0.0, -10.0)
+    planner.clear_cache()
+    started = time.perf_counter()
+    plan = planner.plan(start, goal)
+    elapsed = (time.perf_counter() - started) * 1000.0
+    print(f"绕行（未命中）{elapsed:8.2f} ms  航点 {len(plan.waypoints)}  缓存命中 {plan.cached}")
+
+    elapsed, plan = timed(planner, start, goal, args.repeat)
+    print(f"绕行（命中）  {elapsed:8.2f} ms  航点 {len(plan.waypoints)}  缓存命中 {plan.cached}")
+    print(planner.to_dict())
+
+
+if __name__ == "__main__":
+    main()
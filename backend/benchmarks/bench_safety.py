@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+安全引擎基准 - 10k航段路径对1k个禁飞区的整批检查耗时，并与逐段逐区域的纯Python检查对比
+
+运行: python -m benchmarks.bench_safety [--segments 10000] [--zones 1000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.core.safety import SafetyEngine
+from app.models.drone import NoFlyZone
+
+AREA = 450.0   # 区域和路径分布在 [-AREA, AREA] 内（地理围栏默认半径500米）
+
+
+def make_zones(count: int, rng) -> list:
+    """随机凸多边形棱柱"""
+    zones = []
+    for i in range(count):
+        center = rng.uniform(-AREA, AREA, 2)
+        radius = rng.uniform(3.0, 15.0)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, rng.integers(4, 9)))
+        polygon = [(float(center[0] + radius * np.cos(a)), float(center[1] + radius * np.sin(a)))
+                   for a in angles]
+        floor = float(rng.uniform(0, 40)) if i % 2 else None
+        zones.append(NoFlyZone(id=f"z{i}", polygon=polygon, min_altitude=floor,
+                               max_altitude=(floor or 0.0) + float(rng.uniform(10, 60))))
+    return zones
+
+
+def make_path(count: int, rng) -> np.ndarray:
+    """随机游走路径，航段长度约5米"""
+    steps = rng.normal(0, 3.0, (count, 3))
+    steps[:, 2] *= 0.2
+    points = np.cumsum(np.vstack([[0.0, 0.0, -30.0], steps]), axis=0)
+    points[:, :2] = np.clip(points[:, :2], -AREA, AREA)
+    points[:, 2] = np.clip(points[:, 2], -90.0, -5.0)
+    return points
+
+
+def _point_in_polygon(x, y, polygon) -> bool:
+    inside = False
+    n = len(polygon)
+    for i in range(n):
+        x0, y0 = polygon[i]
+        x1, y1 = polygon[(i + 1) % n]
+        if (y0 > y) != (y1 > y) and x < (x1 - x0) * (y - y0) / (y1 - y0) + x0:
+            inside = not inside
+    return inside
+
+
+def naive_check(points: np.ndarray, zones: list, samples: int = 8) -> int:
+    """逐航段、逐区域采样点检查（对照组，只统计命中数）"""
+    hits = 0
+    for a, b in zip(points[:-1].tolist(), points[1:].tolist()):
+        for zone in zones:
+            floor = -np.inf if zone.min_altitude is None else zone.min_altitude
+            ceiling = np.inf if zone.max_altitude is None else zone.max_altitude
+            for k in range(samples + 1):
+                t = k / samples
+                x, y, z = (a[i] + (b[i] - a[i]) * t for i in range(3))
+                if floor <= -z <= ceiling and _point_in_polygon(x, y, zone.polygon):
+                    hits += 1
+                    break
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="安全引擎基准")
+    parser.add_argument("--segments", type=int, default=10000)
+    parser.add_argument("--zones", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    engine = SafetyEngine()
+    zones = make_zones(args.zones, rng)
+    started = time.perf_counter()
+    engine.add_zones(zones)
+    build_ms = (time.perf_counter() - started) * 1000.0
+    points = make_path(args.segments, rng)
+
+    engine.check_path(points)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        violations = engine.check_path(points)
+    engine_ms = (time.perf_counter() - started) / args.repeat * 1000.0
+
+    print(f"航段: {args.segments}  禁飞区: {args.zones}")
+    print(f"建立索引:                     {build_ms:8.1f} ms")
+    print(f"安全引擎整批检查:             {engine_ms:8.2f} ms  ({len(violations)} 处违规)")
+
+    # 纯Python对照组只跑一小段路径，按比例换算
+    sample = min(args.segments, 50)
+    started = time.perf_counter()
+    naive_check(points[:sample + 1], engine.zones)
+    naive_ms = (time.perf_counter() - started) * 1000.0 * args.segments / sample
+    print(f"逐段逐区域Python检查(估算):    {naive_ms:8.0f} ms  ({naive_ms / engine_ms:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+状态轮询热路径微基准 - 对比每个周期构建pydantic模型与原地更新StateRecord的耗时
+
+运行: python -m benchmarks.bench_state_tick
+"""
+
+import time
+from datetime import datetime
+
+import airsim
+import numpy as np
+
+from app.core.state_poller import StateRecord
+from app.models.drone import DroneState, DronePosition, DroneAttitude, DroneVelocity
+
+ITERATIONS = 50000
+
+
+def make_multirotor_state():
+    state = airsim.MultirotorState()
+    kinematics = state.kinematics_estimated
+    kinematics.position = airsim.Vector3r(12.3, -4.5, -20.0)
+    kinematics.orientation = airsim.to_quaternion(0.05, -0.02, 1.2)
+    kinematics.linear_velocity = airsim.Vector3r(3.0, 0.5, -0.1)
+    state.landed_state = airsim.LandedState.Flying
+    return state
+
+
+def build_models(state) -> DroneState:
+    """改造前的每周期转换：4个pydantic模型、两次datetime.now()和NumPy标量"""
+    pos = state.kinematics_estimated.position
+    position = DronePosition(x=pos.x_val, y=pos.y_val, z=pos.z_val, timestamp=datetime.now())
+    pitch, roll, yaw = airsim.to_eularian_angles(state.kinematics_estimated.orientation)
+    attitude = DroneAttitude(roll=np.degrees(roll), pitch=np.degrees(pitch),
+                             yaw=np.degrees(yaw), timestamp=datetime.now())
+    vel = state.kinematics_estimated.linear_velocity
+    velocity = DroneVelocity(vx=vel.x_val, vy=vel.y_val, vz=vel.z_val)
+    gps = state.gps_location
+    gps_data = {"latitude": gps.latitude, "longitude": gps.longitude, "altitude": gps.altitude}
+    return DroneState(
+        position=position,
+        attitude=attitude,
+        velocity=velocity,
+        is_armed=state.landed_state == airsim.LandedState.Flying,
+        is_flying=state.landed_state == airsim.LandedState.Flying,
+        battery_level=100.0,
+        gps_location=gps_data
+    )
+
+
+def measure(name, func):
+    func()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func()
+    per_tick_us = (time.perf_counter() - started) / ITERATIONS * 1e6
+    print(f"{name:24s} {per_tick_us:8.2f} us/tick")
+    return per_tick_us
+
+
+def main():
+    state = make_multirotor_state()
+    record = StateRecord()
+    seq = [0]
+
+    def update_record():
+        seq[0] += 1
+        record.update_from(state, seq[0], time.time())
+
+    print(f"=== 状态轮询热路径 ({ITERATIONS} 次) ===\n")
+    before = measure("pydantic models (before)", lambda: build_models(state))
+    after = measure("StateRecord (after)", update_record)
+    print(f"\n每周期节省 {before - after:.2f} us ({before / after:.1f}x)")
+    measure("lazy to_drone_state()", record.to_drone_state)
+
+
+if __name__ == "__main__":
+    main()
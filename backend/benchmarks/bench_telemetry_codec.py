@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+遥测帧编码基准 - 对比 JSON 与二进制帧的体积和编码耗时
+
+运行: python -m benchmarks.bench_telemetry_codec
+"""
+
+import json
+import time
+from datetime import datetime
+
+from app.core.telemetry_codec import encode_binary, state_to_telemetry
+from app.models.drone import DroneState, DronePosition, DroneAttitude, DroneVelocity
+
+ITERATIONS = 20000
+RATE_HZ = 10
+
+
+def make_state() -> DroneState:
+    now = datetime.now()
+    return DroneState(
+        position=DronePosition(x=12.345678, y=-3.14159, z=-25.5, timestamp=now),
+        attitude=DroneAttitude(roll=1.25, pitch=-0.5, yaw=87.3, timestamp=now),
+        velocity=DroneVelocity(vx=4.2, vy=0.1, vz=-0.02),
+        is_armed=True,
+        is_flying=True,
+        battery_level=100.0,
+        gps_location={"latitude": 47.641468, "longitude": -122.140165, "altitude": 147.5}
+    )
+
+
+def measure(name, encode):
+    frame = encode()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode()
+    elapsed = time.perf_counter() - started
+    per_frame_us = elapsed / ITERATIONS * 1e6
+    print(f"{name:8s} {len(frame):5d} B/frame  {len(frame) * RATE_HZ:7d} B/s @{RATE_HZ}Hz  "
+          f"{per_frame_us:7.2f} us/frame")
+    return len(frame), per_frame_us
+
+
+def main():
+    state = make_state()
+    telemetry = state_to_telemetry(state)
+    timestamp = state.position.timestamp.timestamp()
+    print(f"=== 遥测帧编码基准 ({ITERATIONS} 次) ===\n")
+    json_size, json_us = measure("json", lambda: json.dumps(telemetry))
+    bin_size, bin_us = measure("binary", lambda: encode_binary(telemetry, 1, timestamp))
+
+    print("\n每个客户端节省:")
+    print(f"  带宽: {(json_size - bin_size) * RATE_HZ} B/s ({(1 - bin_size / json_size) * 100:.1f}%)")
+    print(f"  编码CPU: {json_us - bin_us:.2f} us/frame ({(1 - bin_us / json_us) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""测试公用夹具"""
+import time
+
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture
+def replay_backend(monkeypatch):
+    """使用回放后端（不需要AirSim），返回所有连接共享的 ReplayClient"""
+    from app.core import backend
+    monkeypatch.setattr(settings, "DRONE_BACKEND", "replay")
+    monkeypatch.setattr(settings, "RECORDER_ENABLED", False)
+    monkeypatch.setattr(backend, "_replay_client", None)
+    return backend.create_airsim_client()
+
+
+@pytest.fixture
+def api(replay_backend):
+    """连接到回放后端的应用 TestClient"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 5.0
+        while not client.get("/health").json()["drone_connected"]:
+            assert time.monotonic() < deadline, "replay backend did not connect"
+            time.sleep(0.05)
+        yield client
@@ -0,0 +1,200 @@
+"""指令执行器回归测试"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.commands import (
+    COMMAND_CANCELLED, COMMAND_PENDING, COMMAND_PREEMPTED, COMMAND_RUNNING, COMMAND_SUCCEEDED,
+    PRIORITY_EMERGENCY, CommandExecutor
+)
+from app.core.config import settings
+
+
+def _wait_status(api, command_id: str, statuses, timeout: float = 3.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        command = api.get(f"/api/v1/control/commands/{command_id}").json()
+        if command["status"] in statuses or time.monotonic() > deadline:
+            return command
+        time.sleep(0.02)
+
+
+def _start_goto(api, replay_backend) -> str:
+    replay_backend.command_delay = 1.0
+    command = api.post("/api/v1/control/goto",
+                       json={"position": {"x": 0, "y": 0, "z": -20}, "speed": 5}).json()
+    assert _wait_status(api, command["command_id"], ("running",))["status"] == "running"
+    return command["command_id"]
+
+
+def test_direct_hover_preempts_running_command(api, replay_backend):
+    """直接悬停打断的 goto 记为被抢占，而不是成功"""
+    command_id = _start_goto(api, replay_backend)
+    assert api.post("/api/v1/control/hover").json() == {"success": True}
+    command = _wait_status(api, command_id, ("preempted", "succeeded"))
+    assert command["status"] == "preempted"
+
+
+def test_velocity_control_preempts_running_command(api, replay_backend):
+    command_id = _start_goto(api, replay_backend)
+    with api.websocket_connect("/api/v1/control/ws") as websocket:
+        websocket.send_text('{"vx": 1, "vy": 0, "vz": 0, "seq": 1}')
+        assert websocket.receive_json()["type"] == "ack"
+    assert _wait_status(api, command_id, ("preempted", "succeeded"))["status"] == "preempted"
+
+
+def test_cancel_running_command_issues_cancel_last_task(api, replay_backend, monkeypatch):
+    """取消执行中的指令通过 cancelLastTask 中止仿真器中的任务"""
+    from app.core.replay import ReplayClient
+    calls = []
+    monkeypatch.setattr(ReplayClient, "cancelLastTask",
+                        lambda self, vehicle_name='': calls.append(vehicle_name))
+    command_id = _start_goto(api, replay_backend)
+    command = api.delete(f"/api/v1/control/commands/{command_id}").json()
+    assert command["status"] == "cancelled"
+    assert len(calls) == 1
+    assert api.delete("/api/v1/control/commands/unknown").status_code == 404
+
+
+def _executor(cancelled: list) -> CommandExecutor:
+    async def cancel_active():
+        cancelled.append(True)
+
+    return CommandExecutor(cancel_active)
+
+
+def _step(name: str, order: list, duration: float = 0.0):
+    async def run():
+        order.append(name)
+        await asyncio.sleep(duration)
+        return name
+
+    return run
+
+
+def test_priority_order_and_fifo_within_priority():
+    """紧急指令排在普通指令之前，同优先级按提交顺序执行"""
+    order, cancelled = [], []
+
+    async def run():
+        executor = _executor(cancelled)
+        executor.start()
+        first = executor.submit("first", _step("first", order, 0.05))
+        await asyncio.sleep(0.01)
+        # first 正在执行时依次提交
+        normal = [executor.submit(f"n{i}", _step(f"n{i}", order)) for i in range(3)]
+        urgent = executor.submit("urgent", _step("urgent", order), priority=PRIORITY_EMERGENCY + 1)
+        await asyncio.wait_for(asyncio.gather(*(c.wait() for c in normal)), 2.0)
+        await executor.stop()
+        return first, normal, urgent
+
+    first, normal, urgent = asyncio.run(run())
+    assert order == ["first", "urgent", "n0", "n1", "n2"]
+    assert [c.status for c in [first, urgent, *normal]] == [COMMAND_SUCCEEDED] * 5
+    assert normal[2].result == "n2"
+    assert cancelled == []
+
+
+def test_cancel_pending_and_running_commands():
+    order, cancelled = [], []
+
+    async def run():
+        executor = _executor(cancelled)
+        executor.start()
+        running = executor.submit("running", _step("running", order, 10.0))
+        pending = executor.submit("pending", _step("pending", order))
+        await asyncio.sleep(0.02)
+        assert running.status == COMMAND_RUNNING
+
+        # 排队中的指令直接移除，不调用 cancel_active
+        await executor.cancel(pending.id)
+        assert pending.status == COMMAND_CANCELLED
+        assert cancelled == []
+
+        # 执行中的指令：取消协程并调用 cancel_active
+        await asyncio.wait_for(executor.cancel(running.id), 1.0)
+        assert running.status == COMMAND_CANCELLED
+        assert cancelled == [True]
+
+        # 已结束的指令不再重复取消
+        await executor.cancel(running.id)
+        assert cancelled == [True]
+        with pytest.raises(KeyError):
+            await executor.cancel("unknown")
+
+        after = executor.submit("after", _step("after", order))
+        await asyncio.wait_for(after.wait(), 1.0)
+        await executor.stop()
+        return after
+
+    after = asyncio.run(run())
+    assert after.status == COMMAND_SUCCEEDED
+    assert order == ["running", "after"]
+
+
+def test_emergency_and_direct_preempt():
+    """紧急指令和直接控制抢占正在执行与排队中的指令"""
+    order, cancelled = [], []
+
+    async def run():
+        executor = _executor(cancelled)
+        executor.start()
+        events = executor.subscribe()
+        running = executor.submit("running", _step("running", order, 10.0))
+        pending = executor.submit("pending", _step("pending", order))
+        await asyncio.sleep(0.02)
+        land = executor.submit("land", _step("land", order), priority=PRIORITY_EMERGENCY)
+        await asyncio.wait_for(land.wait(), 1.0)
+        assert [running.status, pending.status, land.status] == \
+            [COMMAND_PREEMPTED, COMMAND_PREEMPTED, COMMAND_SUCCEEDED]
+
+        # 直接控制：没有指令通过执行器，只标记被抢占
+        running = executor.submit("running2", _step("running2", order, 10.0))
+        pending = executor.submit("pending2", _step("pending2", order))
+        await asyncio.sleep(0.02)
+        executor.preempt()
+        await asyncio.wait_for(running.wait(), 1.0)
+        assert [running.status, pending.status] == [COMMAND_PREEMPTED, COMMAND_PREEMPTED]
+
+        statuses = []
+        while not events.empty():
+            event = events.get_nowait()
+            if event["id"] == running.id:
+                statuses.append(event["status"])
+        await executor.stop()
+        return statuses
+
+    statuses = asyncio.run(run())
+    assert statuses == [COMMAND_PENDING, COMMAND_RUNNING, COMMAND_PREEMPTED]
+    assert order == ["running", "land", "running2"]
+    # 抢占不调用 cancelLastTask：新的控制指令本身会替换仿真器中的任务
+    assert cancelled == []
+
+
+def test_trim_keeps_only_recent_finished_commands(monkeypatch):
+    monkeypatch.setattr(settings, "COMMAND_HISTORY_SIZE", 3)
+    order, cancelled = [], []
+
+    async def run():
+        executor = _executor(cancelled)
+        executor.start()
+        finished = []
+        for i in range(5):
+            command = executor.submit(f"c{i}", _step(f"c{i}", order))
+            await asyncio.wait_for(command.wait(), 1.0)
+            finished.append(command)
+        # 未结束的指令不会被淘汰，即使超出容量
+        running = executor.submit("running", _step("running", order, 10.0))
+        pending = [executor.submit(f"p{i}", _step(f"p{i}", order)) for i in range(3)]
+        await asyncio.sleep(0.02)
+        ids = list(executor.commands)
+        await executor.stop()
+        return finished, running, pending, ids
+
+    finished, running, pending, ids = asyncio.run(run())
+    assert all(c.status == COMMAND_SUCCEEDED for c in finished)
+    assert ids == [running.id] + [c.id for c in pending]
+    # 停止时：执行中的指令和排队中的指令都记为已取消
+    assert running.status == COMMAND_CANCELLED
+    assert all(c.status == COMMAND_CANCELLED for c in pending)
@@ -0,0 +1,135 @@
+"""共享内存帧环测试"""
+import os
+import subprocess
+import sys
+import textwrap
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from app.core.frame_ring import FrameDescriptor, FrameReader, FrameRing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(slots=3, slot_bytes=4 * 6 * 3 * 4)
+    yield ring
+    ring.close()
+
+
+def _frame(value: int, dtype=np.uint8, shape=(4, 6, 3)) -> np.ndarray:
+    return np.full(shape, value, dtype=dtype)
+
+
+def test_write_and_read_round_trip(ring):
+    reader = FrameReader(ring.name)
+    try:
+        assert reader.latest() is None and reader.read() is None
+        assert (reader.slots, reader.slot_bytes) == (ring.slots, ring.slot_bytes)
+
+        first = ring.write(_frame(7).tobytes(), (4, 6, 3), sim_timestamp=123)
+        assert (first.slot, first.seq, first.shape, first.dtype) == (0, 1, (4, 6, 3), "|u1")
+        np.testing.assert_array_equal(reader.read(), _frame(7))
+        assert reader.latest() == first
+
+        # 单通道 float32 图像，写入 numpy 数组；out 复用调用方数组
+        depth = np.arange(24, dtype=np.float32).reshape(4, 6)
+        second = ring.write(depth, (4, 6), np.float32)
+        assert second.shape == (4, 6) and second.dtype == "<f4"
+        out = np.empty((4, 6), dtype=np.float32)
+        assert reader.read(second, out=out) is out
+        np.testing.assert_array_equal(out, depth)
+
+        # 描述可以序列化后传给其他进程
+        assert FrameDescriptor.from_dict(second.to_dict()) == second
+        assert reader.wait(second.seq, timeout=0.01) is None
+        assert reader.wait(first.seq) == second
+
+        with pytest.raises(ValueError):
+            ring.write(np.zeros(ring.slot_bytes + 1, dtype=np.uint8), (1, ring.slot_bytes + 1))
+    finally:
+        reader.close()
+
+
+def test_overwritten_frame_is_rejected(ring):
+    reader = FrameReader(ring.name)
+    try:
+        old = ring.write(_frame(1), (4, 6, 3))
+        for value in range(2, ring.slots + 2):
+            ring.write(_frame(value), (4, 6, 3))
+        # 读取方落后超过 slots 帧，旧描述所在槽位已保存新的帧
+        assert not reader.valid(old)
+        assert reader.read(old) is None
+        np.testing.assert_array_equal(reader.read(), _frame(ring.slots + 1))
+    finally:
+        reader.close()
+
+
+def test_torn_read_is_detected(ring):
+    """复制期间写入方覆盖了槽位：序列锁变化，本帧作废"""
+
+    class _RacingReader(FrameReader):
+        def view(self, descriptor):
+            # 模拟读取方复制像素的同时写入方绕回同一槽位
+            for value in range(ring.slots):
+                ring.write(_frame(100 + value), (4, 6, 3))
+            return super().view(descriptor)
+
+    reader = _RacingReader(ring.name)
+    try:
+        descriptor = ring.write(_frame(1), (4, 6, 3))
+        assert reader.read(descriptor) is None
+    finally:
+        reader.close()
+
+
+def test_slot_being_written_is_not_read(ring):
+    reader = FrameReader(ring.name)
+    try:
+        descriptor = ring.write(_frame(1), (4, 6, 3))
+        lock = reader._lock(descriptor.slot)
+        # 写入中：序列锁为奇数
+        np.ndarray((1,), dtype="<u8", buffer=ring.shm.buf,
+                   offset=ring._slot_offset(descriptor.slot))[0] = lock + 1
+        assert reader.descriptor(descriptor.slot) is None
+        assert reader.read(descriptor) is None
+    finally:
+        reader.close()
+
+
+def test_reader_rejects_other_shared_memory():
+    shm = shared_memory.SharedMemory(create=True, size=128)
+    try:
+        with pytest.raises(ValueError):
+            FrameReader(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_reader_process_exit_keeps_ring_alive(ring):
+    """其他进程中的读取方连接后注销资源跟踪登记，退出时不会删除写入方的共享内存"""
+    ring.write(_frame(42), (4, 6, 3))
+    script = textwrap.dedent(f"""
+        from app.core.frame_ring import FrameReader
+        reader = FrameReader({ring.name!r})
+        frame = reader.read()
+        reader.close()
+        print(int(frame.sum()))
+    """)
+    for _ in range(2):
+        result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        assert int(result.stdout) == 42 * 4 * 6 * 3
+        assert "leaked shared_memory" not in result.stderr
+
+    # 读取进程退出后帧环仍然存在
+    reader = FrameReader(ring.name)
+    try:
+        np.testing.assert_array_equal(reader.read(), _frame(42))
+    finally:
+        reader.close()
@@ -0,0 +1,36 @@
+"""遥测历史环形缓冲区测试"""
+import numpy as np
+import pytest
+
+from app.core.history import TelemetryHistory
+
+
+def _fill(history: TelemetryHistory, count: int):
+    for i in range(count):
+        history.append(float(i), (i, 0, -10), (0, 0, i), (1, 0, 0), i & 0x03)
+
+
+def test_since_across_wraparound():
+    """写入超过容量后只保留最近 capacity 个采样，since() 按时间顺序返回且不重不漏"""
+    capacity = 5
+    for count in range(0, 3 * capacity + 1):
+        history = TelemetryHistory(capacity)
+        _fill(history, count)
+        kept = list(range(max(0, count - capacity), count))
+        assert len(history) == len(kept)
+        assert history.since()["time"].tolist() == kept
+        for threshold in np.arange(-1.0, count + 1.0, 0.5):
+            expected = [t for t in kept if t >= threshold]
+            result = history.since(float(threshold))
+            assert result["time"].tolist() == expected, (count, threshold)
+            assert result["position"][:, 0].tolist() == expected
+
+
+def test_since_selects_fields():
+    history = TelemetryHistory(4)
+    _fill(history, 6)
+    result = history.since(4.0, ["flags"])
+    assert result.dtype.names == ("time", "flags")
+    assert result["flags"].tolist() == [0, 1]
+    with pytest.raises(ValueError):
+        history.since(fields=["altitude"])
@@ -0,0 +1,78 @@
+"""航点任务校验与速度分组测试"""
+import math
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.mission import MissionTracker, speed_groups, validate_mission
+
+
+def test_empty_mission_is_rejected():
+    with pytest.raises(ValueError, match="no waypoints"):
+        validate_mission([], [])
+
+
+def test_too_many_waypoints_are_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "MISSION_MAX_WAYPOINTS", 3)
+    points = [(i, 0, -10) for i in range(4)]
+    with pytest.raises(ValueError, match="more than 3"):
+        validate_mission(points, [5.0] * 4)
+
+
+@pytest.mark.parametrize("speed", [0.0, -1.0, math.nan, math.inf])
+def test_non_positive_speed_is_rejected(speed):
+    with pytest.raises(ValueError, match="positive"):
+        validate_mission([(0, 0, -10), (10, 0, -10)], [5.0, speed])
+
+
+def test_speed_count_must_match_waypoints():
+    with pytest.raises(ValueError, match="one speed per waypoint"):
+        validate_mission([(0, 0, -10), (10, 0, -10)], [5.0])
+
+
+def test_altitude_above_limit_names_the_waypoint():
+    points = [(0, 0, -10), (10, 0, -10), (20, 0, -(settings.MAX_ALTITUDE + 1))]
+    with pytest.raises(ValueError, match="altitude") as error:
+        validate_mission(points, [5.0] * 3, start=(0, 0, 0))
+    # 航段2即飞往航点2的一段
+    assert "waypoint 2" in str(error.value)
+
+
+def test_valid_mission_clamps_speed():
+    points = [(0, 0, -10), (10, 0, -10), (10, 10, -20)]
+    waypoints, speeds = validate_mission(points, [5, settings.MAX_SPEED * 2, 1], start=(0, 0, 0))
+    assert waypoints.shape == (3, 3) and waypoints.dtype == np.float64
+    np.testing.assert_array_equal(waypoints, points)
+    np.testing.assert_array_equal(speeds, [5.0, settings.MAX_SPEED, 1.0])
+
+
+def test_speed_groups_split_on_speed_changes():
+    assert speed_groups(np.array([5.0])) == [(0, 1, 5.0)]
+    assert speed_groups(np.array([5.0, 5.0, 5.0])) == [(0, 3, 5.0)]
+    assert speed_groups(np.array([5.0, 5.0, 8.0, 8.0, 5.0, 2.0])) == [
+        (0, 2, 5.0), (2, 4, 8.0), (4, 5, 5.0), (5, 6, 2.0)
+    ]
+    # 各组首尾相接覆盖全部航点
+    speeds = np.array([1.0, 2.0, 2.0, 3.0, 3.0, 3.0, 1.0])
+    groups = speed_groups(speeds)
+    assert groups[0][0] == 0 and groups[-1][1] == len(speeds)
+    assert all(a[1] == b[0] for a, b in zip(groups, groups[1:]))
+    for start, end, speed in groups:
+        assert (speeds[start:end] == speed).all()
+
+
+def test_tracker_advances_along_segments_only_forward():
+    tracker = MissionTracker(np.array([(10, 0, -10), (10, 10, -10), (0, 10, -10)], dtype=float))
+    tracker.begin((0, 0, -10))
+    tracker.update((5, 0, -10))
+    assert tracker.progress() == {"waypoint_index": 0, "completed_waypoints": 0,
+                                  "total_waypoints": 3}
+    tracker.update((10, 6, -10))
+    assert tracker.current == 1
+    # 回到第一段附近时进度不后退
+    tracker.update((5, 0, -10))
+    assert tracker.current == 1
+    tracker.complete(3)
+    assert tracker.progress() == {"waypoint_index": 2, "completed_waypoints": 3,
+                                  "total_waypoints": 3}
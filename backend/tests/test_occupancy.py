@@ -0,0 +1,37 @@
+"""占据地图回归测试"""
+import math
+
+import numpy as np
+import pytest
+
+from app.core import occupancy
+from app.core.occupancy import MAX_CLEARANCE_VOXELS, OccupancyMap
+
+
+def _map() -> OccupancyMap:
+    occupancy_map = OccupancyMap(resolution=0.5, max_range=50.0, radius=200.0, max_blocks=8192)
+    # x=10 处的一面墙
+    wall = np.stack(np.meshgrid([10.0], np.linspace(-5, 5, 21), np.linspace(-5, 0, 11)), -1)
+    occupancy_map.insert((0, 0, -2), wall.reshape(-1, 3))
+    return occupancy_map
+
+
+def test_far_segment_is_clipped_to_map_content(monkeypatch):
+    """极长的航段只在地图内容范围内采样，仍能找到碰撞点"""
+    occupancy_map = _map()
+    monkeypatch.setattr(occupancy, "MAX_QUERY_KEYS", 4096)
+    for target in [(1e7, 0, -2), (1e19, 0, -2), (1e300, 0, -2)]:
+        collisions = occupancy_map.check_path([target], (0, 0, -2), 1.0)
+        assert [c["segment"] for c in collisions] == [0]
+        assert 8.0 <= collisions[0]["point"][0] <= 10.0
+    assert occupancy_map.check_path([(0, 1e9, -2)], (0, 0, -2), 1.0) == []
+    assert OccupancyMap(0.5, 50.0, 200.0, 10).check_path([(1e9, 0, 0)], (0, 0, 0), 1.0) == []
+
+
+def test_clearance_and_coordinates_are_validated():
+    occupancy_map = _map()
+    for clearance in [-1.0, MAX_CLEARANCE_VOXELS * 0.5 + 0.1, math.nan]:
+        with pytest.raises(ValueError):
+            occupancy_map.check_path([(20, 0, -2)], (0, 0, -2), clearance)
+    with pytest.raises(ValueError):
+        occupancy_map.check_path([(math.nan, 0, -2)], (0, 0, -2), 1.0)
@@ -0,0 +1,130 @@
+"""航线规划测试"""
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.core.occupancy import OccupancyMap
+from app.core.planner import PathPlanner
+from app.core.safety import safety_engine
+from app.models.drone import NoFlyZone
+
+START = (-40.0, 0.0, -20.0)
+GOAL = (40.0, 0.0, -20.0)
+
+
+@pytest.fixture(autouse=True)
+def clean_safety_engine(monkeypatch):
+    """测试使用全局安全引擎，前后清空禁飞区"""
+    monkeypatch.setattr(settings, "OCCUPANCY_ENABLED", False)
+    safety_engine.clear()
+    yield
+    safety_engine.clear()
+
+
+def _planner() -> PathPlanner:
+    return PathPlanner(OccupancyMap(resolution=0.5, max_range=50.0, radius=200.0,
+                                    max_blocks=8192))
+
+
+def _block_direct_path(zone_id: str = "block"):
+    """起点和终点之间不限高度的方形禁飞区，只能水平绕行"""
+    safety_engine.add_zone(NoFlyZone(id=zone_id,
+                                     polygon=[[-10, -10], [10, -10], [10, 10], [-10, 10]]))
+
+
+def _assert_clear(planner: PathPlanner, start, waypoints: np.ndarray):
+    """每个航段都通过与 goto 相同的检查"""
+    points = np.vstack([start, waypoints])
+    assert planner.segments_clear(points[:1], points[1:2], from_vehicle=True).all()
+    assert planner.segments_clear(points[1:-1], points[2:]).all()
+    assert safety_engine.check_path(waypoints, start) == []
+    np.testing.assert_array_equal(waypoints[-1], GOAL)
+
+
+def test_direct_path_needs_no_detour():
+    planner = _planner()
+    plan = planner.plan(START, GOAL)
+    np.testing.assert_array_equal(plan.waypoints, [GOAL])
+    assert not plan.cached and planner.detours == 0
+
+
+def test_detour_segments_are_clear_and_cached():
+    planner = _planner()
+    _block_direct_path()
+    assert safety_engine.check_path([GOAL], START)
+    plan = planner.plan(START, GOAL)
+    assert len(plan.waypoints) > 1 and not plan.cached
+    _assert_clear(planner, np.array(START), plan.waypoints)
+
+    # 相同的起点和终点（量化步长内）命中缓存，结果仍用实际起点检查
+    again = planner.plan((START[0] + 0.2, START[1], START[2]), GOAL)
+    assert again.cached
+    np.testing.assert_array_equal(again.waypoints, plan.waypoints)
+    assert (planner.hits, planner.misses, planner.detours) == (1, 1, 1)
+
+
+def test_safety_version_bump_invalidates_cached_plan():
+    planner = _planner()
+    _block_direct_path()
+    planner.plan(START, GOAL)
+    assert planner.plan(START, GOAL).cached
+
+    # 增加禁飞区：版本号改变，重新规划，新航线避开两个区域
+    version = safety_engine.version
+    safety_engine.add_zone(NoFlyZone(id="north", polygon=[[-5, 10], [5, 10], [5, 60], [-5, 60]]))
+    assert safety_engine.version > version
+    plan = planner.plan(START, GOAL)
+    assert not plan.cached
+    _assert_clear(planner, np.array(START), plan.waypoints)
+
+    # 清空禁飞区后直飞
+    safety_engine.clear()
+    plan = planner.plan(START, GOAL)
+    assert not plan.cached
+    np.testing.assert_array_equal(plan.waypoints, [GOAL])
+
+
+def test_occupancy_version_bump_invalidates_cached_plan(monkeypatch):
+    monkeypatch.setattr(settings, "OCCUPANCY_ENABLED", True)
+    planner = _planner()
+    start, goal = (0.0, 0.0, -2.0), (20.0, 0.0, -2.0)
+    # x=10 处的一面墙挡住直飞航段
+    wall = np.stack(np.meshgrid([10.0], np.linspace(-5, 5, 21), np.linspace(-5, 0, 11)), -1)
+    planner.occupancy_map.insert((0, 0, -2), wall.reshape(-1, 3))
+    plan = planner.plan(start, goal)
+    assert len(plan.waypoints) > 1
+    points = np.vstack([start, plan.waypoints])
+    assert planner.segments_clear(points[:1], points[1:2], from_vehicle=True).all()
+    assert planner.segments_clear(points[1:-1], points[2:]).all()
+    assert planner.occupancy_map.check_path(plan.waypoints, start,
+                                            settings.OCCUPANCY_CLEARANCE) == []
+    assert planner.plan(start, goal).cached
+
+    # 地图占据状态改变后版本号递增，缓存的航线失效
+    version = planner.occupancy_map.version
+    pillar = np.stack(np.meshgrid([15.0], [-8.0], np.linspace(-5, 0, 11)), -1)
+    assert planner.occupancy_map.insert((0, 0, -2), pillar.reshape(-1, 3))
+    assert planner.occupancy_map.version > version
+    assert not planner.plan(start, goal).cached
+
+
+def test_unreachable_goal_is_cached(monkeypatch):
+    planner = _planner()
+    safety_engine.add_zone(NoFlyZone(id="goal", polygon=[[30, -10], [50, -10], [50, 10], [30, 10]]))
+    with pytest.raises(ValueError, match="goal") as first:
+        planner.plan(START, GOAL)
+    assert planner.detours == 1
+
+    # 同一地图版本下直接返回缓存的错误，不再搜索
+    def search(*args):
+        raise AssertionError("unreachable goal searched again")
+
+    monkeypatch.setattr(planner, "_search", search)
+    with pytest.raises(ValueError) as second:
+        planner.plan(START, GOAL)
+    assert str(second.value) == str(first.value)
+    assert planner.hits == 1
+
+    # 禁飞区移除后版本号改变，重新规划
+    safety_engine.remove_zone("goal")
+    np.testing.assert_array_equal(planner.plan(START, GOAL).waypoints, [GOAL])
@@ -0,0 +1,98 @@
+"""深度图像点云测试"""
+import math
+
+import numpy as np
+import pytest
+
+from app.core.pointcloud import depth_to_points, quaternion_matrix, ray_table, voxel_downsample
+
+WIDTH, HEIGHT = 8, 6
+
+
+def _wall(distance: float = 10.0) -> np.ndarray:
+    """正前方 distance 米处的平面（DepthPlanar 图像各像素相同）"""
+    return np.full((HEIGHT, WIDTH), distance, dtype=np.float32)
+
+
+def _expected_wall(distance: float) -> np.ndarray:
+    """90度视场角下平面在相机坐标系中的点，按行优先排列"""
+    focal = WIDTH / 2.0
+    rows, cols = np.meshgrid(np.arange(HEIGHT), np.arange(WIDTH), indexing="ij")
+    return np.stack([
+        np.full(rows.size, distance),
+        (cols.reshape(-1) + 0.5 - WIDTH / 2.0) / focal * distance,
+        (rows.reshape(-1) + 0.5 - HEIGHT / 2.0) / focal * distance,
+    ], axis=1)
+
+
+def test_ray_table_is_cached_and_read_only():
+    rays = ray_table(WIDTH, HEIGHT, 90.0)
+    assert rays.shape == (3, WIDTH * HEIGHT) and rays.dtype == np.float32
+    assert ray_table(WIDTH, HEIGHT, 90.0) is rays
+    assert not rays.flags.writeable
+    np.testing.assert_allclose(np.linalg.norm(ray_table(WIDTH, HEIGHT, 90.0, False), axis=0), 1.0,
+                               rtol=1e-6)
+
+
+def test_flat_wall_in_world_coordinates():
+    position = (1.0, 2.0, -3.0)
+    points = depth_to_points(_wall(10.0), 90.0, position)
+    assert points.shape == (WIDTH * HEIGHT, 3) and points.dtype == np.float32
+    np.testing.assert_allclose(points, _expected_wall(10.0) + position, atol=1e-4)
+    # 最右一列射线的水平偏角为 atan((W/2 - 0.5) / f)
+    angle = math.degrees(math.atan2(points[WIDTH - 1, 1] - 2.0, points[WIDTH - 1, 0] - 1.0))
+    assert angle == pytest.approx(math.degrees(math.atan((WIDTH / 2 - 0.5) / (WIDTH / 2))), 1e-4)
+
+
+def test_perspective_depth_is_distance_to_camera():
+    points = depth_to_points(_wall(10.0), 90.0, (5.0, 0.0, 0.0), planar=False)
+    np.testing.assert_allclose(np.linalg.norm(points - (5.0, 0.0, 0.0), axis=1), 10.0, rtol=1e-5)
+    # 中心附近的像素接近光轴，离光轴越远 x 越小
+    assert (points[:, 0] < 15.0).all()
+
+
+def test_orientation_rotates_points():
+    # 绕 z 轴（向下）偏航 90 度：相机前方为世界 +y，相机右方为世界 -x
+    half = math.radians(90.0) / 2.0
+    orientation = (math.cos(half), 0.0, 0.0, math.sin(half))
+    np.testing.assert_allclose(quaternion_matrix(*orientation) @ np.array([1.0, 0.0, 0.0]),
+                               [0.0, 1.0, 0.0], atol=1e-6)
+    points = depth_to_points(_wall(10.0), 90.0, (0.0, 0.0, -20.0), orientation)
+    camera = _expected_wall(10.0)
+    expected = np.stack([-camera[:, 1], camera[:, 0], camera[:, 2] - 20.0], axis=1)
+    np.testing.assert_allclose(points, expected, atol=1e-4)
+    # 未归一化的四元数与归一化后的结果相同
+    np.testing.assert_allclose(
+        depth_to_points(_wall(10.0), 90.0, (0.0, 0.0, -20.0), [2 * q for q in orientation]),
+        points, atol=1e-4)
+
+
+def test_invalid_pixels_are_dropped():
+    depth = _wall(10.0)
+    depth[0, 0] = 0.0
+    depth[0, 1] = -1.0
+    depth[1, 2] = np.inf
+    depth[2, 3] = np.nan
+    depth[3, 4] = 150.0   # 天空
+    with np.errstate(invalid="ignore"):
+        points = depth_to_points(depth, 90.0, max_depth=100.0)
+    keep = np.isfinite(depth.reshape(-1)) & (depth.reshape(-1) > 0) & (depth.reshape(-1) <= 100)
+    assert len(points) == WIDTH * HEIGHT - 5
+    np.testing.assert_allclose(points, _expected_wall(10.0)[keep], atol=1e-4)
+    assert len(depth_to_points(np.zeros((HEIGHT, WIDTH), dtype=np.float32))) == 0
+
+
+def test_voxel_downsampling_outputs_occupied_voxel_centers():
+    position = (0.3, -0.2, -5.0)
+    voxel = 5.0   # 像素间距为 2.5 米，每个体素合并多个点
+    raw = depth_to_points(_wall(10.0), 90.0, position)
+    points = depth_to_points(_wall(10.0), 90.0, position, voxel=voxel)
+
+    cells = {tuple(cell) for cell in np.floor(raw / voxel).astype(int).tolist()}
+    assert len(points) == len(cells) < len(raw)
+    assert {tuple(cell) for cell in np.floor(points / voxel).astype(int).tolist()} == cells
+    # 输出为体素中心（包括负坐标的体素）
+    np.testing.assert_allclose(np.mod(points, voxel), voxel / 2.0, atol=1e-5)
+    assert (points[:, 1] < 0).any() and (points[:, 2] < 0).any()
+    np.testing.assert_array_equal(np.sort(voxel_downsample(raw, voxel), axis=0),
+                                  np.sort(points, axis=0))
@@ -0,0 +1,103 @@
+"""飞行记录器分块写入与读取回归测试"""
+import os
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.history import HISTORY_DTYPE
+from app.core.recorder import (
+    INDEX_DTYPE, INDEX_FILE, KIND_COMMAND, KIND_STATE, FlightRecorder, FlightRecording,
+    chunk_name
+)
+
+BATCHES = 6
+BATCH_SIZE = 8
+
+
+def _wait_drained(recorder: FlightRecorder, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while not recorder._queue.empty():
+        assert time.monotonic() < deadline, "recorder queue was not drained"
+        time.sleep(0.01)
+    # 让写入线程写完刚取出的一批，保证每次循环对应独立的批次
+    time.sleep(0.05)
+
+
+def _record(recorder: FlightRecorder):
+    """分多批写入状态和指令，返回写入的状态时间戳"""
+    times = []
+    for batch in range(BATCHES):
+        for i in range(BATCH_SIZE):
+            t = 1000.0 + (batch * BATCH_SIZE + i) * 0.1
+            times.append(t)
+            recorder.record_state(t, (t, -t, -20.0), (0.0, 1.0, 90.0), (5.0, 0.0, 0.0), 3)
+        recorder.record_command("goto", {"batch": batch}, source="test")
+        _wait_drained(recorder)
+    return times
+
+
+def test_chunked_recording_round_trip(tmp_path, monkeypatch):
+    # 每个状态分块只能放下两批，写入期间多次轮转
+    monkeypatch.setattr(settings, "RECORDER_CHUNK_BYTES", 2 * BATCH_SIZE * HISTORY_DTYPE.itemsize)
+    directory = str(tmp_path / "session")
+    recorder = FlightRecorder()
+    recorder.start(directory)
+    times = _record(recorder)
+    recorder.stop(timeout=5.0)
+    assert not recorder.is_recording
+    assert recorder.dropped_records == 0
+
+    # 状态分块按大小轮转，每个文件都是完整的 HISTORY_DTYPE 记录
+    state_chunks = sorted(name for name in os.listdir(directory) if name.startswith("states_"))
+    assert state_chunks == [chunk_name(KIND_STATE, i) for i in range(BATCHES // 2)]
+    for name in state_chunks:
+        size = os.path.getsize(os.path.join(directory, name))
+        assert size == settings.RECORDER_CHUNK_BYTES
+
+    # 索引：每批一项，偏移和记录数与分块内容一致，时间单调
+    index = np.fromfile(os.path.join(directory, INDEX_FILE), dtype=INDEX_DTYPE)
+    states = index[index["kind"] == KIND_STATE]
+    assert len(states) == BATCHES
+    assert list(states["chunk"]) == [batch // 2 for batch in range(BATCHES)]
+    assert list(states["offset"]) == [
+        (batch % 2) * BATCH_SIZE * HISTORY_DTYPE.itemsize for batch in range(BATCHES)
+    ]
+    assert list(states["count"]) == [BATCH_SIZE] * BATCHES
+    assert list(states["first_time"]) == times[::BATCH_SIZE]
+    assert list(states["last_time"]) == times[BATCH_SIZE - 1::BATCH_SIZE]
+    assert len(index[index["kind"] == KIND_COMMAND]) == BATCHES
+
+    # 重新打开：状态通过 memmap 读回，跨分块顺序不变
+    recording = FlightRecording(directory)
+    records = recording.states()
+    assert list(records["time"]) == times
+    np.testing.assert_allclose(records["position"][:, 0], times, rtol=1e-6)
+    np.testing.assert_allclose(records["position"][:, 2], -20.0)
+    assert (records["flags"] == 3).all()
+
+    # 时间范围查询跨越分块边界
+    window = recording.states(start=times[10], end=times[40])
+    assert list(window["time"]) == times[10:41]
+
+    commands = list(recording.commands())
+    assert [c["parameters"]["batch"] for c in commands] == list(range(BATCHES))
+    assert all(c["command"] == "goto" and c["source"] == "test" for c in commands)
+    assert [c["time"] for c in commands] == sorted(c["time"] for c in commands)
+    middle = list(recording.commands(start=commands[2]["time"], end=commands[3]["time"]))
+    assert [c["parameters"]["batch"] for c in middle] == [2, 3]
+
+
+def test_truncated_state_chunk_is_ignored(tmp_path, monkeypatch):
+    """异常退出后分块末尾的不完整记录不影响读取"""
+    monkeypatch.setattr(settings, "RECORDER_CHUNK_BYTES", 2 * BATCH_SIZE * HISTORY_DTYPE.itemsize)
+    directory = str(tmp_path / "session")
+    recorder = FlightRecorder()
+    recorder.start(directory)
+    times = _record(recorder)
+    recorder.stop(timeout=5.0)
+
+    last = os.path.join(directory, chunk_name(KIND_STATE, BATCHES // 2 - 1))
+    with open(last, "ab") as f:
+        f.write(b"\x00" * (HISTORY_DTYPE.itemsize // 2))
+    assert list(FlightRecording(directory).states()["time"]) == times
@@ -0,0 +1,75 @@
+"""安全引擎回归测试"""
+import math
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.safety import MAX_SEGMENT_CELLS, SafetyEngine
+from app.models.drone import NoFlyZone
+
+
+def _engine(cell_size: float = 50.0) -> SafetyEngine:
+    engine = SafetyEngine(cell_size=cell_size)
+    engine.add_zone(NoFlyZone(id="box", polygon=[[40, -20], [60, -20], [60, 20], [40, 20]]))
+    return engine
+
+
+def test_far_target_does_not_expand_grid():
+    """远处的目标点只报告地理围栏违规，不展开航段包围盒内的所有格子"""
+    engine = _engine()
+    for target in [(1e6, 1e6, -10), (1e18, -1e18, -10)]:
+        violations = engine.check_path([target], (0, 0, -10))
+        assert [v["reason"] for v in violations] == ["geofence"]
+        segment, zone = engine._index.candidates(np.array([[0.0, 0.0, -10.0]]),
+                                                 np.array([target], dtype=np.float64))
+        assert len(segment) <= 1
+    assert not engine.segments_safe([(0, 0, -10)], [(1e9, 0, -10)]).any()
+
+
+def test_nan_target_is_rejected():
+    violations = _engine().check_path([(math.nan, 0, -10)], (0, 0, -10))
+    assert violations and violations[0]["reason"] == "geofence"
+
+
+def test_wide_segment_falls_back_to_all_zones():
+    """裁剪后仍覆盖过多格子的航段与所有禁飞区做精确测试"""
+    engine = SafetyEngine(cell_size=0.1)
+    engine.add_zone(NoFlyZone(id="big", polygon=[[0, 0], [100, 0], [100, 100], [0, 100]]))
+    assert (100 / 0.1) ** 2 > MAX_SEGMENT_CELLS
+    assert [v["zone"] for v in engine.check_path([(90, 90, -10)], (-5, -5, -10))] == ["big"]
+    assert engine.check_path([(-5, 200, -10)], (-5, -5, -10)) == []
+
+
+def test_huge_zone_is_not_gridded():
+    engine = _engine()
+    engine.add_zone(NoFlyZone(id="huge", polygon=[[-1e9, -1e9], [1e9, -1e9], [1e9, -1e8]]))
+    assert list(engine._index.wide_zones) == [1]
+    assert [v["zone"] for v in engine.check_path([(100, 0, -10)], (0, 0, -10))] == ["box"]
+
+
+def test_vehicle_outside_geofence_can_return(monkeypatch):
+    """无人机已在围栏外时可以飞回，但不能继续飞往围栏外"""
+    monkeypatch.setattr(settings, "GEOFENCE_RADIUS", 500.0)
+    engine = SafetyEngine()
+    assert engine.check_path([(0, 0, -10)], (600, 0, -10)) == []
+    assert [v["reason"] for v in engine.check_path([(700, 0, -10)], (600, 0, -10))] == ["geofence"]
+    # 只豁免第一个航段的起点，后续航段照常检查
+    violations = engine.check_path([(0, 0, -10), (600, 0, -10)], (600, 0, -10))
+    assert [(v["segment"], v["reason"]) for v in violations] == [(1, "geofence")]
+
+
+def test_landed_vehicle_can_take_off_with_min_altitude(monkeypatch):
+    monkeypatch.setattr(settings, "SAFETY_MIN_ALTITUDE", 5.0)
+    engine = SafetyEngine()
+    assert engine.check_path([(10, 0, -10)], (0, 0, 0)) == []
+    assert engine.segments_safe([(0, 0, 0)], [(10, 0, -10)], from_vehicle=True).all()
+    assert not engine.segments_safe([(0, 0, 0)], [(10, 0, -10)]).any()
+    assert [v["reason"] for v in engine.check_path([(10, 0, -2)], (0, 0, 0))] == ["altitude"]
+
+
+def test_vehicle_inside_zone_can_leave():
+    engine = _engine()
+    assert engine.check_path([(0, 0, -10)], (50, 0, -10)) == []
+    assert [v["zone"] for v in engine.check_path([(55, 0, -10)], (50, 0, -10))] == ["box"]
+    # 没有起点时第一个航点本身仍要检查
+    assert engine.check_path([(50, 0, -10)])
@@ -0,0 +1,41 @@
+"""多传感器采集回归测试"""
+import threading
+import time
+
+from app.core.sensors import SensorAcquisition
+
+
+class _SlowPool:
+    """每次读取耗时 delay 秒的连接池"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call(self, lane, func):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"lane": lane}
+
+
+def test_slow_sensor_reads_do_not_pile_up():
+    """读取比轮询周期慢时不重复排队，完成后的结果仍被收集"""
+    pool = _SlowPool(0.2)
+    acquisition = SensorAcquisition(pool, ["imu", "barometer"])
+    try:
+        for _ in range(20):
+            readings = acquisition.collect(acquisition.submit(), timeout=0.005)
+        assert pool.calls == 2
+        assert acquisition._executor._work_queue.qsize() == 0
+        assert readings == {}
+        time.sleep(0.3)
+        readings = acquisition.collect(acquisition.submit(), timeout=0.005)
+        # 轮询周期之间完成的读取在下一个周期收集
+        assert set(readings) == {"imu", "barometer"}
+        assert pool.calls == 2
+        acquisition.collect(acquisition.submit(), timeout=0.05)
+        assert pool.calls == 4
+    finally:
+        acquisition.shutdown()
@@ -0,0 +1,57 @@
+"""连接监控探测回归测试"""
+import asyncio
+
+from app.core import supervisor
+from app.core.config import settings
+from app.core.supervisor import ConnectionSupervisor
+from app.core.vehicles import vehicle_registry
+
+
+class _Rpc:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _ProbeClient:
+    """模拟 MultirotorClient：client 属性为底层 msgpack-rpc 连接"""
+
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.pings = 0
+        self.client = _Rpc()
+
+    def ping(self):
+        self.pings += 1
+        if self.fail:
+            raise ConnectionError("refused")
+        return True
+
+
+def test_probe_reuses_client_and_closes_failed_ones(monkeypatch):
+    created = []
+    simulator_up = [False, False, True, True]
+
+    def factory(timeout=None):
+        assert timeout == settings.SUPERVISOR_PROBE_TIMEOUT
+        created.append(_ProbeClient(fail=not simulator_up[0]))
+        return created[-1]
+
+    monkeypatch.setattr(supervisor, "create_airsim_client", factory)
+    monitor = ConnectionSupervisor(vehicle_registry)
+
+    async def run():
+        results = []
+        while simulator_up:
+            results.append(await monitor._probe())
+            simulator_up.pop(0)
+        await monitor.stop()
+        return results
+
+    assert asyncio.run(run()) == [False, False, True, True]
+    # 失败的连接立即关闭；成功后复用同一个连接，停止时关闭
+    assert len(created) == 3
+    assert all(client.client.closed for client in created)
+    assert created[2].pings == 2
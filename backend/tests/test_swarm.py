@@ -0,0 +1,138 @@
+"""编队起步屏障与分发测试"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.commands import (
+    COMMAND_CANCELLED, COMMAND_FAILED, COMMAND_SUCCEEDED, CommandExecutor
+)
+from app.core.swarm import StartBarrier, SwarmDispatcher
+
+
+class _Vehicle:
+    """只带指令执行器的无人机客户端"""
+
+    def __init__(self):
+        self.cancelled = 0
+        self.commands = CommandExecutor(self._cancel_active)
+
+    async def _cancel_active(self):
+        self.cancelled += 1
+
+
+def _flight(started: dict, name: str, duration: float = 0.0):
+    async def run():
+        started[name] = time.monotonic()
+        await asyncio.sleep(duration)
+        return name
+    return run
+
+
+async def _busy(vehicle: _Vehicle, duration: float):
+    """让某架无人机的执行器先执行一条指令，编队指令在其后排队"""
+    command = vehicle.commands.submit("busy", lambda: asyncio.sleep(duration))
+    await asyncio.sleep(0)
+    return command
+
+
+def _members(vehicles: dict, started: dict, duration: float = 0.0) -> dict:
+    return {
+        name: (vehicle, _flight(started, name, duration), {}, None)
+        for name, vehicle in vehicles.items()
+    }
+
+
+def test_barrier_releases_all_members_together():
+    started = {}
+
+    async def run():
+        vehicles = {name: _Vehicle() for name in ("a", "b", "c")}
+        for vehicle in vehicles.values():
+            vehicle.commands.start()
+        # b 和 c 的执行器被占用，三个成员先后到达屏障
+        await _busy(vehicles["b"], 0.1)
+        busy = await _busy(vehicles["c"], 0.2)
+        group = SwarmDispatcher().dispatch("goto", _members(vehicles, started))
+        await group.wait(2.0)
+        for vehicle in vehicles.values():
+            await vehicle.commands.stop()
+        return group, busy
+
+    group, busy = asyncio.run(run())
+    assert group.status == COMMAND_SUCCEEDED
+    assert group.barrier.released and group.barrier.arrived == 3
+    assert sorted(started) == ["a", "b", "c"]
+    # 没有成员在最后一个成员就绪前起飞
+    assert max(started.values()) - min(started.values()) < 0.05
+    assert busy.finished_at <= group.barrier.released_at
+    assert group.finished_at is not None
+    assert {v["status"] for v in group.to_dict()["vehicles"].values()} == {COMMAND_SUCCEEDED}
+
+
+def test_cancelling_one_member_abandons_the_group():
+    """屏障放行前某个成员被取消，其余成员在屏障处放弃，都不会起飞"""
+    started = {}
+
+    async def run():
+        vehicles = {name: _Vehicle() for name in ("a", "b")}
+        for vehicle in vehicles.values():
+            vehicle.commands.start()
+        await _busy(vehicles["b"], 0.5)
+        group = SwarmDispatcher().dispatch("goto", _members(vehicles, started))
+        await asyncio.sleep(0.05)
+        # a 已在屏障处等待，b 仍在排队
+        assert group.barrier.arrived == 1
+        await vehicles["b"].commands.cancel(group.commands["b"].id)
+        await group.wait(1.0)
+        for vehicle in vehicles.values():
+            await vehicle.commands.stop()
+        return group
+
+    group = asyncio.run(run())
+    assert started == {}
+    assert group.barrier.broken
+    assert group.commands["b"].status == COMMAND_CANCELLED
+    assert group.commands["a"].status == COMMAND_FAILED
+    assert "barrier broken" in group.commands["a"].error
+    assert group.status == COMMAND_FAILED
+
+
+def test_group_cancel_cancels_every_member():
+    started = {}
+
+    async def run():
+        vehicles = {name: _Vehicle() for name in ("a", "b", "c")}
+        for vehicle in vehicles.values():
+            vehicle.commands.start()
+        dispatcher = SwarmDispatcher()
+        group = dispatcher.dispatch("goto", _members(vehicles, started, duration=10.0))
+        await asyncio.sleep(0.05)
+        assert group.barrier.released
+        await asyncio.wait_for(dispatcher.cancel(group.id), 1.0)
+        await group.wait(1.0)
+        for vehicle in vehicles.values():
+            await vehicle.commands.stop()
+        with pytest.raises(KeyError):
+            await dispatcher.cancel("unknown")
+        return group, vehicles
+
+    group, vehicles = asyncio.run(run())
+    assert sorted(started) == ["a", "b", "c"]
+    assert group.status == COMMAND_CANCELLED
+    # 执行中的成员都通过 cancelLastTask 中止
+    assert [vehicle.cancelled for vehicle in vehicles.values()] == [1, 1, 1]
+
+
+def test_barrier_times_out_when_a_member_never_arrives():
+    async def run():
+        barrier = StartBarrier(2, 0.05)
+        with pytest.raises(Exception, match="1/2 ready"):
+            await barrier.wait()
+        # 屏障失效后到达的成员同样放弃
+        with pytest.raises(Exception, match="barrier broken"):
+            await barrier.wait()
+        return barrier
+
+    barrier = asyncio.run(run())
+    assert barrier.broken and not barrier.released
@@ -0,0 +1,126 @@
+"""遥测增量模式和字段投影测试"""
+import asyncio
+import json
+
+from app.core.telemetry import TelemetryHub
+from app.core.telemetry_codec import MODE_DELTA, MODE_FULL, MODE_PROJECTION, DeltaEncoder
+
+
+def _telemetry(x: float, battery: float = 100.0):
+    return {
+        "timestamp": f"t{x}",
+        "position": {"x": x, "y": 0.0, "z": -10.0},
+        "attitude": {"roll": 0.0, "pitch": 0.0, "yaw": 90.0},
+        "velocity": {"vx": 1.0, "vy": 0.0, "vz": 0.0},
+        "is_armed": True,
+        "is_flying": True,
+        "battery_level": battery,
+        "gps_location": None,
+        "sim_timestamp": 0,
+        "sensors": {}
+    }
+
+
+def _apply(state, changes):
+    """客户端侧：把增量帧合并到本地状态"""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(state.get(key), dict):
+            state[key].update(value)
+        else:
+            state[key] = value
+
+
+class _Record:
+    def __init__(self, seq: int, x: float):
+        self.seq = seq
+        self.timestamp = float(seq)
+        self.x = x
+
+    def to_telemetry(self):
+        return _telemetry(self.x)
+
+
+def _drain(subscriber):
+    frames = []
+    while not subscriber.queue.empty():
+        frames.append(json.loads(subscriber.queue.get_nowait()))
+    return frames
+
+
+def _publish(hub, seq: int, x: float):
+    hub.seq += 1
+    hub._publish(_Record(seq, x))
+
+
+def test_delta_encoder_keyframes_and_apply():
+    encoder = DeltaEncoder(keyframe_interval=5.0, epsilon=0.01)
+    keyframe, reference = encoder.update(_telemetry(0.0), now=0.0)
+    assert keyframe and encoder.seq == 1
+    client_state = json.loads(json.dumps(reference))
+
+    # 变化不超过阈值时不发送
+    assert encoder.update(_telemetry(0.005), now=1.0) is None
+    keyframe, changes = encoder.update(_telemetry(0.5, battery=99.0), now=2.0)
+    assert not keyframe and encoder.seq == 2
+    assert changes == {"position": {"x": 0.5}, "battery_level": 99.0}
+    _apply(client_state, changes)
+    keyframe, changes = encoder.update(_telemetry(1.0, battery=99.0), now=3.0)
+    _apply(client_state, changes)
+    assert {k: v for k, v in client_state.items() if k != "timestamp"} == \
+        {k: v for k, v in _telemetry(1.0, battery=99.0).items() if k != "timestamp"}
+
+    # 到达关键帧间隔时发送完整的关键帧
+    keyframe, reference = encoder.update(_telemetry(1.0, battery=99.0), now=8.0)
+    assert keyframe and encoder.seq == 4
+    assert reference["position"]["x"] == 1.0
+
+
+def test_delta_subscriber_resync():
+    async def run():
+        hub = TelemetryHub(client=None)
+        subscriber = hub.subscribe(mode=MODE_DELTA)
+        _publish(hub, 1, 0.0)
+        _publish(hub, 2, 0.0)
+        _publish(hub, 3, 1.0)
+        frames = _drain(subscriber)
+        assert [f["type"] for f in frames] == ["keyframe", "delta"]
+        assert [f["seq"] for f in frames] == [1, 2]
+        assert frames[1]["changes"] == {"position": {"x": 1.0}}
+
+        # 请求重同步后下一个周期收到关键帧，即使没有变化
+        subscriber.request_resync()
+        _publish(hub, 4, 1.0)
+        frames = _drain(subscriber)
+        assert [f["type"] for f in frames] == ["keyframe"]
+        assert frames[0]["position"]["x"] == 1.0
+
+        # 队列溢出丢帧后同样从关键帧重新开始
+        for seq in range(5, 5 + subscriber.queue.maxsize + 1):
+            _publish(hub, seq, float(seq))
+        assert subscriber.dropped_frames == 1 and subscriber.needs_keyframe
+        _drain(subscriber)
+        _publish(hub, 100, 100.0)
+        assert [f["type"] for f in _drain(subscriber)] == ["keyframe"]
+
+
+    asyncio.run(run())
+
+def test_clearing_projection_restores_delta_mode():
+    async def run():
+        hub = TelemetryHub(client=None)
+        subscriber = hub.subscribe(mode=MODE_DELTA)
+        _publish(hub, 1, 0.0)
+        subscriber.set_projection({"position": 10})
+        assert subscriber.mode == MODE_PROJECTION
+        subscriber.set_projection({})
+        assert subscriber.mode == MODE_DELTA
+        _drain(subscriber)
+        _publish(hub, 2, 0.0)
+        assert [f["type"] for f in _drain(subscriber)] == ["keyframe"]
+
+        full = hub.subscribe()
+        full.set_projection({"attitude": 5})
+        full.set_projection({})
+        assert full.mode == MODE_FULL and not full.needs_keyframe
+
+    asyncio.run(run())
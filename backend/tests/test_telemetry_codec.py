@@ -0,0 +1,98 @@
+"""二进制遥测帧编解码测试"""
+import pytest
+
+from app.core.telemetry_codec import (
+    FIELD_SECTIONS, FLAG_KEYFRAME, FULL_MASK, HEADER, SECTIONS, decode_binary, encode_binary,
+    fields_mask
+)
+
+
+def _telemetry():
+    return {
+        "timestamp": "2024-01-01T00:00:00",
+        "position": {"x": 1.5, "y": -2.25, "z": -10.0},
+        "attitude": {"roll": 1.0, "pitch": -2.0, "yaw": 90.0},
+        "velocity": {"vx": 0.5, "vy": 0.0, "vz": -1.0},
+        "is_armed": True,
+        "is_flying": False,
+        "battery_level": 87.5,
+        "gps_location": {"latitude": 47.641468, "longitude": -122.140165, "altitude": 122.5},
+        "sim_timestamp": 123,
+        "sensors": {
+            "imu": {"sim_timestamp": 11,
+                    "angular_velocity": {"x": 0.1, "y": 0.2, "z": 0.3},
+                    "linear_acceleration": {"x": 0.0, "y": 0.0, "z": -9.75}},
+            "barometer": {"sim_timestamp": 12, "altitude": 120.0, "pressure": 99900.0},
+            "magnetometer": {"sim_timestamp": 13,
+                             "magnetic_field_body": {"x": 0.2, "y": -0.1, "z": 0.4}},
+            "distance:Front": {"sim_timestamp": 14, "distance": 5.5},
+        }
+    }
+
+
+def _assert_close(actual, expected):
+    """嵌套字典按 float32 精度比较"""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            _assert_close(actual[key], expected[key])
+    else:
+        assert actual == pytest.approx(expected, rel=1e-6)
+
+
+def _expected(telemetry, key):
+    if key == "sensors":
+        # 二进制帧按传感器类型携带读数
+        return {kind.partition(":")[0]: reading for kind, reading in telemetry[key].items()}
+    return telemetry[key]
+
+
+def test_round_trip_every_field():
+    """每个字段单独投影时只编码对应的数据段，覆盖所有掩码位"""
+    telemetry = _telemetry()
+    assert fields_mask(FIELD_SECTIONS) == FULL_MASK
+    for key in FIELD_SECTIONS:
+        frame = decode_binary(encode_binary(telemetry, 7, 1.5, fields_mask([key])))
+        assert frame["seq"] == 7 and frame["timestamp"] == 1.5 and frame["is_connected"]
+        _assert_close(frame[key], _expected(telemetry, key))
+        other = set(frame) - {"seq", "timestamp", "is_connected", "is_keyframe", "is_delta"}
+        sections = set(FIELD_SECTIONS[key])
+        assert other == ({"is_armed", "is_flying", "battery_level"} if sections == {"status"}
+                         else {key})
+
+
+def test_round_trip_full_frame():
+    telemetry = _telemetry()
+    frame = decode_binary(encode_binary(telemetry, 2 ** 32 + 5, 3.0, FULL_MASK, FLAG_KEYFRAME))
+    assert frame["seq"] == 5 and frame["is_keyframe"] and not frame["is_delta"]
+    for key in ("position", "attitude", "velocity", "gps_location"):
+        assert frame[key] == pytest.approx(telemetry[key])
+    assert (frame["is_armed"], frame["is_flying"]) == (True, False)
+    assert frame["battery_level"] == pytest.approx(87.5)
+    _assert_close(frame["sensors"], _expected(telemetry, "sensors"))
+
+
+def test_missing_optional_sections_are_dropped():
+    telemetry = _telemetry()
+    telemetry["gps_location"] = None
+    telemetry["sensors"] = {"barometer": telemetry["sensors"]["barometer"]}
+    frame = decode_binary(encode_binary(telemetry, 1))
+    assert "gps_location" not in frame
+    assert set(frame["sensors"]) == {"barometer"}
+    assert len(SECTIONS) == FULL_MASK.bit_length()
+
+
+def test_disconnected_frame():
+    frame = decode_binary(encode_binary(None, 3, 2.0))
+    assert frame == {"seq": 3, "timestamp": 2.0, "is_connected": False,
+                     "is_keyframe": False, "is_delta": False}
+
+
+def test_bad_magic_or_version_is_rejected():
+    frame = bytearray(encode_binary(_telemetry(), 1))
+    for offset, value in [(0, 0x5A), (1, 2)]:
+        corrupt = bytearray(frame)
+        corrupt[offset] = value
+        with pytest.raises(ValueError):
+            decode_binary(bytes(corrupt))
+    assert len(frame) > HEADER.size
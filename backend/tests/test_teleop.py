@@ -0,0 +1,46 @@
+"""速度控制WebSocket回归测试"""
+import json
+import math
+
+import pytest
+
+from app.core.teleop import SETPOINT, SETPOINT_WITH_SEQ, parse_setpoint
+
+
+def test_parse_setpoint_rejects_non_finite():
+    for message in [json.loads('{"vx": NaN, "vy": 0, "vz": 0}'),
+                    json.loads('{"vx": 0, "vy": Infinity, "vz": 0}'),
+                    SETPOINT.pack(0.0, 0.0, -math.inf),
+                    SETPOINT_WITH_SEQ.pack(math.nan, 0.0, 0.0, 1)]:
+        with pytest.raises(ValueError):
+            parse_setpoint(message)
+    assert parse_setpoint(SETPOINT_WITH_SEQ.pack(1.0, 2.0, 3.0, 7)) == (1.0, 2.0, 3.0, 7)
+
+
+def test_clamp_speed_rejects_non_finite():
+    from app.core.drone_client import clamp_speed
+    with pytest.raises(ValueError):
+        clamp_speed(math.nan, 0.0, 0.0)
+    assert clamp_speed(30.0, 0.0, 40.0) == pytest.approx((12.0, 0.0, 16.0))
+
+
+def test_non_finite_setpoint_issues_no_rpc(api, replay_backend, monkeypatch):
+    """NaN 设定点返回错误回复，不发出 moveByVelocityAsync"""
+    calls = []
+    move = type(replay_backend).moveByVelocityAsync
+
+    def record(self, vx, vy, vz, duration, *args, **kwargs):
+        calls.append((vx, vy, vz))
+        return move(self, vx, vy, vz, duration, *args, **kwargs)
+
+    monkeypatch.setattr(type(replay_backend), "moveByVelocityAsync", record)
+    with api.websocket_connect("/api/v1/control/ws") as websocket:
+        websocket.send_text('{"vx": NaN, "vy": 0, "vz": 0}')
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_bytes(SETPOINT.pack(math.inf, 0.0, 0.0))
+        assert websocket.receive_json()["type"] == "error"
+        assert calls == []
+        websocket.send_text('{"vx": 1, "vy": 0, "vz": 0, "seq": 7}')
+        event = websocket.receive_json()
+        assert event["type"] == "ack" and event["seq"] == 7
+    assert calls == [(1.0, 0.0, 0.0)]